@@ -0,0 +1,88 @@
+"""Denormalized JOB.applicant_count (Query 6.1 without the JOIN / GROUP BY over JOB_APPLICATION).
+
+    python -m app.applicant_counts                     recompute every count, 10000 jobs per transaction
+    python -m app.applicant_counts --batch-size 1000
+
+The routers keep the counter in the same transaction as the JOB_APPLICATION write:
++1 on create, -1 on delete, and caregiver / account deletes release the applications
+ON DELETE CASCADE is about to remove. Rows written around the API (SQL scripts, COPY,
+migrations/007_job_applicant_count.sql on an existing database) are fixed with this
+command. Each batch is a short transaction, so JOB stays writable while it runs.
+"""
+import argparse
+import time
+
+from sqlalchemy import select, update, text
+
+from app.database import engine
+from app.models import Job, JobApplication
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def adjust_applicant_count(db, job_id: int, delta: int):
+    #atomic increment on the row, concurrent applications to one job queue on its row lock instead of losing updates
+    db.execute(
+        update(Job).where(Job.job_id == job_id).values(applicant_count=Job.applicant_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_caregiver_applications(db, caregiver_user_id: int) -> list:
+    #call before deleting the caregiver (or its account) in the same transaction. returns the job ids whose count dropped.
+    #one application per (caregiver, job), so every job loses exactly one
+    applied = select(JobApplication.job_id).where(JobApplication.caregiver_user_id == caregiver_user_id)
+    return list(db.execute(
+        update(Job).where(Job.job_id.in_(applied)).values(applicant_count=Job.applicant_count - 1)
+        .returning(Job.job_id).execution_options(synchronize_session=False)
+    ).scalars())
+
+
+def _repair_batch(conn, after: int, last: int) -> int:
+    #rows are locked first, so the count below (a new snapshot) already sees every writer that held them
+    conn.execute(text("SELECT 1 FROM job WHERE job_id > :after AND job_id <= :last FOR UPDATE"), {"after": after, "last": last})
+    return conn.execute(text("""
+        UPDATE job j SET applicant_count = c.n
+        FROM (
+            SELECT j2.job_id, COUNT(ja.caregiver_user_id)::integer AS n
+            FROM job j2
+            LEFT JOIN job_application ja ON ja.job_id = j2.job_id
+            WHERE j2.job_id > :after AND j2.job_id <= :last
+            GROUP BY j2.job_id
+        ) c
+        WHERE j.job_id = c.job_id AND j.applicant_count <> c.n
+    """), {"after": after, "last": last}).rowcount
+
+
+def repair_applicant_counts(bind=engine, batch_size: int = DEFAULT_BATCH_SIZE) -> dict:
+    #walks JOB by primary key in batches of batch_size ids, returns {"jobs": checked, "fixed": changed}
+    checked = fixed = 0
+    after = -(2 ** 31)
+    with bind.connect() as conn:
+        while True:
+            batch = conn.execute(
+                text("SELECT COUNT(*), MAX(job_id) FROM (SELECT job_id FROM job WHERE job_id > :after ORDER BY job_id LIMIT :n) b"),
+                {"after": after, "n": batch_size},
+            ).one()
+            conn.commit()
+            if not batch[0]:
+                break
+            fixed += _repair_batch(conn, after, batch[1])
+            conn.commit()
+            checked += batch[0]
+            after = batch[1]
+    return {"jobs": checked, "fixed": fixed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = repair_applicant_counts(batch_size=args.batch_size)
+    print(f"checked {result['jobs']} jobs, fixed {result['fixed']} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import Range
+from sqlalchemy.orm import Session
+
+from app.models import Appointment
+
+#free / busy calendar of a caregiver for GET /caregivers/{id}/availability.
+#busy time comes from the GiST index of ex_appointment_caregiver_slot (app/models/appointment.py):
+#it is an interval index over (caregiver, time) that Postgres updates on every insert / update /
+#delete, ON DELETE CASCADE included, so there is no separate calendar table to keep in sync.
+#one index range scan returns the PENDING / ACCEPTED appointments of any window, months included
+
+MAX_AVAILABILITY_DAYS = 366
+
+#caregiver_slot = caregiver_user_id * CAREGIVER_SLOT_STRIDE + epoch seconds, see the model
+CAREGIVER_SLOT_STRIDE = 10_000_000_000
+EPOCH = datetime(1970, 1, 1)
+
+
+def caregiver_slot_range(caregiver_user_id: int, start: datetime, end: datetime) -> Range:
+    base = caregiver_user_id * CAREGIVER_SLOT_STRIDE
+    return Range(base + (start - EPOCH) // timedelta(seconds=1), base + (end - EPOCH) // timedelta(seconds=1))
+
+
+def busy_slots(db: Session, caregiver_user_id: int, start: datetime, end: datetime) -> list:
+    #[(start, end)] of PENDING / ACCEPTED appointments overlapping [start, end), clipped to it, sorted.
+    #the status condition is inline SQL: the planner only uses the partial index for the same predicate
+    rows = (
+        db.query(Appointment.appointment_date, Appointment.appointment_time, Appointment.work_hours)
+        .filter(Appointment.caregiver_slot.overlaps(caregiver_slot_range(caregiver_user_id, start, end)))
+        .filter(text("appointment.status IN ('PENDING', 'ACCEPTED')"))
+        .all()
+    )
+    busy = []
+    for appointment_date, appointment_time, work_hours in rows:
+        begins = datetime.combine(appointment_date, appointment_time)
+        busy.append((max(begins, start), min(begins + timedelta(hours=work_hours), end)))
+    return sorted(busy)
+
+
+def free_slots(busy: list, start: datetime, end: datetime, min_length: timedelta) -> list:
+    #gaps between busy intervals, split at midnight (one calendar day each), shorter than min_length left out
+    free = []
+    cursor = start
+    for busy_start, busy_end in busy + [(end, end)]:
+        while cursor < busy_start:
+            day_end = min(datetime.combine(cursor.date() + timedelta(days=1), datetime.min.time()), busy_start)
+            if day_end - cursor >= min_length:
+                free.append((cursor, day_end))
+            cursor = day_end
+        cursor = max(cursor, busy_end)
+    return free
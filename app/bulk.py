@@ -0,0 +1,120 @@
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import json
+import os
+
+from app.identity import bump_identity
+
+#shared parts of the POST /<entity>/bulk endpoints:
+#parse JSON array / NDJSON -> validate every row with the pydantic *Create schema ->
+#router does set-based FK checks (one IN query per referenced table) ->
+#insert_rows writes all valid rows with one executemany (multi-row INSERT ... RETURNING)
+
+MAX_BULK_ROWS = int(os.getenv("MAX_BULK_ROWS", "10000"))
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+BULK_DESCRIPTION = (
+    "Body is a JSON array of objects or NDJSON (Content-Type: application/x-ndjson), "
+    f"at most {MAX_BULK_ROWS} rows. Valid rows are inserted, invalid ones are reported in `errors`."
+)
+
+
+def row_error(row: int, detail) -> dict:
+    return {"row": row, "detail": detail}
+
+
+async def read_bulk_rows(request: Request) -> list:
+    #returns list of (row, parsed json or exception for broken NDJSON lines)
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_TYPES:
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append((len(rows), json.loads(line)))
+            except ValueError as e:
+                rows.append((len(rows), e))
+    else:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        rows = list(enumerate(data))
+
+    if len(rows) > MAX_BULK_ROWS:
+        raise HTTPException(status_code=413, detail=f"Too many rows, limit is {MAX_BULK_ROWS}")
+    return rows
+
+
+def validate_rows(rows: list, schema):
+    valid, errors = [], []
+    for row, data in rows:
+        if isinstance(data, Exception):
+            errors.append(row_error(row, f"Invalid JSON: {data}"))
+            continue
+        try:
+            valid.append((row, schema.model_validate(data)))
+        except ValidationError as e:
+            errors.append(row_error(row, e.errors(include_url=False, include_context=False, include_input=False)))
+    return valid, errors
+
+
+def _insert_batch(db: Session, model, pk, rows: list):
+    stmt = insert(model).returning(pk, sort_by_parameter_order=True)
+    try:
+        with db.begin_nested():
+            ids = db.execute(stmt, [values for _, values in rows]).scalars().all()
+        return [{"row": row, "id": id} for (row, _), id in zip(rows, ids)], []
+    except IntegrityError:
+        #something changed since the pre-checks (concurrent insert, constraint) -
+        #retry row by row, each in its own savepoint, to report exactly which rows fail
+        created, errors = [], []
+        for row, values in rows:
+            try:
+                with db.begin_nested():
+                    id = db.execute(insert(model).returning(pk), values).scalar_one()
+                created.append({"row": row, "id": id})
+            except IntegrityError as e:
+                errors.append(row_error(row, str(e.orig).splitlines()[0]))
+        return created, errors
+
+
+def insert_rows(db: Session, model, rows: list, identity_column=None):
+    #rows = list of (row, values dict). values with identity_column = None get the id from the sequence.
+    #caller commits
+    pk = model.__mapper__.primary_key[0]
+    if not rows:
+        return [], []
+
+    if identity_column is None:
+        return _insert_batch(db, model, pk, rows)
+
+    key = identity_column.key
+    generated = [(row, {k: v for k, v in values.items() if k != key}) for row, values in rows if values.get(key) is None]
+    explicit = [(row, values) for row, values in rows if values.get(key) is not None]
+
+    #explicit ids first and the sequence moved past them, so the generated batch cannot collide with them
+    created, errors = _insert_batch(db, model, pk, explicit) if explicit else ([], [])
+    if created:
+        bump_identity(db, identity_column, max(r["id"] for r in created))
+    if generated:
+        generated_created, generated_errors = _insert_batch(db, model, pk, generated)
+        created += generated_created
+        errors += generated_errors
+    return created, errors
+
+
+def bulk_response(created: list, errors: list) -> dict:
+    return {
+        "created": sorted(created, key=lambda r: r["row"]),
+        "errors": sorted(errors, key=lambda r: r["row"]),
+    }
@@ -0,0 +1,186 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import os
+import threading
+import time
+
+#read-through cache for GET-by-id endpoints.
+#values are response models (never ORM objects - those belong to one session),
+#keys are tuples like ("user", 5). every entry also has tags, e.g. an appointment is
+#tagged ("caregiver", 3) and ("member", 7), so deleting caregiver 3 drops exactly
+#the entries that ON DELETE CASCADE removed from the database.
+#cache is per process: with several uvicorn workers another worker may serve
+#a stale entry until its TTL runs out - keep CACHE_TTL_SECONDS short or plug in a shared backend
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  #memory | none
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+
+
+class CacheBackend(ABC):
+    #interface every backend implements, a backend missing a method fails when it is created
+
+    generation = 0  #changes on every invalidation, see read_through
+
+    @abstractmethod
+    def get(self, key):
+        ...
+
+    @abstractmethod
+    def set(self, key, value, tags=(), generation=None):
+        ...
+
+    @abstractmethod
+    def delete(self, key):
+        ...
+
+    @abstractmethod
+    def invalidate_tags(self, tags):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+    async def read_through(self, key, load, tags=()):
+        #load: coroutine function returning the value; tags: list or function(value) -> list
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        generation = self.generation
+        value = await load()
+        self.set(key, value, tags(value) if callable(tags) else tags, generation=generation)
+        return value
+
+
+class NullCache(CacheBackend):
+    #CACHE_BACKEND=none - every read goes to the database
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, tags=(), generation=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def invalidate_tags(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none", "hits": 0, "misses": self.misses}
+
+
+class LRUCache(CacheBackend):
+    #in-memory, at most max_entries values (least recently used goes first), each lives ttl seconds
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  #key -> (expires_at, value, tags)
+        self._tagged = {}  #tag -> set of keys
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=(), generation=None):
+        with self._lock:
+            #something was invalidated while the value was being loaded - it may be stale already
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(tags)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    if backend == "none":
+        return NullCache()
+    if backend == "memory":
+        return LRUCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+
+entity_cache = create_cache()
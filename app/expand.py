@@ -0,0 +1,59 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.fields import project
+
+#?expand=user,address,applications on list / detail endpoints: related rows come back nested
+#in the same response instead of one follow-up request per row.
+#every expansion is an eager load of a relationship declared in app/models:
+# - to-one (caregiver -> user, member -> address): joinedload, same SELECT
+# - collections (job -> applications): selectinload, one SELECT ... WHERE id IN (ids of the page)
+#so a page is 1 + (expanded collections) statements no matter how many rows it has.
+#responses are built inside run_db (nothing is lazy-loaded later, in async mode too) and routes use
+#response_model_exclude_unset, so fields that were not expanded are left out, not returned as null
+
+EXPAND_DESCRIPTION = "Comma-separated related objects to include"
+
+
+class Expansion:
+    def __init__(self, relationship, schema, many=False):
+        self.relationship, self.schema, self.many = relationship, schema, many
+
+
+def expand_description(expansions: dict) -> str:
+    return f"{EXPAND_DESCRIPTION}: {', '.join(expansions)}"
+
+
+def parse_expand(expand, expansions: dict) -> list:
+    #"user, address" -> ["user", "address"], unknown names -> 400
+    if not expand:
+        return []
+    names = list(dict.fromkeys(name.strip() for name in expand.split(",") if name.strip()))
+    unknown = [name for name in names if name not in expansions]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot expand {', '.join(unknown)}. Possible values: {', '.join(expansions)}")
+    return names
+
+
+def expand_query(query, expansions: dict, names: list):
+    return query.options(*[
+        (selectinload if expansions[name].many else joinedload)(expansions[name].relationship) for name in names
+    ])
+
+
+def expand_row(row, base_schema, schema, expansions: dict, names: list, fields=None):
+    #schema = base_schema + one optional field per expansion; only the expanded ones are set.
+    #fields: sparse fieldset (app/fields.py), returns a plain dict with those columns and the expansions
+    if not names and fields is None:
+        return base_schema.model_validate(row)
+    nested = {}
+    for name in names:
+        expansion = expansions[name]
+        value = getattr(row, expansion.relationship.key)
+        if expansion.many:
+            nested[name] = [expansion.schema.model_validate(v) for v in value]
+        else:
+            nested[name] = None if value is None else expansion.schema.model_validate(value)
+    if fields is not None:
+        return {**project(row, fields), **nested}
+    return schema(**base_schema.model_validate(row).model_dump(), **nested)
@@ -0,0 +1,126 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects import postgresql
+import logging
+import queue
+import threading
+
+from app.database import engine
+
+#streaming table export for GET /export/{table}.
+#csv: COPY (...) TO STDOUT, Postgres formats the rows, we only pass bytes through.
+#ndjson: row_to_json() on a server-side (named) cursor, EXPORT_FETCH_SIZE rows at a time.
+#no ORM objects or pydantic models are built and memory use does not grow with the table.
+#both run on a dedicated psycopg2 connection in the threadpool
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FETCH_SIZE = 2000
+EXPORT_CHUNK_BYTES = 64 * 1024  #psycopg2 hands COPY output over row by row, send it in bigger pieces
+EXPORT_QUEUE_CHUNKS = 16  #chunks buffered between the COPY thread and the response
+
+
+def export_engine(db):
+    #engine of the request session; asyncpg has no COPY-to-file API, so async mode uses the psycopg2 engine
+    return engine if isinstance(db, AsyncSession) else db.get_bind()
+
+
+def export_select(table, columns, pk, date_column=None, since=None):
+    query = select(*[table.c[name] for name in columns]).order_by(*[table.c[name] for name in pk])
+    if since is not None:
+        query = query.where(table.c[date_column] >= since)
+    #COPY cannot take bind parameters; values here are typed (date) and rendered by the dialect
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+class _ExportCancelled(Exception):
+    pass
+
+
+class _QueueWriter:
+    #file-like target for copy_expert, blocks while the client is slower than the database
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= EXPORT_CHUNK_BYTES:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                raise _ExportCancelled()
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_csv(bind, sql: str):
+    chunks = queue.Queue(maxsize=EXPORT_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    done = object()
+    errors = []
+
+    def copy():
+        writer = _QueueWriter(chunks, cancelled)
+        conn = bind.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", writer)
+            writer.flush()
+            conn.rollback()
+            conn.close()
+        except Exception as e:
+            #connection is mid-COPY or broken, never give it back to the pool
+            conn.invalidate()
+            if not isinstance(e, _ExportCancelled):
+                logger.error(f"Export failed: {str(e)}", exc_info=True)
+                errors.append(e)
+        try:
+            writer.put(done)
+        except _ExportCancelled:
+            pass
+
+    thread = threading.Thread(target=copy, daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        #client disconnected or we are done: stop the COPY thread
+        cancelled.set()
+    if errors:
+        raise errors[0]
+
+
+def stream_ndjson(bind, sql: str):
+    conn = bind.raw_connection()
+    try:
+        with conn.cursor(name="export") as cursor:
+            cursor.itersize = EXPORT_FETCH_SIZE
+            cursor.execute(f"SELECT row_to_json(t)::text FROM ({sql}) t")
+            while True:
+                rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                yield "".join(row[0] + "\n" for row in rows).encode()
+        conn.rollback()
+        conn.close()
+    except BaseException:
+        #GeneratorExit on client disconnect included - named cursor may still be open
+        conn.invalidate()
+        raise
@@ -0,0 +1,51 @@
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import load_only
+
+from app.pagination import set_next_cursor
+
+#?fields=user_id,given_name (sparse fieldsets) on list / detail endpoints.
+#lists read only those columns (load_only; the primary key and the sort key of the page are always
+#loaded, they are needed for identity and the cursor), so long text columns like
+#profile_description / other_requirements are neither read nor sent when not asked for.
+#detail endpoints backed by the entity cache project the cached row instead - a hit costs no SQL at all.
+#sparse rows are returned as plain JSON: the response models require every field
+
+FIELDS_DESCRIPTION = "Comma-separated fields to return (default: all)"
+
+
+def fields_description(schema) -> str:
+    return f"{FIELDS_DESCRIPTION}: {', '.join(schema.model_fields)}"
+
+
+def parse_fields(fields, schema):
+    #"user_id, given_name" -> ["user_id", "given_name"]; None = every field of the schema, unknown names -> 400
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        raise HTTPException(status_code=400, detail="fields cannot be empty")
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Possible values: {', '.join(schema.model_fields)}")
+    return names
+
+
+def load_fields(query, model, names, keys=()):
+    #keys: sort / cursor columns that must be loaded even if not requested
+    if names is None:
+        return query
+    names = dict.fromkeys(list(names) + [key.key for key in keys])
+    return query.options(load_only(*[getattr(model, name) for name in names]))
+
+
+def project(row, names) -> dict:
+    #ORM row or response model -> {field: value} of the requested fields only
+    return {name: getattr(row, name) for name in names}
+
+
+def sparse_response(content, next_cursor=None) -> JSONResponse:
+    response = JSONResponse(jsonable_encoder(content))
+    set_next_cursor(response, next_cursor)
+    return response
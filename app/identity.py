@@ -0,0 +1,28 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+#account.user_id, job.job_id and appointment.appointment_id are identity columns,
+#so new ids come from a sequence (no `max(id) + 1` query, no race between inserts).
+#clients may still send their own id - then the sequence is moved past it,
+#otherwise a later generated id would collide with the explicit one
+
+def bump_identity(db: Session, column, value: int):
+    #only ever moves the sequence forward: an explicit id below the next generated one (a gap left by a delete)
+    #must not rewind it. reads last_value / is_called from the sequence itself - pg_sequence_last_value()
+    #is NULL after setval(..., false), which is how database_app.sql and the migrations seed it.
+    #read + setval is not atomic: the transaction-scoped advisory lock on the table oid serializes explicit-id
+    #writers of one table, a concurrent nextval() can still hand out an id in between (sequences are not
+    #transactional) - that insert then fails with a duplicate key, the sequence itself never goes backwards
+    params = {"table": column.table.name, "column": column.name, "value": value}
+    sequence = db.execute(text("SELECT pg_get_serial_sequence(:table, :column)"), params).scalar()
+    if sequence is None:
+        raise ValueError(f"{column.table.name}.{column.name} is not an identity column")
+    db.execute(text("SELECT pg_advisory_xact_lock(CAST(CAST(:table AS regclass) AS oid)::bigint)"), params)
+    #sequence comes from the catalog, already schema-qualified and quoted by pg_get_serial_sequence
+    db.execute(
+        text(
+            "SELECT setval(pg_get_serial_sequence(:table, :column), :value) "
+            f"FROM {sequence} WHERE :value >= last_value + is_called::int"
+        ),
+        params
+    )
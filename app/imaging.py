@@ -0,0 +1,31 @@
+from PIL import Image, ImageOps
+import os
+import tempfile
+
+#resizing code that runs in the photo process pool (app/photos.py).
+#kept free of app imports so spawned workers only load Pillow
+
+DERIVATIVE_QUALITY = 85
+
+
+def render_derivatives(src: str, targets):
+    #targets: [(dest path, longest side in px)]; the original is decoded once for all of them
+    targets = sorted(targets, key=lambda t: t[1], reverse=True)
+    with Image.open(src) as im:
+        #JPEG: let libjpeg decode at 1/2..1/8 scale instead of full resolution
+        im.draft("RGB", (targets[0][1], targets[0][1]))
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+
+        for dest, max_side in targets:
+            #biggest first, every next size is scaled down from the previous one
+            im.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    im.save(out, "JPEG", quality=DERIVATIVE_QUALITY, optimize=True)
+                os.replace(tmp_path, dest)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
@@ -0,0 +1,83 @@
+"""Managed index set.
+
+    python -m app.indexes           create missing indexes (CONCURRENTLY, tables stay writable)
+    python -m app.indexes --check   only list missing ones, exit code 1 if there are any
+
+The set is every Index declared in app/models. Fresh databases get them from
+Base.metadata.create_all / database_app.sql; databases created before an index
+was added are brought up to date with this command.
+"""
+import argparse
+import logging
+import re
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.database import Base, engine
+import app.models  # noqa: F401 - registers all tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+
+def managed_indexes():
+    return sorted((index for table in Base.metadata.sorted_tables for index in table.indexes), key=lambda i: i.name)
+
+
+def _index_state(conn) -> dict:
+    #index name -> valid? (a failed CREATE INDEX CONCURRENTLY leaves an invalid index behind)
+    rows = conn.execute(text("""
+        SELECT c.relname, i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema()
+    """))
+    return {name: valid for name, valid in rows}
+
+
+def missing_indexes(conn):
+    state = _index_state(conn)
+    return [index for index in managed_indexes() if not state.get(index.name, False)]
+
+
+def ensure_indexes(bind=engine):
+    #CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    created = []
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        state = _index_state(conn)
+        for index in missing_indexes(conn):
+            if index.name in state:
+                logger.warning(f"Rebuilding invalid index {index.name}")
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+            ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=conn.dialect))
+            conn.execute(text(re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl)))
+            created.append(index.name)
+    return created
+
+
+def warn_missing_indexes(bind=engine):
+    with bind.connect() as conn:
+        missing = [index.name for index in missing_indexes(conn)]
+    if missing:
+        logger.warning(f"Missing indexes: {', '.join(missing)}. Run `python -m app.indexes` to create them")
+    return missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only report missing indexes")
+    args = parser.parse_args()
+
+    if args.check:
+        with engine.connect() as conn:
+            missing = [index.name for index in missing_indexes(conn)]
+        print("\n".join(missing) if missing else "all managed indexes present")
+        raise SystemExit(1 if missing else 0)
+
+    for name in ensure_indexes():
+        print(f"created {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
-from app.routers import users, caregivers, members, addresses, jobs, job_applications, appointments
+from app.pagination import NEXT_CURSOR_HEADER
+from app.indexes import warn_missing_indexes
+from app.metrics import MetricsMiddleware, metrics_response
+from app.photos import shutdown_photo_pool
+from app.photo_gc import start_photo_gc, stop_photo_gc
+from app.reports import warn_missing_report_views, start_report_refresh, stop_report_refresh
+from app.matching import start_matching_refresh, stop_matching_refresh
+from app.static_files import CachedStaticFiles, IMMUTABLE_NAME
+from app.routers import users, caregivers, members, addresses, jobs, job_applications, appointments, admin, export, reports
 from app.models import User, Caregiver, Member, Address, Job, JobApplication, Appointment
 import os
 import markdown
 
 Base.metadata.create_all(bind=engine)
+warn_missing_indexes(engine) #create_all does not add new indexes to existing tables
+warn_missing_report_views(engine)
 
 app = FastAPI(
     title="Caregiver Management API",
@@ -23,10 +32,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+#added last = outermost, so it also times CORS and error responses
+app.add_middleware(MetricsMiddleware)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.mount("/templates", StaticFiles(directory="templates"), name="templates")
+app.add_event_handler("startup", start_photo_gc)
+app.add_event_handler("startup", start_report_refresh)
+app.add_event_handler("startup", start_matching_refresh)
+app.add_event_handler("shutdown", stop_photo_gc)
+app.add_event_handler("shutdown", stop_report_refresh)
+app.add_event_handler("shutdown", stop_matching_refresh)
+app.add_event_handler("shutdown", shutdown_photo_pool)
+
+app.mount("/static", CachedStaticFiles(directory="static", immutable_names=IMMUTABLE_NAME), name="static")
+app.mount("/templates", CachedStaticFiles(directory="templates"), name="templates")
 
 @app.get("/admin")
 async def admin_panel():
@@ -38,6 +58,12 @@ async def root():
     template_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates", "admin.html")
     return FileResponse(template_path)
 
+@app.get("/metrics")
+async def metrics():
+    #Prometheus text format: latency, SQL statements, DB time and pool wait per route
+    body, content_type = metrics_response()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/readme")
 async def readme():
     readme_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "README.md")
@@ -73,4 +99,7 @@ app.include_router(members.router)
 app.include_router(addresses.router)
 app.include_router(jobs.router)
 app.include_router(job_applications.router)
-app.include_router(appointments.router)
\ No newline at end of file
+app.include_router(appointments.router)
+app.include_router(export.router)
+app.include_router(reports.router)
+app.include_router(admin.router)
\ No newline at end of file
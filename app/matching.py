@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.database import engine
+from app.models import Caregiver, User, Appointment
+from app.models.enums import CaregivingType, AppointmentStatus
+
+#caregiver ranking for GET /jobs/{job_id}/matches.
+#every caregiver is scored from an in-memory columnar snapshot (one numpy array per feature)
+#instead of SQL, so ranking all of them is a few vectorized passes and an argpartition.
+#the snapshot is per process, like the entity cache:
+# - the first request builds it (a few seconds at 1M caregivers)
+# - routers call mark_dirty(caregiver ids) after writes that change a feature (caregiver type /
+#   rate, account city, appointments) - the next request reloads only those rows
+# - writes of other workers and ON DELETE CASCADE from members are picked up by a full rebuild
+#   in the background every MATCHING_REFRESH_SECONDS, requests keep using the old snapshot meanwhile
+#snapshots are loaded on a sync engine connection in the threadpool, in async mode too
+#score = TYPE * same caregiving type + CITY * same city as the member
+#      + RATE * cheapness (0 = most expensive, 1 = cheapest) + EXPERIENCE * log-scaled accepted hours,
+#a caregiver of another type always ranks below every caregiver of the required type
+
+logger = logging.getLogger(__name__)
+
+MATCHING_REFRESH_SECONDS = int(os.getenv("MATCHING_REFRESH_SECONDS", "300"))  #0 disables the background rebuild
+MAX_MATCHES = 100
+
+MATCH_WEIGHTS = {"type": 4.0, "city": 2.0, "rate": 1.0, "experience": 1.0}
+
+TYPES = list(CaregivingType)
+TYPE_CODES = {t.value: code for code, t in enumerate(TYPES)}
+
+
+class CaregiverSnapshot:
+    #arrays sorted by caregiver id; deleted caregivers stay as rows with alive = False until the next rebuild
+    def __init__(self, ids, types, cities, rates, hours, alive):
+        self.ids, self.types, self.cities, self.rates, self.hours, self.alive = ids, types, cities, rates, hours, alive
+        #features that depend on all rows, computed once per snapshot instead of per request
+        live_rates = rates[alive]
+        low, high = (live_rates.min(), live_rates.max()) if len(live_rates) else (0, 0)
+        self.cheapness = ((high - rates) / (high - low) if high > low else np.ones(len(rates))).astype(np.float32)
+        self.experience = (np.log1p(hours) / math.log1p(max(hours.max(initial=0), 1))).astype(np.float32)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+
+def sync_bind(db):
+    #engine of the request session, the psycopg2 engine in async mode
+    return engine if isinstance(db, AsyncSession) else db.get_bind()
+
+
+def _load_rows(bind, caregiver_ids=None) -> list:
+    #(caregiver_user_id, caregiving_type, hourly_rate, city, accepted hours) sorted by id. Core on a plain
+    #connection and the type as text: ORM rows and enum conversion cost more than the query at 1M rows.
+    #accepted hours come from ix_appointment_accepted (index-only)
+    accepted = select(Appointment.caregiver_user_id, func.sum(Appointment.work_hours).label("hours")).where(
+        Appointment.status == AppointmentStatus.ACCEPTED
+    )
+    query = select(
+        Caregiver.caregiver_user_id, cast(Caregiver.caregiving_type, String), Caregiver.hourly_rate, User.city
+    )
+    if caregiver_ids is not None:
+        accepted = accepted.where(Appointment.caregiver_user_id.in_(caregiver_ids))
+        query = query.where(Caregiver.caregiver_user_id.in_(caregiver_ids))
+    accepted = accepted.group_by(Appointment.caregiver_user_id).subquery()
+    query = (
+        query.add_columns(func.coalesce(accepted.c.hours, 0))
+        .join(User, User.user_id == Caregiver.caregiver_user_id)
+        .outerjoin(accepted, accepted.c.caregiver_user_id == Caregiver.caregiver_user_id)
+        .order_by(Caregiver.caregiver_user_id)
+    )
+    with bind.connect() as conn:
+        return conn.execute(query).all()
+
+
+class CaregiverMatcher:
+    def __init__(self):
+        self.snapshot = None
+        self.rebuilds = 0
+        self.patches = 0
+        self._dirty = set()
+        self._marked_during_rebuild = None
+        self._dirty_lock = threading.Lock()  #_dirty, _marked_during_rebuild and swapping in a patched snapshot
+        self._rebuild_lock = threading.Lock()
+        self._cities = {}  #city -> code, grows only
+        self._cities_lock = threading.Lock()
+
+    def mark_dirty(self, *caregiver_ids):
+        caregiver_ids = [i for i in caregiver_ids if i is not None]
+        with self._dirty_lock:
+            self._dirty.update(caregiver_ids)
+            if self._marked_during_rebuild is not None:
+                self._marked_during_rebuild.update(caregiver_ids)
+
+    def clear(self):
+        self.snapshot = None
+
+    def _city_code(self, city) -> int:
+        code = self._cities.get(city)
+        if code is None:
+            with self._cities_lock:
+                code = self._cities.setdefault(city, len(self._cities))
+        return code
+
+    def _columns(self, rows):
+        return (
+            np.array([r[0] for r in rows], dtype=np.int64),
+            np.array([TYPE_CODES[r[1]] for r in rows], dtype=np.int8),
+            np.array([self._city_code(r[3]) for r in rows], dtype=np.int32),
+            np.array([r[2] for r in rows], dtype=np.float32),
+            np.array([r[4] for r in rows], dtype=np.float32),
+        )
+
+    #region refresh
+    def rebuild(self, bind=engine, if_missing=False) -> CaregiverSnapshot:
+        #full load, sync (threadpool). ids marked while it loads may be missing from it - they stay dirty
+        with self._rebuild_lock:
+            if if_missing and self.snapshot is not None:
+                return self.snapshot  #built by a concurrent request
+            with self._dirty_lock:
+                self._marked_during_rebuild = set()
+            try:
+                ids, types, cities, rates, hours = self._columns(_load_rows(bind))
+                snapshot = CaregiverSnapshot(ids, types, cities, rates, hours, np.ones(len(ids), dtype=bool))
+            except Exception:
+                with self._dirty_lock:
+                    self._marked_during_rebuild = None
+                raise
+            with self._dirty_lock:
+                self._dirty, self._marked_during_rebuild = self._marked_during_rebuild, None
+                self.snapshot = snapshot
+            self.rebuilds += 1
+            return snapshot
+
+    def refresh(self, bind=engine) -> CaregiverSnapshot:
+        #snapshot with the dirty caregivers reloaded, sync (threadpool)
+        snapshot = self.snapshot
+        if snapshot is None:
+            return self.rebuild(bind, if_missing=True)
+        if not self._dirty:
+            return snapshot
+
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        try:
+            patched = self._patch(snapshot, sorted(dirty), _load_rows(bind, sorted(dirty)))
+        except Exception:
+            with self._dirty_lock:
+                self._dirty.update(dirty)
+            raise
+        self.patches += 1
+        with self._dirty_lock:
+            if self.snapshot is snapshot:
+                self.snapshot = patched
+            else:
+                #replaced meanwhile (rebuild or another patch) - keep that one, patch ours again next time
+                self._dirty.update(dirty)
+        return patched
+
+    def _patch(self, snapshot: CaregiverSnapshot, dirty: list, rows: list) -> CaregiverSnapshot:
+        #copy on write: requests still scoring the old snapshot are not affected
+        ids, types, cities, rates, hours, alive = (
+            a.copy() for a in (snapshot.ids, snapshot.types, snapshot.cities, snapshot.rates, snapshot.hours, snapshot.alive)
+        )
+        #dirty ids that are gone (caregiver deleted) become dead rows
+        dirty = np.array(dirty, dtype=np.int64)
+        positions = np.searchsorted(ids, dirty)
+        known = positions < len(ids)
+        known[known] = ids[positions[known]] == dirty[known]
+        alive[positions[known]] = False
+
+        if rows:
+            new_ids, new_types, new_cities, new_rates, new_hours = self._columns(rows)
+            positions = np.searchsorted(ids, new_ids)
+            existing = positions < len(ids)
+            existing[existing] = ids[positions[existing]] == new_ids[existing]
+            at = positions[existing]
+            types[at], cities[at], rates[at], hours[at], alive[at] = new_types[existing], new_cities[existing], new_rates[existing], new_hours[existing], True
+            added = ~existing
+            if added.any():
+                ids, types, cities, rates, hours, alive = (
+                    np.concatenate([old, new]) for old, new in [
+                        (ids, new_ids[added]), (types, new_types[added]), (cities, new_cities[added]),
+                        (rates, new_rates[added]), (hours, new_hours[added]), (alive, np.ones(int(added.sum()), dtype=bool)),
+                    ]
+                )
+                order = np.argsort(ids, kind="stable")
+                ids, types, cities, rates, hours, alive = (a[order] for a in (ids, types, cities, rates, hours, alive))
+
+        return CaregiverSnapshot(ids, types, cities, rates, hours, alive)
+    #endregion
+
+    def match(self, bind, caregiving_type: CaregivingType, city: str, k: int) -> list:
+        #sync, call in the threadpool
+        return self.top(self.refresh(bind), caregiving_type, city, k)
+
+    def top(self, snapshot: CaregiverSnapshot, caregiving_type: CaregivingType, city: str, k: int) -> list:
+        k = min(k, len(snapshot))
+        if k == 0:
+            return []
+        type_match = snapshot.types == TYPE_CODES[caregiving_type.value]
+        same_city = snapshot.cities == self._cities.get(city, -1)
+        score = (
+            MATCH_WEIGHTS["type"] * type_match + MATCH_WEIGHTS["city"] * same_city
+            + MATCH_WEIGHTS["rate"] * snapshot.cheapness + MATCH_WEIGHTS["experience"] * snapshot.experience
+        )
+        score[~snapshot.alive] = -np.inf
+
+        best = np.argpartition(-score, k - 1)[:k]
+        best = best[np.lexsort((snapshot.ids[best], -score[best]))]
+        return [
+            {
+                "caregiver_user_id": int(snapshot.ids[i]), "score": round(float(score[i]), 4),
+                "caregiving_type_match": bool(type_match[i]), "same_city": bool(same_city[i]),
+                "hourly_rate": int(snapshot.rates[i]), "accepted_hours": int(snapshot.hours[i]),
+            }
+            for i in best
+        ]
+
+
+caregiver_matcher = CaregiverMatcher()
+
+_task = None
+
+
+async def _rebuild_loop():
+    while True:
+        await asyncio.sleep(MATCHING_REFRESH_SECONDS)
+        if caregiver_matcher.snapshot is None:
+            continue  #nobody asked for matches yet
+        try:
+            await run_in_threadpool(caregiver_matcher.rebuild)
+        except Exception as e:
+            logger.error(f"Matching snapshot rebuild failed: {str(e)}", exc_info=True)
+
+
+def start_matching_refresh():
+    global _task
+    if MATCHING_REFRESH_SECONDS > 0 and _task is None:
+        _task = asyncio.get_running_loop().create_task(_rebuild_loop())
+
+
+def stop_matching_refresh():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
@@ -0,0 +1,168 @@
+from contextvars import ContextVar
+import logging
+import os
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST, multiprocess
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+#per-request SQL instrumentation, exposed at GET /metrics in Prometheus text format.
+#MetricsMiddleware puts a RequestStats into a context variable for every HTTP request.
+#cursor events of the instrumented engines and the timed pools add to it - the context
+#is copied into run_in_threadpool workers and AsyncSession greenlets, so they all see the
+#same object. SQL issued outside a request (background refresh, GC) and on raw DBAPI
+#connections (COPY of /export) is not counted.
+#with several uvicorn workers set PROMETHEUS_MULTIPROC_DIR (an empty directory) so /metrics
+#sums up all workers
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "20"))  #warn above this many statements per request, 0 disables
+
+registry = CollectorRegistry()
+
+LABELS = ["method", "route"]
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency, until the last body chunk is sent",
+    LABELS + ["status"], registry=registry,
+)
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements executed per request",
+    LABELS, buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500), registry=registry,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request",
+    LABELS, registry=registry,
+)
+REQUEST_POOL_WAIT_SECONDS = Histogram(
+    "http_request_db_pool_wait_seconds", "Time spent waiting for a pooled connection per request",
+    LABELS, buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30), registry=registry,
+)
+N_PLUS_ONE_REQUESTS = Counter(
+    "http_request_db_statements_over_threshold", "Requests that executed more than N_PLUS_ONE_THRESHOLD statements",
+    LABELS, registry=registry,
+)
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "db_seconds", "pool_wait_seconds")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+_current: ContextVar = ContextVar("request_stats", default=None)
+
+
+def current_stats():
+    #RequestStats of the running request, None outside of one
+    return _current.get()
+
+
+def current_route():
+    #"GET /users/{user_id}" of the running request, None outside of one
+    stats = _current.get()
+    if stats is None or stats.scope is None:
+        return None
+    return f"{stats.scope['method']} {_route_label(stats.scope)}"
+
+
+#region engine hooks
+class _TimedPool:
+    #connect() is where a checkout blocks when the pool is exhausted (includes pre-ping and new connections)
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.pool_wait_seconds += time.perf_counter() - started
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - context._metrics_started
+
+
+def instrument(engine):
+    #engine: sync Engine, for an AsyncEngine pass async_engine.sync_engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+#endregion
+
+
+def _route_label(scope) -> str:
+    #path template (/users/{user_id}), not the raw path - keeps the number of series bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def record_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+    REQUEST_STATEMENTS.labels(method, route).observe(stats.statements)
+    REQUEST_DB_SECONDS.labels(method, route).observe(stats.db_seconds)
+    REQUEST_POOL_WAIT_SECONDS.labels(method, route).observe(stats.pool_wait_seconds)
+    if N_PLUS_ONE_THRESHOLD and stats.statements > N_PLUS_ONE_THRESHOLD:
+        N_PLUS_ONE_REQUESTS.labels(method, route).inc()
+        logger.warning(
+            f"{method} {route} executed {stats.statements} SQL statements "
+            f"({stats.db_seconds * 1000:.1f} ms), more than N_PLUS_ONE_THRESHOLD={N_PLUS_ONE_THRESHOLD} - possible N+1 query"
+        )
+
+
+class MetricsMiddleware:
+    #plain ASGI middleware: streaming responses (/export) are measured until their last chunk
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            record_request(scope["method"], _route_label(scope), status, time.perf_counter() - started, stats)
+
+
+def metrics_response() -> tuple:
+    #(body, content type) for GET /metrics
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return generate_latest(collected), CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
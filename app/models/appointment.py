@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, Time, ForeignKey, CheckConstraint, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Identity, String, Date, Time, ForeignKey, CheckConstraint, Index, Computed, text, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSRANGE, INT8RANGE
+from sqlalchemy.orm import relationship, deferred
 from app.database import Base
 from app.models.enums import AppointmentStatus
 
@@ -31,15 +32,46 @@ class Appointment(Base):
     __tablename__ = 'appointment'
     __table_args__ = (
         CheckConstraint("work_hours > 0"),
+        #FK indexes: ON DELETE CASCADE from caregiver/member and the joins look rows up by these
+        Index("ix_appointment_caregiver", "caregiver_user_id"),
+        Index("ix_appointment_member", "member_user_id"),
+        #reporting queries only look at accepted appointments, work_hours included for index-only SUM()
+        Index("ix_appointment_accepted", "caregiver_user_id", postgresql_where=text("status = 'ACCEPTED'"), postgresql_include=["work_hours"]),
+        #no double booking: PENDING / ACCEPTED appointments of one caregiver must not overlap, checked by a GiST
+        #index lookup per insert/update. (caregiver_user_id WITH =, slot WITH &&) would need the btree_gist
+        #extension, so caregiver and time are packed into one int8range instead (see caregiver_slot)
+        ExcludeConstraint(
+            ("caregiver_slot", "&&"), name="ex_appointment_caregiver_slot", using="gist",
+            where=text("status IN ('PENDING', 'ACCEPTED')"),
+        ),
+        #caregiver_slot is only unambiguous while start and end stay within 0 .. 10^10 epoch seconds (2286-11-20 17:46:40)
+        CheckConstraint(
+            "appointment_date >= DATE '1970-01-01' AND appointment_date + appointment_time + make_interval(hours => work_hours) < TIMESTAMP '2286-11-20'",
+            name="ck_appointment_slot_range",
+        ),
     )
     
-    appointment_id = Column(Integer, primary_key=True)
+    appointment_id = Column(Integer, Identity(), primary_key=True) #GENERATED BY DEFAULT AS IDENTITY, explicit ids are still accepted
     caregiver_user_id = Column(Integer, ForeignKey('caregiver.caregiver_user_id', ondelete='CASCADE'), nullable=False)
     member_user_id = Column(Integer, ForeignKey('member.member_user_id', ondelete='CASCADE'), nullable=False)
     appointment_date = Column(Date, nullable=False)
     appointment_time = Column(Time, nullable=False)
     work_hours = Column(Integer, nullable=False)
-    status = Column(SQLEnum(AppointmentStatus, native_enum=True), nullable=False) 
+    status = Column(SQLEnum(AppointmentStatus, name="appointment_status_enum", native_enum=True), nullable=False) 
+    #generated by the database, not loaded unless asked for
+    slot = deferred(Column(TSRANGE, Computed(
+        "tsrange(appointment_date + appointment_time, appointment_date + appointment_time + make_interval(hours => work_hours))",
+        persisted=True,
+    )))
+    #caregiver_user_id * 10^10 + epoch seconds of start / end: ranges of different caregivers never overlap
+    #as long as the appointment lies between 1970 and 2286-11-20 (ck_appointment_slot_range rejects anything
+    #else), so && on this column alone means same caregiver and overlapping time
+    caregiver_slot = deferred(Column(INT8RANGE, Computed(
+        "int8range("
+        "caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint, "
+        "caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint + work_hours * 3600)",
+        persisted=True,
+    )))
     
     caregiver = relationship("Caregiver", back_populates="appointments")
     member = relationship("Member", back_populates="appointments")
\ No newline at end of file
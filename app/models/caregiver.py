@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, CheckConstraint, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, ForeignKey, CheckConstraint, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.enums import CaregivingType, Gender
@@ -53,12 +53,15 @@ class Caregiver(Base):
     __tablename__ = 'caregiver'
     __table_args__ = (
         CheckConstraint("hourly_rate >= 0"),
+        #GET /caregivers/search: equality filter first, then the sort key (rate, id) used by the cursor
+        Index("ix_caregiver_type_rate", "caregiving_type", "hourly_rate", "caregiver_user_id"),
+        Index("ix_caregiver_rate", "hourly_rate", "caregiver_user_id"),
     )
     
     caregiver_user_id = Column(Integer, ForeignKey('account.user_id', ondelete='CASCADE'), primary_key=True)
     photo = Column(String)
-    gender = Column(SQLEnum(Gender, native_enum=True), nullable=False)
-    caregiving_type = Column(SQLEnum(CaregivingType, native_enum=True), nullable=False)
+    gender = Column(SQLEnum(Gender, name="gender_enum", native_enum=True), nullable=False)
+    caregiving_type = Column(SQLEnum(CaregivingType, name="caregiving_type_enum", native_enum=True), nullable=False)
     hourly_rate = Column(Integer, nullable=False)
     
     user = relationship("User", back_populates="caregiver")
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, Date, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, Identity, String, Text, Date, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.enums import CaregivingType
+from app.search import tsvector
 
 #not valid, made enums in database.sql:
 #in database it is TEXT, so I have to process enum to string
@@ -29,13 +30,22 @@ from app.models.enums import CaregivingType
 
 class Job(Base):
     __tablename__ = 'job'
+    __table_args__ = (
+        Index("ix_job_member", "member_user_id"), #FK index
+        Index("ix_job_type_date", "required_caregiving_type", "date_posted"), #newest jobs of a caregiving type
+        Index("ix_job_applicant_count", "applicant_count", "job_id"), #GET /jobs/?sort=applicant_count
+    )
     
-    job_id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, Identity(), primary_key=True) #GENERATED BY DEFAULT AS IDENTITY, explicit ids are still accepted
     member_user_id = Column(Integer, ForeignKey('member.member_user_id', ondelete='CASCADE'), nullable=False)
-    required_caregiving_type = Column(SQLEnum(CaregivingType, native_enum=True), nullable=False)
+    required_caregiving_type = Column(SQLEnum(CaregivingType, name="caregiving_type_enum", native_enum=True), nullable=False)
     other_requirements = Column(Text)
     date_posted = Column(Date, nullable=False)
+    applicant_count = Column(Integer, nullable=False, default=0, server_default="0") #kept by the routers, see app/applicant_counts.py
     
     member = relationship("Member", back_populates="jobs")
     job_applications = relationship("JobApplication", back_populates="job", cascade="all, delete-orphan")
 
+#GET /jobs/search and Query 5.2, queries must filter on exactly this expression
+requirements_tsvector = tsvector(Job.other_requirements)
+Index("ix_job_requirements_fts", requirements_tsvector, postgresql_using="gin")
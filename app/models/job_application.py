@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, Date, ForeignKey
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class JobApplication(Base):
     
     __tablename__ = 'job_application'
+    __table_args__ = (
+        Index("ix_job_application_job", "job_id"), #FK index, caregiver_user_id side is covered by the primary key
+    )
     
     caregiver_user_id = Column(Integer, ForeignKey('caregiver.caregiver_user_id', ondelete='CASCADE'), primary_key=True)
     job_id = Column(Integer, ForeignKey('job.job_id', ondelete='CASCADE'), primary_key=True)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, Text, ForeignKey
+from sqlalchemy import Column, Integer, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.search import tsvector
 
 class Member(Base):
     __tablename__ = 'member'
@@ -14,3 +15,6 @@ class Member(Base):
     jobs = relationship("Job", back_populates="member", cascade="all, delete-orphan")
     appointments = relationship("Appointment", back_populates="member", cascade="all, delete-orphan")
 
+#GET /members/search and Query 5.4, queries must filter on exactly this expression
+house_rules_tsvector = tsvector(Member.house_rules)
+Index("ix_member_house_rules_fts", house_rules_tsvector, postgresql_using="gin")
@@ -1,11 +1,14 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, Identity, String, Text, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class User(Base):
     __tablename__ = 'account'
+    __table_args__ = (
+        Index("ix_account_city", "city", "user_id"), #caregiver search by city
+    )
     
-    user_id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, Identity(), primary_key=True) #GENERATED BY DEFAULT AS IDENTITY, explicit ids are still accepted
     email = Column(String, unique=True, nullable=False) 
     given_name = Column(String, nullable=False)
     surname = Column(String, nullable=False)
@@ -0,0 +1,71 @@
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from datetime import date
+import base64
+import binascii
+import json
+
+#keyset (cursor) pagination helpers for list endpoints.
+#cursor = url-safe base64 of json list with the sort key of the last returned row,
+#next page is `WHERE (key columns) > (cursor values) ORDER BY key columns LIMIT n`,
+#so every page is one index range scan no matter how deep it is
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 1000
+
+CURSOR_DESCRIPTION = f"Opaque cursor from the {NEXT_CURSOR_HEADER} response header of the previous page"
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match sort key")
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _coerce(column, value):
+    #values come from the client, so cast them to the column type before they reach SQL
+    python_type = column.type.python_type
+    if python_type is date:
+        return date.fromisoformat(value)
+    if isinstance(value, (dict, list, bool)) or value is None:
+        raise ValueError("invalid cursor value")
+    return python_type(value)
+
+
+def keyset_page(query, columns, cursor, limit, skip=0, descending=False):
+    #columns must form a unique key, returns (rows, next_cursor or None).
+    #descending walks the same index backwards (all columns in one direction, so row comparison still works).
+    #skip is the old offset paging, kept only for clients that still send it
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            key, after = columns[0], values[0]
+        else:
+            key, after = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < after if descending else key > after)
+
+    query = query.order_by(*[column.desc() if descending else column for column in columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_cursor
+
+
+def set_next_cursor(response: Response, next_cursor):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
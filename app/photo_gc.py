@@ -0,0 +1,160 @@
+"""Photo store garbage collection.
+
+    python -m app.photo_gc             delete unreferenced photos and resized variants
+    python -m app.photo_gc --dry-run   only list them
+
+Photos are stored once per content (app/photos.py) and can be shared by several
+caregivers, so handlers never unlink them. A stored photo is garbage when no
+CAREGIVER.photo references it and it is older than PHOTO_GC_GRACE_SECONDS (uploads
+are written before their row is committed); a resized variant when its original is
+no longer referenced; an unfinished upload (*.part) when it is older than the grace
+period too - the worker that was writing it was killed. The app runs the same pass every PHOTO_GC_INTERVAL_SECONDS.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import engine
+from app.photos import static_path, INCOMING_DIR, STORED_NAME, LEGACY_NAME, DERIVED_NAME, photo_digest
+
+logger = logging.getLogger(__name__)
+
+PHOTO_GC_INTERVAL_SECONDS = int(os.getenv("PHOTO_GC_INTERVAL_SECONDS", "3600"))  #0 disables the background pass
+PHOTO_GC_GRACE_SECONDS = int(os.getenv("PHOTO_GC_GRACE_SECONDS", "3600"))
+PHOTO_GC_LOCK = 0x70686f746f  #pg advisory lock id, one pass at a time across workers
+
+_task = None
+
+
+def referenced_photos(conn) -> set:
+    return set(conn.execute(text("SELECT DISTINCT photo FROM CAREGIVER WHERE photo IS NOT NULL")).scalars())
+
+
+def _shard_files(root: Path):
+    #ab/cd/file inside root, relative names
+    for first in os.scandir(root):
+        if len(first.name) != 2 or not first.is_dir():
+            continue
+        for second in os.scandir(first.path):
+            if len(second.name) != 2 or not second.is_dir():
+                continue
+            for entry in os.scandir(second.path):
+                if entry.is_file():
+                    yield f"{first.name}/{second.name}/{entry.name}", entry.path
+
+
+def _photo_files(root: Path):
+    for name, path in _shard_files(root):
+        if STORED_NAME.match(name):
+            yield name, path
+    for entry in os.scandir(root):
+        if entry.is_file() and LEGACY_NAME.match(entry.name):
+            yield entry.name, entry.path
+
+
+def _remove_if_old(path: str, cutoff: float, dry_run: bool) -> bool:
+    try:
+        if os.stat(path).st_mtime > cutoff:
+            return False
+        if not dry_run:
+            os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def collect_garbage(bind=engine, root: Path = static_path, grace_seconds: int = None, dry_run: bool = False):
+    #returns the removed names relative to root, None if another pass holds the lock
+    grace_seconds = PHOTO_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    with bind.connect() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": PHOTO_GC_LOCK}).scalar():
+            return None
+        try:
+            #references first: a file stored after this point is younger than the cutoff
+            cutoff = time.time() - grace_seconds
+            referenced = referenced_photos(conn)
+            conn.rollback()
+            return _sweep(root, referenced, cutoff, dry_run)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": PHOTO_GC_LOCK})
+            conn.commit()
+
+
+def _sweep(root: Path, referenced: set, cutoff: float, dry_run: bool):
+    removed = []
+    live_digests = set()
+    for name, path in _photo_files(root):
+        if name in referenced:
+            live_digests.add(photo_digest(name, root))
+        elif _remove_if_old(path, cutoff, dry_run):
+            removed.append(name)
+
+    #seed photos and other referenced files outside the store still have variants
+    for name in referenced:
+        if not STORED_NAME.match(name) and not LEGACY_NAME.match(name):
+            try:
+                live_digests.add(photo_digest(name, root))
+            except FileNotFoundError:
+                pass
+
+    derived = root / "derived"
+    if derived.is_dir():
+        for name, path in _shard_files(derived):
+            m = DERIVED_NAME.match(os.path.basename(name))
+            if m and m.group(1) not in live_digests and _remove_if_old(path, cutoff, dry_run):
+                removed.append(f"derived/{name}")
+
+    incoming = root / INCOMING_DIR
+    if incoming.is_dir():
+        for entry in os.scandir(incoming):
+            if entry.name.endswith(".part") and entry.is_file() and _remove_if_old(entry.path, cutoff, dry_run):
+                removed.append(f"{INCOMING_DIR}/{entry.name}")
+    return removed
+
+
+async def _gc_loop():
+    while True:
+        await asyncio.sleep(PHOTO_GC_INTERVAL_SECONDS)
+        try:
+            removed = await run_in_threadpool(collect_garbage)
+            if removed:
+                logger.info(f"Photo gc removed {len(removed)} files")
+        except Exception as e:
+            logger.error(f"Photo gc failed: {str(e)}", exc_info=True)
+
+
+def start_photo_gc():
+    global _task
+    if PHOTO_GC_INTERVAL_SECONDS > 0 and _task is None:
+        _task = asyncio.get_running_loop().create_task(_gc_loop())
+
+
+def stop_photo_gc():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="only list files that would be removed")
+    parser.add_argument("--grace-seconds", type=int, default=None, help=f"default PHOTO_GC_GRACE_SECONDS ({PHOTO_GC_GRACE_SECONDS})")
+    args = parser.parse_args()
+
+    removed = collect_garbage(grace_seconds=args.grace_seconds, dry_run=args.dry_run)
+    if removed is None:
+        print("another photo gc pass is running")
+        raise SystemExit(1)
+    for name in removed:
+        print(f"{'would remove' if args.dry_run else 'removed'} {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import functools
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+
+from app.database import STATIC_FOLDER
+from app.imaging import render_derivatives
+
+logger = logging.getLogger(__name__)
+
+#caregiver photo files on disk, stored by content.
+#uploads are copied PHOTO_CHUNK_BYTES at a time into a temp file on the same filesystem while
+#being hashed, then renamed (os.replace is atomic) to ab/cd/{sha256}.ext under STATIC_FOLDER, so memory
+#per upload is one chunk, readers never see a half-written photo and a failed or too big upload
+#leaves nothing behind. identical uploads end up as one file; two levels of 256 shard directories
+#keep every directory small. CAREGIVER.photo holds the relative path and is the only reference:
+#handlers never unlink, app/photo_gc.py removes files no row points to.
+#resized variants (PHOTO_SIZES) are rendered on a process pool and saved in static/derived under
+#the digest of the original as well, so a photo is resized once no matter how many caregivers use it.
+#they are made right after upload and, if missing, on first request
+
+MAX_PHOTO_BYTES = int(os.getenv("MAX_PHOTO_BYTES", str(10 * 1024 * 1024)))
+PHOTO_CHUNK_BYTES = 256 * 1024
+
+static_path = Path(STATIC_FOLDER)
+#unfinished uploads. inside STATIC_FOLDER so os.replace stays on one mount (docker-compose bind-mounts
+#only ./static); CachedStaticFiles never serves dot paths, so /static/.incoming/... is a 404
+INCOMING_DIR = ".incoming"
+incoming_path = static_path / INCOMING_DIR
+incoming_path.mkdir(parents=True, exist_ok=True)
+
+PHOTO_SIZES = {"thumb": 128, "medium": 512}  #longest side in px
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+derived_path = static_path / "derived"
+derived_path.mkdir(parents=True, exist_ok=True)
+
+STORED_NAME = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$")
+LEGACY_NAME = re.compile(r"^\d+_[0-9a-f]{32}\.\w+$")  #{user_id}_{uuid}.ext, uploads before the content store
+DERIVED_NAME = re.compile(r"^([0-9a-f]{64})_\d+\.jpg$")
+_EXTENSION = re.compile(r"^\.\w{1,10}$")
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = {}  #derived path -> future of the resize that is writing it
+_pending_lock = threading.Lock()
+
+
+def shard(digest: str) -> str:
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _store(src, extension: str, max_bytes: int) -> str:
+    fd, tmp_path = tempfile.mkstemp(dir=incoming_path, suffix=".part")
+    h = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(PHOTO_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Photo is larger than {max_bytes} bytes")
+                h.update(chunk)
+                out.write(chunk)
+
+        digest = h.hexdigest()
+        photo_filename = f"{shard(digest)}/{digest}{extension}"
+        dest = static_path / photo_filename
+        if dest.exists():
+            #already stored. fresh mtime keeps the gc grace period away from it until the row is committed
+            os.utime(dest)
+            _unlink(tmp_path)
+        else:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, dest)
+    except BaseException:
+        _unlink(tmp_path)
+        raise
+    return photo_filename
+
+
+async def save_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> str:
+    #returns the stored name for CAREGIVER.photo; 413 if the upload is bigger than max_bytes (default MAX_PHOTO_BYTES).
+    #whole copy is one threadpool call, the event loop never touches the file
+    extension = os.path.splitext(upload.filename or "")[1].lower()
+    if not _EXTENSION.match(extension):
+        extension = ".jpg"
+    await upload.seek(0)
+    return await run_in_threadpool(_store, upload.file, extension, max_bytes or MAX_PHOTO_BYTES)
+
+
+#region derivatives
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            #spawn, not fork: the server process runs threads and holds db connections
+            _pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_photo_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+@functools.lru_cache(maxsize=4096)
+def _hash_file(path: str, mtime_ns: int, size: int) -> str:
+    #mtime and size are part of the key, a replaced file is hashed again
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(PHOTO_CHUNK_BYTES):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def photo_digest(photo_filename: str, root: Optional[Path] = None) -> str:
+    #blocking. stored names carry their digest, other (legacy / seed) files are hashed once per process
+    src = (root or static_path) / photo_filename
+    st = src.stat()
+    m = STORED_NAME.match(photo_filename)
+    return m.group(1) if m else _hash_file(str(src), st.st_mtime_ns, st.st_size)
+
+
+def derived_name(digest: str, max_side: int) -> str:
+    return f"{shard(digest)}/{digest}_{max_side}.jpg"
+
+
+def _derived_targets(photo_filename: str, sizes):
+    #blocking. returns source path, {size: derived path} and the missing ones
+    digest = photo_digest(photo_filename)
+    targets = {size: derived_path / derived_name(digest, PHOTO_SIZES[size]) for size in sizes}
+    missing = [(str(path), PHOTO_SIZES[size]) for size, path in targets.items() if not path.exists()]
+    if missing:
+        targets[sizes[0]].parent.mkdir(parents=True, exist_ok=True)
+    return str(static_path / photo_filename), targets, missing
+
+
+def _submit(src: str, missing):
+    #one resize per derived file: requests for a file that is already being rendered wait for that job
+    futures = []
+    todo = []
+    with _pending_lock:
+        for dest, max_side in missing:
+            if dest in _pending:
+                futures.append(_pending[dest])
+            else:
+                todo.append((dest, max_side))
+        if todo:
+            future = _get_pool().submit(render_derivatives, src, todo)
+            for dest, _ in todo:
+                _pending[dest] = future
+            future.add_done_callback(lambda f: [_pending.pop(dest, None) for dest, _ in todo])
+            futures.append(future)
+    return futures
+
+
+async def derive(photo_filename: str, sizes) -> dict:
+    #{size: path of the resized file}, rendering whatever is missing.
+    #FileNotFoundError if the original is gone, other OSError if it is not a readable image
+    src, targets, missing = await run_in_threadpool(_derived_targets, photo_filename, list(sizes))
+    if missing:
+        for future in _submit(src, missing):
+            await asyncio.wrap_future(future)
+    return targets
+
+
+async def prepare_derivatives(photo_filename: str):
+    #background task after an upload
+    try:
+        await derive(photo_filename, PHOTO_SIZES)
+    except Exception as e:
+        logger.warning(f"Could not create resized variants of {photo_filename}: {str(e)}")
+#endregion
@@ -0,0 +1,214 @@
+"""Materialized reporting views (Queries 6.1 - 7 of database_queries.py).
+
+    python -m app.reports            create missing views, then refresh all of them
+    python -m app.reports --check    only list missing views, exit code 1 if there are any
+
+Views are defined in REPORT_VIEWS and mirrored in database_app.sql. Each has a unique
+index, so REFRESH MATERIALIZED VIEW CONCURRENTLY rebuilds it while /reports/* keeps
+reading the previous version. All views are refreshed in one transaction, every
+REPORTS_REFRESH_SECONDS by the app.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, Numeric, String, DateTime, text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+REPORTS_REFRESH_SECONDS = int(os.getenv("REPORTS_REFRESH_SECONDS", "300"))  #0 disables the background refresh
+REPORTS_LOCK = 0x7265706f7274  #pg advisory lock id, one refresh at a time across workers
+
+#(name, query, index statements) in refresh order - report_accepted_totals is built from
+#report_caregiver_accepted, so its refresh reads one row per caregiver instead of APPOINTMENT
+REPORT_VIEWS = [
+    ("report_job_applicants", """
+        SELECT j.job_id, u.given_name, u.surname, COUNT(ja.caregiver_user_id)::integer AS number_of_applicants
+        FROM JOB j
+        JOIN account u ON j.member_user_id = u.user_id
+        LEFT JOIN JOB_APPLICATION ja ON j.job_id = ja.job_id
+        GROUP BY j.job_id, u.given_name, u.surname
+    """, [
+        "CREATE UNIQUE INDEX ux_report_job_applicants ON report_job_applicants (job_id)",
+    ]),
+    ("report_caregiver_accepted", """
+        SELECT c.caregiver_user_id, u.given_name, u.surname, c.hourly_rate,
+            COUNT(*)::integer AS accepted_appointments,
+            SUM(a.work_hours)::bigint AS accepted_hours,
+            SUM(c.hourly_rate::bigint * a.work_hours)::bigint AS accepted_cost
+        FROM APPOINTMENT a
+        JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+        JOIN account u ON c.caregiver_user_id = u.user_id
+        WHERE a.status = 'ACCEPTED'
+        GROUP BY c.caregiver_user_id, u.given_name, u.surname, c.hourly_rate
+    """, [
+        "CREATE UNIQUE INDEX ux_report_caregiver_accepted ON report_caregiver_accepted (caregiver_user_id)",
+        "CREATE INDEX ix_report_caregiver_accepted_rate ON report_caregiver_accepted (hourly_rate, caregiver_user_id)",
+    ]),
+    ("report_accepted_totals", """
+        SELECT 1 AS id,
+            COALESCE(SUM(accepted_appointments), 0)::bigint AS accepted_appointments,
+            COALESCE(SUM(accepted_hours), 0)::bigint AS total_hours,
+            SUM(hourly_rate::numeric * accepted_appointments) / NULLIF(SUM(accepted_appointments), 0) AS average_hourly_rate,
+            now() AS refreshed_at
+        FROM report_caregiver_accepted
+    """, [
+        "CREATE UNIQUE INDEX ux_report_accepted_totals ON report_accepted_totals (id)",
+    ]),
+    ("report_appointment_cost", """
+        SELECT a.appointment_id, a.caregiver_user_id, u.given_name, u.surname, c.hourly_rate, a.work_hours,
+            c.hourly_rate::bigint * a.work_hours AS total_cost
+        FROM APPOINTMENT a
+        JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+        JOIN account u ON c.caregiver_user_id = u.user_id
+        WHERE a.status = 'ACCEPTED'
+    """, [
+        "CREATE UNIQUE INDEX ux_report_appointment_cost ON report_appointment_cost (appointment_id)",
+    ]),
+]
+
+#read side for the routers. separate MetaData: Base.metadata.create_all must not create these as tables
+report_metadata = MetaData()
+
+job_applicants = Table(
+    "report_job_applicants", report_metadata,
+    Column("job_id", Integer, primary_key=True),
+    Column("given_name", String),
+    Column("surname", String),
+    Column("number_of_applicants", Integer),
+)
+
+caregiver_accepted = Table(
+    "report_caregiver_accepted", report_metadata,
+    Column("caregiver_user_id", Integer, primary_key=True),
+    Column("given_name", String),
+    Column("surname", String),
+    Column("hourly_rate", Integer),
+    Column("accepted_appointments", Integer),
+    Column("accepted_hours", BigInteger),
+    Column("accepted_cost", BigInteger),
+)
+
+accepted_totals = Table(
+    "report_accepted_totals", report_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("accepted_appointments", BigInteger),
+    Column("total_hours", BigInteger),
+    Column("average_hourly_rate", Numeric),
+    Column("refreshed_at", DateTime(timezone=True)),
+)
+
+appointment_costs = Table(
+    "report_appointment_cost", report_metadata,
+    Column("appointment_id", Integer, primary_key=True),
+    Column("caregiver_user_id", Integer),
+    Column("given_name", String),
+    Column("surname", String),
+    Column("hourly_rate", Integer),
+    Column("work_hours", Integer),
+    Column("total_cost", BigInteger),
+)
+
+_task = None
+
+
+def missing_report_views(conn):
+    existing = set(conn.execute(text("SELECT matviewname FROM pg_matviews WHERE schemaname = current_schema()")).scalars())
+    return [name for name, _, _ in REPORT_VIEWS if name not in existing]
+
+
+def create_report_views(bind=engine):
+    created = []
+    with bind.begin() as conn:
+        missing = missing_report_views(conn)
+        for name, query, indexes in REPORT_VIEWS:
+            if name in missing:
+                conn.execute(text(f"CREATE MATERIALIZED VIEW {name} AS {query}"))
+                for statement in indexes:
+                    conn.execute(text(statement))
+                created.append(name)
+    return created
+
+
+def refresh_report_views(db):
+    #db: Session or Connection. one transaction: readers switch to the new version of all views at once,
+    #and the transaction-level lock cannot outlive it. returns {view: ms}, None if another refresh is running
+    try:
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": REPORTS_LOCK}).scalar():
+            db.rollback()
+            return None
+        timings = {}
+        for name, _, _ in REPORT_VIEWS:
+            started = time.perf_counter()
+            db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        db.commit()
+        return timings
+    except Exception:
+        db.rollback()
+        raise
+
+
+def warn_missing_report_views(bind=engine):
+    with bind.connect() as conn:
+        missing = missing_report_views(conn)
+    if missing:
+        logger.warning(f"Missing report views: {', '.join(missing)}. Run `python -m app.reports` to create them")
+    return missing
+
+
+def _refresh():
+    with engine.connect() as conn:
+        return refresh_report_views(conn)
+
+
+async def _refresh_loop():
+    while True:
+        await asyncio.sleep(REPORTS_REFRESH_SECONDS)
+        try:
+            await run_in_threadpool(_refresh)
+        except Exception as e:
+            logger.error(f"Report refresh failed: {str(e)}", exc_info=True)
+
+
+def start_report_refresh():
+    global _task
+    if REPORTS_REFRESH_SECONDS > 0 and _task is None:
+        _task = asyncio.get_running_loop().create_task(_refresh_loop())
+
+
+def stop_report_refresh():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        _task = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--check", action="store_true", help="only report missing views")
+    args = parser.parse_args()
+
+    if args.check:
+        with engine.connect() as conn:
+            missing = missing_report_views(conn)
+        print("\n".join(missing) if missing else "all report views present")
+        raise SystemExit(1 if missing else 0)
+
+    for name in create_report_views():
+        print(f"created {name}")
+    timings = _refresh()
+    if timings is None:
+        print("another refresh is running")
+        raise SystemExit(1)
+    for name, ms in timings.items():
+        print(f"refreshed {name} in {ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, Form, Query
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 import logging
@@ -7,40 +7,46 @@ from typing import List, Optional
 
 from app.models import Address, Member
 from app.schemas import AddressCreate, AddressUpdate, AddressResponse
-from app.database import get_db
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.database import get_db, run_db, DbSession
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/addresses", tags=["addresses"])
 
-#region create 
+#region create
+def _create_address(db: Session, member_user_id: int, house_number: str, street: str, town: str):
+    m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
+    if not m:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    if db.query(Address).filter(Address.member_user_id == member_user_id).first():
+        raise HTTPException(status_code=400, detail="Address already exists for this member")
+
+    a = Address(
+        member_user_id=member_user_id,
+        house_number=house_number,
+        street=street,
+        town=town
+    )
+
+    db.add(a)
+    db.commit()
+    db.refresh(a)
+    return a
+
 @router.post("/", response_model=AddressResponse, status_code=201)
-def create_address(
+async def create_address(
     member_user_id: int = Form(...),
     house_number: str = Form(...),
     street: str = Form(...),
     town: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
-        if not m:
-            raise HTTPException(status_code=404, detail="Member not found")
-        
-        if db.query(Address).filter(Address.member_user_id == member_user_id).first():
-            raise HTTPException(status_code=400, detail="Address already exists for this member")
-        
-        a = Address(
-            member_user_id=member_user_id,
-            house_number=house_number,
-            street=street,
-            town=town
-        )
-
-        db.add(a)
-        db.commit()
-        db.refresh(a)
-        return a
+        return await run_db(db, _create_address, member_user_id, house_number, street, town)
     except OperationalError as e:
         logger.error(f"Database connection error in POST /addresses/: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -50,16 +56,32 @@ def create_address(
 #endregion
 
 
-#region get one 
+#region get one
+def _get_address(db: Session, member_user_id: int):
+    a = db.query(Address).filter(Address.member_user_id == member_user_id).first()
+
+    if not a:
+        raise HTTPException(status_code=404, detail="Address not found")
+
+    return a
+
+async def _load_address(db: DbSession, member_user_id: int):
+    return AddressResponse.model_validate(await run_db(db, _get_address, member_user_id))
+
 @router.get("/{member_user_id}", response_model=AddressResponse)
-def get_address(member_user_id: int, db: Session = Depends(get_db)):
+async def get_address(
+    member_user_id: int,
+    fields: Optional[str] = Query(None, description=fields_description(AddressResponse)),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, AddressResponse)
     try:
-        a = db.query(Address).filter(Address.member_user_id == member_user_id).first()
-        
-        if not a:
-            raise HTTPException(status_code=404, detail="Address not found")
-
-        return a
+        a = await entity_cache.read_through(
+            ("address", member_user_id),
+            lambda: _load_address(db, member_user_id),
+            tags=[("member", member_user_id)]
+        )
+        return a if fields is None else sparse_response(project(a, fields))
     except OperationalError as e:
         logger.error(f"Database connection error in GET /addresses/{member_user_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -69,10 +91,25 @@ def get_address(member_user_id: int, db: Session = Depends(get_db)):
 #endregion
 
 #region get all
+def _get_addresses(db: Session, fields: Optional[list], cursor: Optional[str], limit: int, skip: int):
+    a, next_cursor = keyset_page(load_fields(db.query(Address), Address, fields), [Address.member_user_id], cursor, limit, skip)
+    return (a if fields is None else [project(row, fields) for row in a]), next_cursor
+
 @router.get("/", response_model=List[AddressResponse])
-def get_addresses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_addresses(
+    response: Response,
+    fields: Optional[str] = Query(None, description=fields_description(AddressResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, AddressResponse)
     try:
-        a = db.query(Address).offset(skip).limit(limit).all()
+        a, next_cursor = await run_db(db, _get_addresses, fields, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(a, next_cursor)
+        set_next_cursor(response, next_cursor)
         return a
     except OperationalError as e:
         logger.error(f"Database connection error in GET /addresses/: {str(e)}", exc_info=True)
@@ -83,28 +120,33 @@ def get_addresses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
 #endregion
 
 #region update
+def _update_address(db: Session, member_user_id: int, house_number, street, town):
+    a = db.query(Address).filter(Address.member_user_id == member_user_id).first()
+    if not a:
+        raise HTTPException(status_code=404, detail="Address not found")
+
+    if house_number is not None:
+        a.house_number = house_number
+    if street is not None:
+        a.street = street
+    if town is not None:
+        a.town = town
+
+    db.commit()
+    db.refresh(a)
+    return a
+
 @router.put("/{member_user_id}", response_model=AddressResponse)
-def update_address(
+async def update_address(
     member_user_id: int,
     house_number: Optional[str] = Query(None),
     street: Optional[str] = Query(None),
     town: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        a = db.query(Address).filter(Address.member_user_id == member_user_id).first()
-        if not a:
-            raise HTTPException(status_code=404, detail="Address not found")
-        
-        if house_number is not None:
-            a.house_number = house_number
-        if street is not None:
-            a.street = street
-        if town is not None:
-            a.town = town
-        
-        db.commit()
-        db.refresh(a)
+        a = await run_db(db, _update_address, member_user_id, house_number, street, town)
+        entity_cache.delete(("address", member_user_id))
         return a
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /addresses/{member_user_id}: {str(e)}", exc_info=True)
@@ -115,17 +157,20 @@ def update_address(
 #endregion
 
 #region delete
+def _delete_address(db: Session, member_user_id: int):
+    a = db.query(Address).filter(Address.member_user_id == member_user_id).first()
+
+    if not a:
+        raise HTTPException(status_code=404, detail="Address not found")
+
+    db.delete(a)
+    db.commit()
+
 @router.delete("/{member_user_id}", status_code=204)
-def delete_address(member_user_id: int, db: Session = Depends(get_db)):
+async def delete_address(member_user_id: int, db: DbSession = Depends(get_db)):
     try:
-        a = db.query(Address).filter(Address.member_user_id == member_user_id).first()
-        
-        if not a:
-            raise HTTPException(status_code=404, detail="Address not found")
-        
-        db.delete(a)
-        db.commit()
-        
+        await run_db(db, _delete_address, member_user_id)
+        entity_cache.delete(("address", member_user_id))
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /addresses/{member_user_id}: {str(e)}", exc_info=True)
@@ -133,4 +178,4 @@ def delete_address(member_user_id: int, db: Session = Depends(get_db)):
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion
\ No newline at end of file
+#endregion
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Query
+
+from app.cache import entity_cache
+from app.slow_queries import slow_query_log
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+#region cache
+@router.get("/cache")
+async def get_cache_stats():
+    return entity_cache.stats()
+
+@router.delete("/cache", status_code=204)
+async def clear_cache():
+    entity_cache.clear()
+    return None
+#endregion
+
+#region slow queries
+@router.get("/slow-queries")
+async def get_slow_queries(
+    order: str = Query("total_ms", pattern="^(total_ms|max_ms|mean_ms|count)$"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    #statements slower than SLOW_QUERY_MS, grouped by fingerprint, with routes and a sampled plan
+    return slow_query_log.entries(order, limit)
+
+@router.delete("/slow-queries", status_code=204)
+async def clear_slow_queries():
+    slow_query_log.clear()
+    return None
+#endregion
@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form, Query
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, IntegrityError
 import logging
 
 from typing import List, Optional
@@ -8,16 +8,76 @@ from datetime import date, time
 
 from app.models import Appointment, Caregiver, Member
 from app.models.enums import AppointmentStatus
-from app.schemas import AppointmentCreate, AppointmentUpdate, AppointmentResponse
-from app.database import get_db
+from app.schemas import AppointmentCreate, AppointmentUpdate, AppointmentResponse, BulkCreateResponse
+from app.bulk import read_bulk_rows, validate_rows, insert_rows, row_error, bulk_response, BULK_DESCRIPTION
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.matching import caregiver_matcher
+from app.identity import bump_identity
+from app.database import get_db, run_db, DbSession, pg_error_code, UNIQUE_VIOLATION, EXCLUSION_VIOLATION, CHECK_VIOLATION
 
 logger = logging.getLogger(__name__)
 
+#ex_appointment_caregiver_slot: PENDING / ACCEPTED appointments of a caregiver cannot overlap
+DOUBLE_BOOKING_DETAIL = "Caregiver already has a pending or accepted appointment at this time"
+#ck_appointment_slot_range: the packed caregiver_slot only covers this window
+SLOT_RANGE_DETAIL = "Appointment must start on or after 1970-01-01 and end before 2286-11-20"
+
 router = APIRouter(prefix="/appointments", tags=["appointments"])
 
 #region create
+def _create_appointment(db: Session, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status, appointment_id):
+    #region validate request data
+    c = db.query(Caregiver).filter(
+        Caregiver.caregiver_user_id == caregiver_user_id
+    ).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+
+    m = db.query(Member).filter(
+        Member.member_user_id == member_user_id
+    ).first()
+    if not m:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    if appointment_id and db.query(Appointment).filter(
+        Appointment.appointment_id == appointment_id
+    ).first():
+        raise HTTPException(status_code=400, detail="Appointment ID already exists")
+    #endregion validate request data
+
+    #appointment_id is generated by the database if not provided in request
+    a = Appointment(
+        appointment_id=appointment_id,
+        caregiver_user_id=caregiver_user_id,
+        member_user_id=member_user_id,
+        appointment_date=appointment_date,
+        appointment_time=appointment_time,
+        work_hours=work_hours,
+        status=status
+    )
+    db.add(a)
+    try:
+        db.flush()
+        if appointment_id is not None:
+            bump_identity(db, Appointment.__table__.c.appointment_id, appointment_id)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if pg_error_code(e) == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=400, detail="Appointment ID already exists")
+        if pg_error_code(e) == EXCLUSION_VIOLATION:
+            raise HTTPException(status_code=409, detail=DOUBLE_BOOKING_DETAIL)
+        if pg_error_code(e) == CHECK_VIOLATION and "ck_appointment_slot_range" in str(e.orig):
+            raise HTTPException(status_code=400, detail=SLOT_RANGE_DETAIL)
+        raise
+    caregiver_matcher.mark_dirty(caregiver_user_id)
+    db.refresh(a)
+    return a
+
 @router.post("/", response_model=AppointmentResponse, status_code=201)
-def create_appointment(
+async def create_appointment(
     caregiver_user_id: int = Form(...),
     member_user_id: int = Form(...),
     appointment_date: date = Form(...),
@@ -25,46 +85,10 @@ def create_appointment(
     work_hours: int = Form(...),
     status: AppointmentStatus = Form(...),
     appointment_id: Optional[int] = Form(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        #region validate request data
-        c = db.query(Caregiver).filter(
-            Caregiver.caregiver_user_id == caregiver_user_id
-        ).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
-        
-        m = db.query(Member).filter(
-            Member.member_user_id == member_user_id
-        ).first()
-        if not m:
-            raise HTTPException(status_code=404, detail="Member not found")
-        
-        if appointment_id and db.query(Appointment).filter(
-            Appointment.appointment_id == appointment_id
-        ).first():
-            raise HTTPException(status_code=400, detail="Appointment ID already exists")
-        #endregion validate request data
-
-        #auto-generate appointment_id if not provided in request
-        if appointment_id is None:
-            max_a = db.query(Appointment).order_by(Appointment.appointment_id.desc()).first()
-            appointment_id = (max_a.appointment_id + 1) if max_a else 1
-        
-        a = Appointment(
-            appointment_id=appointment_id,
-            caregiver_user_id=caregiver_user_id,
-            member_user_id=member_user_id,
-            appointment_date=appointment_date,
-            appointment_time=appointment_time,
-            work_hours=work_hours,
-            status=status
-        )
-        db.add(a)
-        db.commit()
-        db.refresh(a)
-        return a
+        return await run_db(db, _create_appointment, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status, appointment_id)
     except OperationalError as e:
         logger.error(f"Database connection error in POST /appointments/: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -73,16 +97,78 @@ def create_appointment(
         )
 #endregion
 
+#region bulk create
+def _create_appointments_bulk(db: Session, rows: list):
+    valid, errors = validate_rows(rows, AppointmentCreate)
+
+    #region validate request data (set-based, one query per referenced table)
+    caregiver_ids = {a.caregiver_user_id for _, a in valid}
+    member_ids = {a.member_user_id for _, a in valid}
+    appointment_ids = [a.appointment_id for _, a in valid if a.appointment_id is not None]
+
+    caregivers = {c for (c,) in db.query(Caregiver.caregiver_user_id).filter(Caregiver.caregiver_user_id.in_(caregiver_ids))} if caregiver_ids else set()
+    members = {m for (m,) in db.query(Member.member_user_id).filter(Member.member_user_id.in_(member_ids))} if member_ids else set()
+    taken_ids = {a for (a,) in db.query(Appointment.appointment_id).filter(Appointment.appointment_id.in_(appointment_ids))} if appointment_ids else set()
+    #endregion validate request data
+
+    to_insert = []
+    batch_ids = set()
+    for row, a in valid:
+        if a.caregiver_user_id not in caregivers:
+            errors.append(row_error(row, "Caregiver not found"))
+        elif a.member_user_id not in members:
+            errors.append(row_error(row, "Member not found"))
+        elif a.appointment_id is not None and (a.appointment_id in taken_ids or a.appointment_id in batch_ids):
+            errors.append(row_error(row, "Appointment ID already exists"))
+        else:
+            if a.appointment_id is not None:
+                batch_ids.add(a.appointment_id)
+            to_insert.append((row, a.model_dump()))
+
+    created, insert_errors = insert_rows(db, Appointment, to_insert, identity_column=Appointment.__table__.c.appointment_id)
+    db.commit()
+    caregiver_matcher.mark_dirty(*caregiver_ids)
+    return bulk_response(created, errors + insert_errors)
+
+@router.post("/bulk", response_model=BulkCreateResponse, description=BULK_DESCRIPTION)
+async def create_appointments_bulk(request: Request, db: DbSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    try:
+        return await run_db(db, _create_appointments_bulk, rows)
+    except OperationalError as e:
+        logger.error(f"Database connection error in POST /appointments/bulk: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
 #region get one
+def _get_appointment(db: Session, appointment_id: int):
+    a = db.query(Appointment).filter(
+        Appointment.appointment_id == appointment_id
+    ).first()
+    if not a:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    return a
+
+async def _load_appointment(db: DbSession, appointment_id: int):
+    return AppointmentResponse.model_validate(await run_db(db, _get_appointment, appointment_id))
+
 @router.get("/{appointment_id}", response_model=AppointmentResponse)
-def get_appointment(appointment_id: int, db: Session = Depends(get_db)):
+async def get_appointment(
+    appointment_id: int,
+    fields: Optional[str] = Query(None, description=fields_description(AppointmentResponse)),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, AppointmentResponse)
     try:
-        a = db.query(Appointment).filter(
-            Appointment.appointment_id == appointment_id
-        ).first()
-        if not a:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        return a
+        a = await entity_cache.read_through(
+            ("appointment", appointment_id),
+            lambda: _load_appointment(db, appointment_id),
+            tags=lambda a: [("caregiver", a.caregiver_user_id), ("member", a.member_user_id)]
+        )
+        return a if fields is None else sparse_response(project(a, fields))
     except OperationalError as e:
         logger.error(f"Database connection error in GET /appointments/{appointment_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -92,10 +178,25 @@ def get_appointment(appointment_id: int, db: Session = Depends(get_db)):
 #endregion
 
 #region get all
+def _get_appointments(db: Session, fields: Optional[list], cursor: Optional[str], limit: int, skip: int):
+    a, next_cursor = keyset_page(load_fields(db.query(Appointment), Appointment, fields), [Appointment.appointment_id], cursor, limit, skip)
+    return (a if fields is None else [project(row, fields) for row in a]), next_cursor
+
 @router.get("/", response_model=List[AppointmentResponse])
-def get_appointments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_appointments(
+    response: Response,
+    fields: Optional[str] = Query(None, description=fields_description(AppointmentResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, AppointmentResponse)
     try:
-        a = db.query(Appointment).offset(skip).limit(limit).all()
+        a, next_cursor = await run_db(db, _get_appointments, fields, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(a, next_cursor)
+        set_next_cursor(response, next_cursor)
         return a
     except OperationalError as e:
         logger.error(f"Database connection error in GET /appointments/: {str(e)}", exc_info=True)
@@ -105,9 +206,70 @@ def get_appointments(skip: int = 0, limit: int = 100, db: Session = Depends(get_
         )
 #endregion
 
-#region update  
+#region update
+def _update_appointment(db: Session, appointment_id: int, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status):
+    #region validate request data
+    a = db.query(Appointment).filter(
+        Appointment.appointment_id == appointment_id
+    ).first()
+    if not a:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+    previous_caregiver_user_id = a.caregiver_user_id
+
+    if caregiver_user_id is not None and caregiver_user_id != a.caregiver_user_id:
+        c = db.query(Caregiver).filter(
+            Caregiver.caregiver_user_id == caregiver_user_id
+        ).first()
+        if not c:
+            raise HTTPException(status_code=404, detail="Caregiver not found")
+        a.caregiver_user_id = caregiver_user_id
+
+    if member_user_id is not None and member_user_id != a.member_user_id:
+        m = db.query(Member).filter(
+            Member.member_user_id == member_user_id
+        ).first()
+        if not m:
+            raise HTTPException(status_code=404, detail="Member not found")
+        a.member_user_id = member_user_id
+
+    if appointment_date is not None:
+        if appointment_date < date.today():
+            raise HTTPException(status_code=400, detail="Appointment date cannot be in the past")
+        a.appointment_date = appointment_date
+
+    if appointment_time is not None:
+        if appointment_time.hour < 0 or appointment_time.hour > 23:
+            raise HTTPException(status_code=400, detail="Hour must be between 0 and 23")
+        if appointment_time.minute < 0 or appointment_time.minute > 59:
+            raise HTTPException(status_code=400, detail="Minute must be between 0 and 59")
+        if appointment_time.second is not None and (appointment_time.second < 0 or appointment_time.second > 59):
+            raise HTTPException(status_code=400, detail="Second must be between 0 and 59")
+        a.appointment_time = appointment_time
+
+    if work_hours is not None:
+        if work_hours <= 0:
+            raise HTTPException(status_code=400, detail="Work hours must be greater than 0")
+        a.work_hours = work_hours
+
+    if status is not None:
+        a.status = status
+    #endregion validate request data
+
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if pg_error_code(e) == EXCLUSION_VIOLATION:
+            raise HTTPException(status_code=409, detail=DOUBLE_BOOKING_DETAIL)
+        if pg_error_code(e) == CHECK_VIOLATION and "ck_appointment_slot_range" in str(e.orig):
+            raise HTTPException(status_code=400, detail=SLOT_RANGE_DETAIL)
+        raise
+    db.refresh(a)
+    caregiver_matcher.mark_dirty(previous_caregiver_user_id, a.caregiver_user_id)
+    return a
+
 @router.put("/{appointment_id}", response_model=AppointmentResponse)
-def update_appointment(
+async def update_appointment(
     appointment_id: int,
     caregiver_user_id: Optional[int] = Query(None),
     member_user_id: Optional[int] = Query(None),
@@ -115,57 +277,11 @@ def update_appointment(
     appointment_time: Optional[time] = Query(None),
     work_hours: Optional[int] = Query(None),
     status: Optional[AppointmentStatus] = Query(None, description="Status of the appointment. Possible values: PENDING, ACCEPTED, DECLINED"),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        #region validate request data
-        a = db.query(Appointment).filter(
-            Appointment.appointment_id == appointment_id
-        ).first()
-        if not a:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        
-        if caregiver_user_id is not None and caregiver_user_id != a.caregiver_user_id:
-            c = db.query(Caregiver).filter(
-                Caregiver.caregiver_user_id == caregiver_user_id
-            ).first()
-            if not c:
-                raise HTTPException(status_code=404, detail="Caregiver not found")
-            a.caregiver_user_id = caregiver_user_id
-        
-        if member_user_id is not None and member_user_id != a.member_user_id:
-            m = db.query(Member).filter(
-                Member.member_user_id == member_user_id
-            ).first()
-            if not m:
-                raise HTTPException(status_code=404, detail="Member not found")
-            a.member_user_id = member_user_id
-        
-        if appointment_date is not None:
-            if appointment_date < date.today():
-                raise HTTPException(status_code=400, detail="Appointment date cannot be in the past")
-            a.appointment_date = appointment_date
-        
-        if appointment_time is not None:
-            if appointment_time.hour < 0 or appointment_time.hour > 23:
-                raise HTTPException(status_code=400, detail="Hour must be between 0 and 23")
-            if appointment_time.minute < 0 or appointment_time.minute > 59:
-                raise HTTPException(status_code=400, detail="Minute must be between 0 and 59")
-            if appointment_time.second is not None and (appointment_time.second < 0 or appointment_time.second > 59):
-                raise HTTPException(status_code=400, detail="Second must be between 0 and 59")
-            a.appointment_time = appointment_time
-        
-        if work_hours is not None:
-            if work_hours <= 0:
-                raise HTTPException(status_code=400, detail="Work hours must be greater than 0")
-            a.work_hours = work_hours
-        
-        if status is not None:
-            a.status = status
-        #endregion validate request data
-
-        db.commit()
-        db.refresh(a)
+        a = await run_db(db, _update_appointment, appointment_id, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status)
+        entity_cache.delete(("appointment", appointment_id))
         return a
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /appointments/{appointment_id}: {str(e)}", exc_info=True)
@@ -176,19 +292,24 @@ def update_appointment(
 #endregion update
 
 #region delete
+def _delete_appointment(db: Session, appointment_id: int):
+    a = db.query(Appointment).filter(
+        Appointment.appointment_id == appointment_id
+    ).first()
+
+    if not a:
+        raise HTTPException(status_code=404, detail="Appointment not found")
+
+    caregiver_user_id = a.caregiver_user_id
+    db.delete(a)
+    db.commit()
+    caregiver_matcher.mark_dirty(caregiver_user_id)
 
 @router.delete("/{appointment_id}", status_code=204)
-def delete_appointment(appointment_id: int, db: Session = Depends(get_db)):
+async def delete_appointment(appointment_id: int, db: DbSession = Depends(get_db)):
     try:
-        a = db.query(Appointment).filter(
-            Appointment.appointment_id == appointment_id
-        ).first()
-        
-        if not a:
-            raise HTTPException(status_code=404, detail="Appointment not found")
-        
-        db.delete(a)
-        db.commit()
+        await run_db(db, _delete_appointment, appointment_id)
+        entity_cache.delete(("appointment", appointment_id))
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /appointments/{appointment_id}: {str(e)}", exc_info=True)
@@ -196,4 +317,4 @@ def delete_appointment(appointment_id: int, db: Session = Depends(get_db)):
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion
\ No newline at end of file
+#endregion
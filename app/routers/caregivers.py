@@ -1,65 +1,76 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, UploadFile, File, Form, Query
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 import logging
 
 from typing import List, Optional
+from datetime import date, datetime, time, timedelta
 import os
-import uuid
-from pathlib import Path
 
 from app.models import Caregiver, User
 from app.models.enums import CaregivingType, Gender
-from app.schemas import CaregiverCreate, CaregiverUpdate, CaregiverResponse
-from app.database import get_db, STATIC_FOLDER
+from app.schemas import CaregiverCreate, CaregiverUpdate, CaregiverResponse, CaregiverExpanded, CaregiverAvailability, UserResponse
+from app.expand import Expansion, parse_expand, expand_query, expand_row, expand_description
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.photos import save_upload, derive, prepare_derivatives, static_path
+from app.static_files import send_file, REVALIDATE
+from app.availability import busy_slots, free_slots, MAX_AVAILABILITY_DAYS
+from app.matching import caregiver_matcher
+from app.applicant_counts import release_caregiver_applications
+from app.database import get_db, run_db, DbSession
 
 logger = logging.getLogger(__name__)
 
 
 router = APIRouter(prefix="/caregivers", tags=["caregivers"])
 
-static_path = Path(STATIC_FOLDER)
-static_path.mkdir(exist_ok=True)
+CAREGIVER_EXPANSIONS = {"user": Expansion(Caregiver.user, UserResponse)}
 
 #region caregiver entity routes
 
 #region create
+def _check_new_caregiver(db: Session, caregiver_user_id: int):
+    u = db.query(User).filter(User.user_id == caregiver_user_id).first()
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first():
+        raise HTTPException(status_code=400, detail="Caregiver already exists")
+
+def _create_caregiver(db: Session, caregiver_user_id: int, gender: Gender, caregiving_type: CaregivingType, hourly_rate: int, photo_filename: str):
+    c = Caregiver(
+        caregiver_user_id=caregiver_user_id,
+        photo=photo_filename,
+        gender=gender,
+        caregiving_type=caregiving_type,
+        hourly_rate=hourly_rate
+    )
+    db.add(c)
+    db.commit()
+    caregiver_matcher.mark_dirty(caregiver_user_id)
+    db.refresh(c)
+    return c
+
 @router.post("/", response_model=CaregiverResponse, status_code=201)
 async def create_caregiver(
+    background_tasks: BackgroundTasks,
     caregiver_user_id: int = Form(...),
     gender: Gender = Form(...),
     caregiving_type: CaregivingType = Form(...),
     hourly_rate: int = Form(...),
     photo: UploadFile = File(..., description="Photo file"),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        u = db.query(User).filter(User.user_id == caregiver_user_id).first()
-        if not u:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        if db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first():
-            raise HTTPException(status_code=400, detail="Caregiver already exists")
-        
-        file_extension = os.path.splitext(photo.filename)[1] if photo.filename else ".jpg"
-        photo_filename = f"{caregiver_user_id}_{uuid.uuid4().hex}{file_extension}"
-        file_path = static_path / photo_filename
-        
-        with open(file_path, "wb") as buffer:
-            content = await photo.read()
-            buffer.write(content)
-        
-        c = Caregiver(
-            caregiver_user_id=caregiver_user_id,
-            photo=photo_filename,
-            gender=gender,
-            caregiving_type=caregiving_type,
-            hourly_rate=hourly_rate
-        )
-        db.add(c)
-        db.commit()
-        db.refresh(c)
+        await run_db(db, _check_new_caregiver, caregiver_user_id)
+
+        #if the row is not written the file stays unreferenced and photo gc removes it
+        photo_filename = await save_upload(photo)
+        c = await run_db(db, _create_caregiver, caregiver_user_id, gender, caregiving_type, hourly_rate, photo_filename)
+        background_tasks.add_task(prepare_derivatives, photo_filename)
         return c
     except OperationalError as e:
         logger.error(f"Database connection error in POST /caregivers/: {str(e)}", exc_info=True)
@@ -70,10 +81,28 @@ async def create_caregiver(
 #endregion
 
 #region get all
-@router.get("/", response_model=List[CaregiverResponse])
-def get_caregivers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def _get_caregivers(db: Session, expand: list, fields: Optional[list], cursor: Optional[str], limit: int, skip: int):
+    query = load_fields(expand_query(db.query(Caregiver), CAREGIVER_EXPANSIONS, expand), Caregiver, fields)
+    c, next_cursor = keyset_page(query, [Caregiver.caregiver_user_id], cursor, limit, skip)
+    return [expand_row(row, CaregiverResponse, CaregiverExpanded, CAREGIVER_EXPANSIONS, expand, fields) for row in c], next_cursor
+
+@router.get("/", response_model=List[CaregiverExpanded], response_model_exclude_unset=True)
+async def get_caregivers(
+    response: Response,
+    expand: Optional[str] = Query(None, description=expand_description(CAREGIVER_EXPANSIONS)),
+    fields: Optional[str] = Query(None, description=fields_description(CaregiverResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    expand = parse_expand(expand, CAREGIVER_EXPANSIONS)
+    fields = parse_fields(fields, CaregiverResponse)
     try:
-        c = db.query(Caregiver).offset(skip).limit(limit).all()
+        c, next_cursor = await run_db(db, _get_caregivers, expand, fields, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(c, next_cursor)
+        set_next_cursor(response, next_cursor)
         return c
     except OperationalError as e:
         logger.error(f"Database connection error in GET /caregivers/: {str(e)}", exc_info=True)
@@ -83,14 +112,98 @@ def get_caregivers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db
         )
 #endregion
 
-#region get one
-@router.get("/{caregiver_user_id}", response_model=CaregiverResponse)
-def get_caregiver(caregiver_user_id: int, db: Session = Depends(get_db)):
+#region search
+#declared before /{caregiver_user_id}, otherwise "search" would be parsed as an id.
+#served by ix_caregiver_type_rate / ix_caregiver_rate (rows come out already sorted by rate,
+#gender is checked on the fly) and ix_account_city when the city filter is the selective one
+def _search_caregivers(db: Session, caregiving_type, gender, min_rate, max_rate, city, order, fields, cursor, limit):
+    query = load_fields(db.query(Caregiver), Caregiver, fields, keys=[Caregiver.hourly_rate])
+    if caregiving_type is not None:
+        query = query.filter(Caregiver.caregiving_type == caregiving_type)
+    if gender is not None:
+        query = query.filter(Caregiver.gender == gender)
+    if min_rate is not None:
+        query = query.filter(Caregiver.hourly_rate >= min_rate)
+    if max_rate is not None:
+        query = query.filter(Caregiver.hourly_rate <= max_rate)
+    if city is not None:
+        query = query.join(User, User.user_id == Caregiver.caregiver_user_id).filter(User.city == city)
+
+    c, next_cursor = keyset_page(query, [Caregiver.hourly_rate, Caregiver.caregiver_user_id], cursor, limit, descending=order == "desc")
+    return (c if fields is None else [project(row, fields) for row in c]), next_cursor
+
+@router.get("/search", response_model=List[CaregiverResponse])
+async def search_caregivers(
+    response: Response,
+    caregiving_type: Optional[CaregivingType] = Query(None, description="Possible values: BABYSITTER, ELDERLY_CARE, PLAYMATE_FOR_CHILDREN"),
+    gender: Optional[Gender] = Query(None, description="Possible values: MALE, FEMALE, OTHER"),
+    min_rate: Optional[int] = Query(None, ge=0),
+    max_rate: Optional[int] = Query(None, ge=0),
+    city: Optional[str] = Query(None, description="City of the caregiver account, exact match"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="Sort by hourly rate: asc or desc"),
+    fields: Optional[str] = Query(None, description=fields_description(CaregiverResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    if min_rate is not None and max_rate is not None and min_rate > max_rate:
+        raise HTTPException(status_code=400, detail="min_rate cannot be greater than max_rate")
+    fields = parse_fields(fields, CaregiverResponse)
+
     try:
-        c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
+        c, next_cursor = await run_db(db, _search_caregivers, caregiving_type, gender, min_rate, max_rate, city, order, fields, cursor, limit)
+        if fields is not None:
+            return sparse_response(c, next_cursor)
+        set_next_cursor(response, next_cursor)
         return c
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /caregivers/search: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
+#region get one
+def _get_caregiver(db: Session, caregiver_user_id: int):
+    c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+    return c
+
+def _get_expanded_caregiver(db: Session, caregiver_user_id: int, expand: list, fields: Optional[list]):
+    query = load_fields(expand_query(db.query(Caregiver), CAREGIVER_EXPANSIONS, expand), Caregiver, fields)
+    c = query.filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+    return expand_row(c, CaregiverResponse, CaregiverExpanded, CAREGIVER_EXPANSIONS, expand, fields)
+
+async def _load_caregiver(db: DbSession, caregiver_user_id: int):
+    return CaregiverResponse.model_validate(await run_db(db, _get_caregiver, caregiver_user_id))
+
+async def _cached_caregiver(db: DbSession, caregiver_user_id: int):
+    return await entity_cache.read_through(
+        ("caregiver", caregiver_user_id),
+        lambda: _load_caregiver(db, caregiver_user_id),
+        tags=[("caregiver", caregiver_user_id)]
+    )
+
+@router.get("/{caregiver_user_id}", response_model=CaregiverExpanded, response_model_exclude_unset=True)
+async def get_caregiver(
+    caregiver_user_id: int,
+    expand: Optional[str] = Query(None, description=expand_description(CAREGIVER_EXPANSIONS)),
+    fields: Optional[str] = Query(None, description=fields_description(CaregiverResponse)),
+    db: DbSession = Depends(get_db)
+):
+    expand = parse_expand(expand, CAREGIVER_EXPANSIONS)
+    fields = parse_fields(fields, CaregiverResponse)
+    try:
+        if expand:
+            #not cached: writes to the nested rows do not invalidate the caregiver entry
+            c = await run_db(db, _get_expanded_caregiver, caregiver_user_id, expand, fields)
+            return c if fields is None else sparse_response(c)
+        c = await _cached_caregiver(db, caregiver_user_id)
+        return c if fields is None else sparse_response(project(c, fields))
     except OperationalError as e:
         logger.error(f"Database connection error in GET /caregivers/{caregiver_user_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -99,29 +212,69 @@ def get_caregiver(caregiver_user_id: int, db: Session = Depends(get_db)):
         )
 #endregion
 
+#region availability
+@router.get("/{caregiver_user_id}/availability", response_model=CaregiverAvailability)
+async def get_caregiver_availability(
+    caregiver_user_id: int,
+    from_date: Optional[date] = Query(None, alias="from", description="First day, default today"),
+    to_date: Optional[date] = Query(None, alias="to", description="Last day (included), default 30 days after from"),
+    min_hours: int = Query(1, ge=1, le=24, description="Leave out free slots shorter than this"),
+    db: DbSession = Depends(get_db)
+):
+    from_date = from_date or date.today()
+    to_date = to_date or from_date + timedelta(days=30)
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="to cannot be before from")
+    if (to_date - from_date).days >= MAX_AVAILABILITY_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_AVAILABILITY_DAYS} days at once")
+    start = datetime.combine(from_date, time())
+    end = datetime.combine(to_date + timedelta(days=1), time())
+
+    try:
+        await _cached_caregiver(db, caregiver_user_id)
+        busy = await run_db(db, busy_slots, caregiver_user_id, start, end)
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /caregivers/{caregiver_user_id}/availability: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+    return {
+        "caregiver_user_id": caregiver_user_id, "start": start, "end": end,
+        "busy": [{"start": s, "end": e} for s, e in busy],
+        "free": [{"start": s, "end": e} for s, e in free_slots(busy, start, end, timedelta(hours=min_hours))],
+    }
+#endregion
+
 #region update
+def _update_caregiver(db: Session, caregiver_user_id: int, gender, caregiving_type, hourly_rate):
+    c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+
+    if gender is not None:
+        c.gender = gender
+    if caregiving_type is not None:
+        c.caregiving_type = caregiving_type
+    if hourly_rate is not None:
+        c.hourly_rate = hourly_rate
+
+    db.commit()
+    caregiver_matcher.mark_dirty(caregiver_user_id)
+    db.refresh(c)
+    return c
+
 @router.put("/{caregiver_user_id}", response_model=CaregiverResponse)
-def update_caregiver(
+async def update_caregiver(
     caregiver_user_id: int,
     gender: Optional[Gender] = Query(None, description="Gender of the caregiver. Possible values: MALE, FEMALE, OTHER"),
     caregiving_type: Optional[CaregivingType] = Query(None, description="Type of caregiving service. Possible values: BABYSITTER, ELDERLY_CARE, PLAYMATE_FOR_CHILDREN"),
     hourly_rate: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
-        
-        if gender is not None:
-            c.gender = gender
-        if caregiving_type is not None:
-            c.caregiving_type = caregiving_type
-        if hourly_rate is not None:
-            c.hourly_rate = hourly_rate
-        
-        db.commit()
-        db.refresh(c)
+        c = await run_db(db, _update_caregiver, caregiver_user_id, gender, caregiving_type, hourly_rate)
+        entity_cache.delete(("caregiver", caregiver_user_id))
         return c
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /caregivers/{caregiver_user_id}: {str(e)}", exc_info=True)
@@ -132,21 +285,25 @@ def update_caregiver(
 #endregion
 
 #region delete
+def _delete_caregiver(db: Session, caregiver_user_id: int):
+    c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+
+    job_ids = release_caregiver_applications(db, caregiver_user_id)
+    db.delete(c)
+    db.commit()
+    caregiver_matcher.mark_dirty(caregiver_user_id)
+    return job_ids
 
 @router.delete("/{caregiver_user_id}", status_code=204)
-def delete_caregiver(caregiver_user_id: int, db: Session = Depends(get_db)):
+async def delete_caregiver(caregiver_user_id: int, db: DbSession = Depends(get_db)):
     try:
-        c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
-        
-        if c.photo:
-            photo_path = static_path / c.photo
-            if photo_path.exists():
-                photo_path.unlink()
-        
-        db.delete(c)
-        db.commit()
+        job_ids = await run_db(db, _delete_caregiver, caregiver_user_id)
+        #drops the caregiver and its cascaded appointments. the photo file may be shared, photo gc removes it once unreferenced
+        entity_cache.invalidate_tags([("caregiver", caregiver_user_id)])
+        for job_id in job_ids:
+            entity_cache.delete(("job", job_id))  #applicant_count
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /caregivers/{caregiver_user_id}: {str(e)}", exc_info=True)
@@ -159,21 +316,45 @@ def delete_caregiver(caregiver_user_id: int, db: Session = Depends(get_db)):
 #region photo methods
 
 #region get photo
+#the photo name comes from the entity cache, a repeat view with a matching ETag costs a stat and a 304.
+#the URL stays the same when the photo changes, so clients must revalidate (no-cache);
+#the /static/{photo} URLs never change content and are cached as immutable
+async def _photo_file(db: DbSession, caregiver_user_id: int, size: str):
+    c = await _cached_caregiver(db, caregiver_user_id)
+    if not c.photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    if size == "original":
+        photo_path = static_path / c.photo
+    else:
+        try:
+            photo_path = (await derive(c.photo, [size]))[size]
+        except FileNotFoundError:
+            raise
+        except OSError:
+            raise HTTPException(status_code=415, detail="Photo cannot be resized")
+
+    return photo_path, await run_in_threadpool(os.stat, photo_path)
+
 @router.get("/{caregiver_user_id}/photo")
-def get_caregiver_photo(caregiver_user_id: int, db: Session = Depends(get_db)):
+async def get_caregiver_photo(
+    request: Request,
+    caregiver_user_id: int,
+    size: str = Query("original", pattern="^(original|thumb|medium)$", description="original, thumb (128 px) or medium (512 px)"),
+    db: DbSession = Depends(get_db)
+):
     try:
-        c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
-        
-        if not c.photo:
-            raise HTTPException(status_code=404, detail="Photo not found")
-        
-        photo_path = static_path / c.photo
-        if not photo_path.exists():
-            raise HTTPException(status_code=404, detail="Photo file not found")
-        
-        return FileResponse(photo_path)
+        try:
+            photo_path, stat_result = await _photo_file(db, caregiver_user_id, size)
+        except FileNotFoundError:
+            #cached name may be stale (photo replaced through another worker), look it up again
+            entity_cache.delete(("caregiver", caregiver_user_id))
+            try:
+                photo_path, stat_result = await _photo_file(db, caregiver_user_id, size)
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail="Photo file not found")
+
+        return send_file(request, photo_path, stat_result, REVALIDATE, "image/jpeg" if size != "original" else None)
     except OperationalError as e:
         logger.error(f"Database connection error in GET /caregivers/{caregiver_user_id}/photo: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -183,35 +364,31 @@ def get_caregiver_photo(caregiver_user_id: int, db: Session = Depends(get_db)):
 #endregion
 
 #region update photo
+def _set_caregiver_photo(db: Session, caregiver_user_id: int, photo_filename: str):
+    c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+
+    c.photo = photo_filename
+    db.commit()
+    db.refresh(c)
+    return c
+
 @router.put("/{caregiver_user_id}/photo", response_model=CaregiverResponse)
 async def update_caregiver_photo(
     caregiver_user_id: int,
+    background_tasks: BackgroundTasks,
     photo: UploadFile = File(..., description="Photo file"),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        c = db.query(Caregiver).filter(Caregiver.caregiver_user_id == caregiver_user_id).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
-        
-        #delete old photo 
-        if c.photo:
-            old_photo_path = static_path / c.photo
-            if old_photo_path.exists():
-                old_photo_path.unlink()
-        
-        #new photo
-        file_extension = os.path.splitext(photo.filename)[1] if photo.filename else ".jpg"
-        photo_filename = f"{caregiver_user_id}_{uuid.uuid4().hex}{file_extension}"
-        file_path = static_path / photo_filename
-        
-        with open(file_path, "wb") as buffer:
-            content = await photo.read()
-            buffer.write(content)
-        
-        c.photo = photo_filename
-        db.commit()
-        db.refresh(c)
+        await run_db(db, _get_caregiver, caregiver_user_id)
+
+        #old file is left to photo gc, other caregivers may use the same one
+        photo_filename = await save_upload(photo)
+        c = await run_db(db, _set_caregiver_photo, caregiver_user_id, photo_filename)
+        entity_cache.delete(("caregiver", caregiver_user_id))
+        background_tasks.add_task(prepare_derivatives, photo_filename)
         return c
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /caregivers/{caregiver_user_id}/photo: {str(e)}", exc_info=True)
@@ -219,6 +396,6 @@ async def update_caregiver_photo(
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion  
+#endregion
 
-#endregion 
\ No newline at end of file
+#endregion
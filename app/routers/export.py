@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import date
+from typing import Optional
+
+from app.models import User, Caregiver, Member, Address, Job, JobApplication, Appointment
+from app.export import export_engine, export_select, stream_csv, stream_ndjson
+from app.database import get_db, DbSession
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+#url name -> (model, date column usable for ?since=, columns left out of the export)
+EXPORT_TABLES = {
+    "users": (User, None, {"password"}),
+    "caregivers": (Caregiver, None, set()),
+    "members": (Member, None, set()),
+    "addresses": (Address, None, set()),
+    "jobs": (Job, "date_posted", set()),
+    "job-applications": (JobApplication, "date_applied", set()),
+    "appointments": (Appointment, "appointment_date", {"slot", "caregiver_slot"}),
+}
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", stream_csv),
+    "ndjson": ("application/x-ndjson", stream_ndjson),
+}
+
+#region export
+@router.get("/{table}")
+async def export_table(
+    table: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv (with header row) or ndjson"),
+    since: Optional[date] = Query(None, description="Only rows with date >= since: jobs.date_posted, job-applications.date_applied, appointments.appointment_date"),
+    db: DbSession = Depends(get_db)
+):
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table. Possible values: {', '.join(EXPORT_TABLES)}")
+
+    model, date_column, excluded = EXPORT_TABLES[table]
+    if since is not None and date_column is None:
+        raise HTTPException(status_code=400, detail=f"Table {table} has no date column to filter by")
+
+    t = model.__table__
+    columns = [c.name for c in t.columns if c.name not in excluded]
+    sql = export_select(t, columns, [c.name for c in t.primary_key], date_column, since)
+
+    media_type, stream = FORMATS[format]
+    return StreamingResponse(
+        stream(export_engine(db), sql),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    )
+#endregion
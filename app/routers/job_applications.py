@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, Form, Query
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 import logging
@@ -8,53 +8,64 @@ from datetime import date
 
 from app.models import JobApplication, Caregiver, Job
 from app.schemas import JobApplicationCreate, JobApplicationUpdate, JobApplicationResponse
-from app.database import get_db
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.applicant_counts import adjust_applicant_count
+from app.database import get_db, run_db, DbSession
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/job-applications", tags=["job-applications"])
 
 #region create
+def _create_job_application(db: Session, caregiver_user_id: int, job_id: int, date_applied):
+    #region validate request data
+    c = db.query(Caregiver).filter(
+        Caregiver.caregiver_user_id == caregiver_user_id
+    ).first()
+    if not c:
+        raise HTTPException(status_code=404, detail="Caregiver not found")
+
+    j = db.query(Job).filter(Job.job_id == job_id).first()
+    if not j:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    e = db.query(JobApplication).filter(
+        JobApplication.caregiver_user_id == caregiver_user_id,
+        JobApplication.job_id == job_id
+    ).first()
+    if e:
+        raise HTTPException(status_code=400, detail="Job application already exists")
+    #endregion validate request data
+
+    #auto-generate date
+    if date_applied is None:
+        date_applied = date.today()
+
+    ja = JobApplication(
+        caregiver_user_id=caregiver_user_id,
+        job_id=job_id,
+        date_applied=date_applied
+    )
+
+    db.add(ja)
+    db.flush()
+    adjust_applicant_count(db, job_id, 1)
+    db.commit()
+    db.refresh(ja)
+    return ja
+
 @router.post("/", response_model=JobApplicationResponse, status_code=201)
-def create_job_application(
+async def create_job_application(
     caregiver_user_id: int = Form(...),
     job_id: int = Form(...),
     date_applied: Optional[date] = Form(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        #region validate request data
-        c = db.query(Caregiver).filter(
-            Caregiver.caregiver_user_id == caregiver_user_id
-        ).first()
-        if not c:
-            raise HTTPException(status_code=404, detail="Caregiver not found")
-        
-        j = db.query(Job).filter(Job.job_id == job_id).first()
-        if not j:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        e = db.query(JobApplication).filter(
-            JobApplication.caregiver_user_id == caregiver_user_id,
-            JobApplication.job_id == job_id
-        ).first()
-        if e:
-            raise HTTPException(status_code=400, detail="Job application already exists")
-        #endregion validate request data
-
-        #auto-generate date
-        if date_applied is None:
-            date_applied = date.today()
-        
-        ja = JobApplication(
-            caregiver_user_id=caregiver_user_id,
-            job_id=job_id,
-            date_applied=date_applied
-        )
-
-        db.add(ja)
-        db.commit()
-        db.refresh(ja)
+        ja = await run_db(db, _create_job_application, caregiver_user_id, job_id, date_applied)
+        entity_cache.delete(("job", job_id))  #applicant_count
         return ja
     except OperationalError as e:
         logger.error(f"Database connection error in POST /job-applications/: {str(e)}", exc_info=True)
@@ -65,18 +76,28 @@ def create_job_application(
 #endregion
 
 #region get one
-@router.get("/caregiver/{caregiver_user_id}/job/{job_id}", response_model=JobApplicationResponse)
-def get_job_application(caregiver_user_id: int, job_id: int, db: Session = Depends(get_db)):
-    try:
-        ja = db.query(JobApplication).filter(
-            JobApplication.caregiver_user_id == caregiver_user_id,
-            JobApplication.job_id == job_id
-        ).first()
+def _get_job_application(db: Session, caregiver_user_id: int, job_id: int, fields: Optional[list]):
+    ja = load_fields(db.query(JobApplication), JobApplication, fields).filter(
+        JobApplication.caregiver_user_id == caregiver_user_id,
+        JobApplication.job_id == job_id
+    ).first()
 
-        if not ja:
-            raise HTTPException(status_code=404, detail="Job application not found")
+    if not ja:
+        raise HTTPException(status_code=404, detail="Job application not found")
 
-        return ja
+    return ja if fields is None else project(ja, fields)
+
+@router.get("/caregiver/{caregiver_user_id}/job/{job_id}", response_model=JobApplicationResponse)
+async def get_job_application(
+    caregiver_user_id: int,
+    job_id: int,
+    fields: Optional[str] = Query(None, description=fields_description(JobApplicationResponse)),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, JobApplicationResponse)
+    try:
+        ja = await run_db(db, _get_job_application, caregiver_user_id, job_id, fields)
+        return ja if fields is None else sparse_response(ja)
     except OperationalError as e:
         logger.error(f"Database connection error in GET /job-applications/caregiver/{caregiver_user_id}/job/{job_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -86,10 +107,25 @@ def get_job_application(caregiver_user_id: int, job_id: int, db: Session = Depen
 #endregion
 
 #region get all
+def _get_job_applications(db: Session, fields: Optional[list], cursor: Optional[str], limit: int, skip: int):
+    ja, next_cursor = keyset_page(load_fields(db.query(JobApplication), JobApplication, fields), [JobApplication.caregiver_user_id, JobApplication.job_id], cursor, limit, skip)
+    return (ja if fields is None else [project(row, fields) for row in ja]), next_cursor
+
 @router.get("/", response_model=List[JobApplicationResponse])
-def get_job_applications(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_job_applications(
+    response: Response,
+    fields: Optional[str] = Query(None, description=fields_description(JobApplicationResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, JobApplicationResponse)
     try:
-        ja = db.query(JobApplication).offset(skip).limit(limit).all()
+        ja, next_cursor = await run_db(db, _get_job_applications, fields, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(ja, next_cursor)
+        set_next_cursor(response, next_cursor)
         return ja
     except OperationalError as e:
         logger.error(f"Database connection error in GET /job-applications/: {str(e)}", exc_info=True)
@@ -100,27 +136,30 @@ def get_job_applications(skip: int = 0, limit: int = 100, db: Session = Depends(
 #endregion
 
 #region update
+def _update_job_application(db: Session, caregiver_user_id: int, job_id: int, date_applied):
+    ja = db.query(JobApplication).filter(
+        JobApplication.caregiver_user_id == caregiver_user_id,
+        JobApplication.job_id == job_id
+    ).first()
+    if not ja:
+        raise HTTPException(status_code=404, detail="Job application not found")
+
+    if date_applied is not None:
+        ja.date_applied = date_applied
+
+    db.commit()
+    db.refresh(ja)
+    return ja
+
 @router.put("/caregiver/{caregiver_user_id}/job/{job_id}", response_model=JobApplicationResponse)
-def update_job_application(
+async def update_job_application(
     caregiver_user_id: int,
     job_id: int,
     date_applied: Optional[date] = Query(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        ja = db.query(JobApplication).filter(
-            JobApplication.caregiver_user_id == caregiver_user_id,
-            JobApplication.job_id == job_id
-        ).first()
-        if not ja:
-            raise HTTPException(status_code=404, detail="Job application not found")
-        
-        if date_applied is not None:
-            ja.date_applied = date_applied
-        
-        db.commit()
-        db.refresh(ja)
-        return ja
+        return await run_db(db, _update_job_application, caregiver_user_id, job_id, date_applied)
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /job-applications/caregiver/{caregiver_user_id}/job/{job_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -130,19 +169,24 @@ def update_job_application(
 #endregion
 
 #region delete
+def _delete_job_application(db: Session, caregiver_user_id: int, job_id: int):
+    ja = db.query(JobApplication).filter(
+        JobApplication.caregiver_user_id == caregiver_user_id,
+        JobApplication.job_id == job_id
+    ).first()
+
+    if not ja:
+        raise HTTPException(status_code=404, detail="Job application not found")
+
+    db.delete(ja)
+    adjust_applicant_count(db, job_id, -1)
+    db.commit()
+
 @router.delete("/caregiver/{caregiver_user_id}/job/{job_id}", status_code=204)
-def delete_job_application(caregiver_user_id: int, job_id: int, db: Session = Depends(get_db)):
+async def delete_job_application(caregiver_user_id: int, job_id: int, db: DbSession = Depends(get_db)):
     try:
-        ja = db.query(JobApplication).filter(
-            JobApplication.caregiver_user_id == caregiver_user_id,
-            JobApplication.job_id == job_id
-        ).first()
-        
-        if not ja:
-            raise HTTPException(status_code=404, detail="Job application not found")
-        
-        db.delete(ja)
-        db.commit()
+        await run_db(db, _delete_job_application, caregiver_user_id, job_id)
+        entity_cache.delete(("job", job_id))  #applicant_count
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /job-applications/caregiver/{caregiver_user_id}/job/{job_id}: {str(e)}", exc_info=True)
@@ -150,4 +194,4 @@ def delete_job_application(caregiver_user_id: int, job_id: int, db: Session = De
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion
\ No newline at end of file
+#endregion
@@ -1,52 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form, Query
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, IntegrityError
 import logging
 
 from typing import List, Optional
 from datetime import date
 
-from app.models import Job, Member
+from app.models import Job, Member, User
+from app.models.job import requirements_tsvector
 from app.models.enums import CaregivingType
-from app.schemas import JobCreate, JobUpdate, JobResponse
-from app.database import get_db
+from app.schemas import JobCreate, JobUpdate, JobResponse, JobExpanded, JobMatch, JobApplicationResponse, BulkCreateResponse
+from app.bulk import read_bulk_rows, validate_rows, insert_rows, row_error, bulk_response, BULK_DESCRIPTION
+from app.expand import Expansion, parse_expand, expand_query, expand_row, expand_description
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.identity import bump_identity
+from app.search import ranked_search, MAX_SEARCH_RESULTS
+from app.matching import caregiver_matcher, sync_bind, MAX_MATCHES
+from app.database import get_db, run_db, DbSession, pg_error_code, UNIQUE_VIOLATION
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+JOB_EXPANSIONS = {"applications": Expansion(Job.job_applications, JobApplicationResponse, many=True)}
+
 #region create
+def _create_job(db: Session, member_user_id, required_caregiving_type, other_requirements, date_posted, job_id):
+    m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
+    if not m:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    if job_id and db.query(Job).filter(Job.job_id == job_id).first():
+        raise HTTPException(status_code=400, detail="Job ID already exists")
+
+    if date_posted is None:
+        date_posted = date.today()
+
+    #job_id is generated by the database if not provided in request
+    j = Job(
+        job_id=job_id,
+        member_user_id=member_user_id,
+        required_caregiving_type=required_caregiving_type,
+        other_requirements=other_requirements,
+        date_posted=date_posted
+    )
+    db.add(j)
+    try:
+        db.flush()
+        if job_id is not None:
+            bump_identity(db, Job.__table__.c.job_id, job_id)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if pg_error_code(e) == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=400, detail="Job ID already exists")
+        raise
+    db.refresh(j)
+    return j
+
 @router.post("/", response_model=JobResponse, status_code=201)
-def create_job(
+async def create_job(
     member_user_id: int = Form(...),
     required_caregiving_type: CaregivingType = Form(...),
     other_requirements: Optional[str] = Form(None),
     date_posted: Optional[date] = Form(None, description="If empty it will insert todays date here"),
     job_id: Optional[int] = Form(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
-        if not m:
-            raise HTTPException(status_code=404, detail="Member not found")
-        
-        if job_id and db.query(Job).filter(Job.job_id == job_id).first():
-            raise HTTPException(status_code=400, detail="Job ID already exists")
-        
-        if date_posted is None:
-            date_posted = date.today()
-        
-        j = Job(
-            job_id=job_id,
-            member_user_id=member_user_id,
-            required_caregiving_type=required_caregiving_type,
-            other_requirements=other_requirements,
-            date_posted=date_posted
-        )
-        db.add(j)
-        db.commit()
-        db.refresh(j)
-        return j
+        return await run_db(db, _create_job, member_user_id, required_caregiving_type, other_requirements, date_posted, job_id)
     except OperationalError as e:
         logger.error(f"Database connection error in POST /jobs/: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -55,15 +80,108 @@ def create_job(
         )
 #endregion
 
+#region bulk create
+def _create_jobs_bulk(db: Session, rows: list):
+    valid, errors = validate_rows(rows, JobCreate)
+
+    #region validate request data (set-based, one query per referenced table)
+    member_ids = {job.member_user_id for _, job in valid}
+    job_ids = [job.job_id for _, job in valid if job.job_id is not None]
+
+    members = {m for (m,) in db.query(Member.member_user_id).filter(Member.member_user_id.in_(member_ids))} if member_ids else set()
+    taken_ids = {j for (j,) in db.query(Job.job_id).filter(Job.job_id.in_(job_ids))} if job_ids else set()
+    #endregion validate request data
+
+    to_insert = []
+    batch_ids = set()
+    for row, job in valid:
+        if job.member_user_id not in members:
+            errors.append(row_error(row, "Member not found"))
+        elif job.job_id is not None and (job.job_id in taken_ids or job.job_id in batch_ids):
+            errors.append(row_error(row, "Job ID already exists"))
+        else:
+            if job.job_id is not None:
+                batch_ids.add(job.job_id)
+            to_insert.append((row, job.model_dump()))
+
+    created, insert_errors = insert_rows(db, Job, to_insert, identity_column=Job.__table__.c.job_id)
+    db.commit()
+    return bulk_response(created, errors + insert_errors)
+
+@router.post("/bulk", response_model=BulkCreateResponse, description=BULK_DESCRIPTION)
+async def create_jobs_bulk(request: Request, db: DbSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    try:
+        return await run_db(db, _create_jobs_bulk, rows)
+    except OperationalError as e:
+        logger.error(f"Database connection error in POST /jobs/bulk: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
+#region search
+#declared before /{job_id}; uses ix_job_requirements_fts
+def _search_jobs(db: Session, q: str, fields: Optional[list], limit: int):
+    j = ranked_search(load_fields(db.query(Job), Job, fields), requirements_tsvector, q, Job.job_id, limit)
+    return j if fields is None else [project(row, fields) for row in j]
+
+@router.get("/search", response_model=List[JobResponse])
+async def search_jobs(
+    q: str = Query(..., min_length=1, description='Full-text search in other requirements, e.g. `soft-spoken`, `"first aid"`, `patient -night`'),
+    fields: Optional[str] = Query(None, description=fields_description(JobResponse)),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, JobResponse)
+    try:
+        j = await run_db(db, _search_jobs, q, fields, limit)
+        return j if fields is None else sparse_response(j)
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /jobs/search: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
 #region get one
+def _get_job(db: Session, job_id: int):
+    j = db.query(Job).filter(Job.job_id == job_id).first()
+    if not j:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return j
+
+def _get_expanded_job(db: Session, job_id: int, expand: list, fields: Optional[list]):
+    j = load_fields(expand_query(db.query(Job), JOB_EXPANSIONS, expand), Job, fields).filter(Job.job_id == job_id).first()
+    if not j:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return expand_row(j, JobResponse, JobExpanded, JOB_EXPANSIONS, expand, fields)
 
-@router.get("/{job_id}", response_model=JobResponse)
-def get_job(job_id: int, db: Session = Depends(get_db)):
+async def _load_job(db: DbSession, job_id: int):
+    return JobResponse.model_validate(await run_db(db, _get_job, job_id))
+
+@router.get("/{job_id}", response_model=JobExpanded, response_model_exclude_unset=True)
+async def get_job(
+    job_id: int,
+    expand: Optional[str] = Query(None, description=expand_description(JOB_EXPANSIONS)),
+    fields: Optional[str] = Query(None, description=fields_description(JobResponse)),
+    db: DbSession = Depends(get_db)
+):
+    expand = parse_expand(expand, JOB_EXPANSIONS)
+    fields = parse_fields(fields, JobResponse)
     try:
-        j = db.query(Job).filter(Job.job_id == job_id).first()
-        if not j:
-            raise HTTPException(status_code=404, detail="Job not found")
-        return j
+        if expand:
+            #not cached: writes to the nested rows do not invalidate the job entry
+            j = await run_db(db, _get_expanded_job, job_id, expand, fields)
+            return j if fields is None else sparse_response(j)
+        j = await entity_cache.read_through(
+            ("job", job_id),
+            lambda: _load_job(db, job_id),
+            tags=lambda j: [("member", j.member_user_id)]
+        )
+        return j if fields is None else sparse_response(project(j, fields))
     except OperationalError as e:
         logger.error(f"Database connection error in GET /jobs/{job_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -72,12 +190,58 @@ def get_job(job_id: int, db: Session = Depends(get_db)):
         )
 #endregion
 
+#region matches
+def _job_target(db: Session, job_id: int):
+    j = _get_job(db, job_id)
+    city = db.query(User.city).filter(User.user_id == j.member_user_id).scalar()
+    return j.required_caregiving_type, city
+
+@router.get("/{job_id}/matches", response_model=List[JobMatch])
+async def get_job_matches(
+    job_id: int,
+    limit: int = Query(10, ge=1, le=MAX_MATCHES),
+    db: DbSession = Depends(get_db)
+):
+    #best caregivers for the job first, see app/matching.py for the score
+    try:
+        caregiving_type, city = await run_db(db, _job_target, job_id)
+        return await run_in_threadpool(caregiver_matcher.match, sync_bind(db), caregiving_type, city, limit)
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /jobs/{job_id}/matches: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
 #region get all
+#sort=applicant_count pages through ix_job_applicant_count, job_id breaks ties
+JOB_SORT_KEYS = {"job_id": [Job.job_id], "applicant_count": [Job.applicant_count, Job.job_id]}
+
+def _get_jobs(db: Session, expand: list, fields: Optional[list], sort: str, order: str, cursor: Optional[str], limit: int, skip: int):
+    query = load_fields(expand_query(db.query(Job), JOB_EXPANSIONS, expand), Job, fields, keys=JOB_SORT_KEYS[sort])
+    j, next_cursor = keyset_page(query, JOB_SORT_KEYS[sort], cursor, limit, skip, descending=order == "desc")
+    return [expand_row(row, JobResponse, JobExpanded, JOB_EXPANSIONS, expand, fields) for row in j], next_cursor
 
-@router.get("/", response_model=List[JobResponse])
-def get_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[JobExpanded], response_model_exclude_unset=True)
+async def get_jobs(
+    response: Response,
+    expand: Optional[str] = Query(None, description=expand_description(JOB_EXPANSIONS)),
+    fields: Optional[str] = Query(None, description=fields_description(JobResponse)),
+    sort: str = Query("job_id", pattern="^(job_id|applicant_count)$", description="Sort key: job_id or applicant_count"),
+    order: str = Query("asc", pattern="^(asc|desc)$", description="asc or desc"),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    expand = parse_expand(expand, JOB_EXPANSIONS)
+    fields = parse_fields(fields, JobResponse)
     try:
-        j = db.query(Job).offset(skip).limit(limit).all()
+        j, next_cursor = await run_db(db, _get_jobs, expand, fields, sort, order, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(j, next_cursor)
+        set_next_cursor(response, next_cursor)
         return j
     except OperationalError as e:
         logger.error(f"Database connection error in GET /jobs/: {str(e)}", exc_info=True)
@@ -88,37 +252,42 @@ def get_jobs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
 #endregion
 
 #region update
+def _update_job(db: Session, job_id: int, member_user_id, required_caregiving_type, other_requirements, date_posted):
+    #region validate request
+    j = db.query(Job).filter(Job.job_id == job_id).first()
+    if not j:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if member_user_id is not None and member_user_id != j.member_user_id:
+        m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
+        if not m:
+            raise HTTPException(status_code=404, detail="Member not found")
+        j.member_user_id = member_user_id
+
+    if required_caregiving_type is not None:
+        j.required_caregiving_type = required_caregiving_type
+    if other_requirements is not None:
+        j.other_requirements = other_requirements
+    if date_posted is not None:
+        j.date_posted = date_posted
+    #endregion validate request
+
+    db.commit()
+    db.refresh(j)
+    return j
+
 @router.put("/{job_id}", response_model=JobResponse)
-def update_job(
+async def update_job(
     job_id: int,
     member_user_id: Optional[int] = Query(None),
     required_caregiving_type: Optional[CaregivingType] = Query(None, description="Type of caregiving service required. Possible values: BABYSITTER, ELDERLY_CARE, PLAYMATE_FOR_CHILDREN"),
     other_requirements: Optional[str] = Query(None),
     date_posted: Optional[date] = Query(None, description="If empty it will insert todays date here"),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        #region validate request 
-        j = db.query(Job).filter(Job.job_id == job_id).first()
-        if not j:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        if member_user_id is not None and member_user_id != j.member_user_id:
-            m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
-            if not m:
-                raise HTTPException(status_code=404, detail="Member not found")
-            j.member_user_id = member_user_id
-        
-        if required_caregiving_type is not None:
-            j.required_caregiving_type = required_caregiving_type
-        if other_requirements is not None:
-            j.other_requirements = other_requirements
-        if date_posted is not None:
-            j.date_posted = date_posted
-        #endregion validate request 
-
-        db.commit()
-        db.refresh(j)
+        j = await run_db(db, _update_job, job_id, member_user_id, required_caregiving_type, other_requirements, date_posted)
+        entity_cache.delete(("job", job_id))
         return j
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /jobs/{job_id}: {str(e)}", exc_info=True)
@@ -127,18 +296,22 @@ def update_job(
             detail="Database connection error. Please try again later."
         )
 #endregion
+
 #region delete
+def _delete_job(db: Session, job_id: int):
+    j = db.query(Job).filter(Job.job_id == job_id).first()
+
+    if not j:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    db.delete(j)
+    db.commit()
 
 @router.delete("/{job_id}", status_code=204)
-def delete_job(job_id: int, db: Session = Depends(get_db)):
+async def delete_job(job_id: int, db: DbSession = Depends(get_db)):
     try:
-        j = db.query(Job).filter(Job.job_id == job_id).first()
-
-        if not j:
-            raise HTTPException(status_code=404, detail="Job not found")
-        
-        db.delete(j)
-        db.commit()
+        await run_db(db, _delete_job, job_id)
+        entity_cache.delete(("job", job_id))
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /jobs/{job_id}: {str(e)}", exc_info=True)
@@ -146,4 +319,4 @@ def delete_job(job_id: int, db: Session = Depends(get_db)):
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion
\ No newline at end of file
+#endregion
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, Form, Query
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 import logging
@@ -6,39 +6,50 @@ import logging
 from typing import List, Optional
 
 from app.models import Member, User
-from app.schemas import MemberCreate, MemberUpdate, MemberResponse
-from app.database import get_db
+from app.models.member import house_rules_tsvector
+from app.schemas import MemberCreate, MemberUpdate, MemberResponse, MemberExpanded, UserResponse, AddressResponse
+from app.expand import Expansion, parse_expand, expand_query, expand_row, expand_description
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.search import ranked_search, MAX_SEARCH_RESULTS
+from app.database import get_db, run_db, DbSession
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/members", tags=["members"])
 
+MEMBER_EXPANSIONS = {"user": Expansion(Member.user, UserResponse), "address": Expansion(Member.address, AddressResponse)}
+
 #region create member
+def _create_member(db: Session, member_user_id: int, house_rules, dependent_description):
+    u = db.query(User).filter(User.user_id == member_user_id).first()
+
+    if not u:
+        raise HTTPException(status_code=404, detail=f"User with id {member_user_id} not found. Please create the user first.")
+
+    if db.query(Member).filter(Member.member_user_id == member_user_id).first():
+        raise HTTPException(status_code=400, detail="Member already exists")
+
+    m = Member(
+        member_user_id=member_user_id,
+        house_rules=house_rules,
+        dependent_description=dependent_description
+    )
+    db.add(m)
+    db.commit()
+    db.refresh(m)
+    return m
+
 @router.post("/", response_model=MemberResponse, status_code=201)
-def create_member(
+async def create_member(
     member_user_id: int = Form(...),
     house_rules: Optional[str] = Form(None),
     dependent_description: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        u = db.query(User).filter(User.user_id == member_user_id).first()
-
-        if not u:
-            raise HTTPException(status_code=404, detail=f"User with id {member_user_id} not found. Please create the user first.")
-        
-        if db.query(Member).filter(Member.member_user_id == member_user_id).first():
-            raise HTTPException(status_code=400, detail="Member already exists")
-        
-        m = Member(
-            member_user_id=member_user_id,
-            house_rules=house_rules,
-            dependent_description=dependent_description
-        )
-        db.add(m)
-        db.commit()
-        db.refresh(m)
-        return m
+        return await run_db(db, _create_member, member_user_id, house_rules, dependent_description)
     except OperationalError as e:
         logger.error(f"Database connection error in POST /members/: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -48,10 +59,28 @@ def create_member(
 #endregion create member
 
 #region get all members
-@router.get("/", response_model=List[MemberResponse])
-def get_members(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def _get_members(db: Session, expand: list, fields: Optional[list], cursor: Optional[str], limit: int, skip: int):
+    query = load_fields(expand_query(db.query(Member), MEMBER_EXPANSIONS, expand), Member, fields)
+    m, next_cursor = keyset_page(query, [Member.member_user_id], cursor, limit, skip)
+    return [expand_row(row, MemberResponse, MemberExpanded, MEMBER_EXPANSIONS, expand, fields) for row in m], next_cursor
+
+@router.get("/", response_model=List[MemberExpanded], response_model_exclude_unset=True)
+async def get_members(
+    response: Response,
+    expand: Optional[str] = Query(None, description=expand_description(MEMBER_EXPANSIONS)),
+    fields: Optional[str] = Query(None, description=fields_description(MemberResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    expand = parse_expand(expand, MEMBER_EXPANSIONS)
+    fields = parse_fields(fields, MemberResponse)
     try:
-        m = db.query(Member).offset(skip).limit(limit).all()
+        m, next_cursor = await run_db(db, _get_members, expand, fields, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(m, next_cursor)
+        set_next_cursor(response, next_cursor)
         return m
     except OperationalError as e:
         logger.error(f"Database connection error in GET /members/: {str(e)}", exc_info=True)
@@ -61,16 +90,53 @@ def get_members(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
         )
 #endregion get all members
 
-#region get member
-@router.get("/{member_user_id}", response_model=MemberResponse)
-def get_member(member_user_id: int, db: Session = Depends(get_db)):
+#region search members
+#declared before /{member_user_id}; uses ix_member_house_rules_fts
+def _search_members(db: Session, q: str, fields: Optional[list], limit: int):
+    m = ranked_search(load_fields(db.query(Member), Member, fields), house_rules_tsvector, q, Member.member_user_id, limit)
+    return m if fields is None else [project(row, fields) for row in m]
+
+@router.get("/search", response_model=List[MemberResponse])
+async def search_members(
+    q: str = Query(..., min_length=1, description='Full-text search in house rules, e.g. `pets`, `"no smoking"`, `pets -cats`'),
+    fields: Optional[str] = Query(None, description=fields_description(MemberResponse)),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, MemberResponse)
     try:
-        m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
-        
-        if not m:
-            raise HTTPException(status_code=404, detail="Member not found")
+        m = await run_db(db, _search_members, q, fields, limit)
+        return m if fields is None else sparse_response(m)
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /members/search: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion search members
 
-        return m
+#region get member
+def _get_member(db: Session, member_user_id: int, expand: list, fields: Optional[list]):
+    query = load_fields(expand_query(db.query(Member), MEMBER_EXPANSIONS, expand), Member, fields)
+    m = query.filter(Member.member_user_id == member_user_id).first()
+
+    if not m:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    return expand_row(m, MemberResponse, MemberExpanded, MEMBER_EXPANSIONS, expand, fields)
+
+@router.get("/{member_user_id}", response_model=MemberExpanded, response_model_exclude_unset=True)
+async def get_member(
+    member_user_id: int,
+    expand: Optional[str] = Query(None, description=expand_description(MEMBER_EXPANSIONS)),
+    fields: Optional[str] = Query(None, description=fields_description(MemberResponse)),
+    db: DbSession = Depends(get_db)
+):
+    expand = parse_expand(expand, MEMBER_EXPANSIONS)
+    fields = parse_fields(fields, MemberResponse)
+    try:
+        m = await run_db(db, _get_member, member_user_id, expand, fields)
+        return m if fields is None else sparse_response(m)
     except OperationalError as e:
         logger.error(f"Database connection error in GET /members/{member_user_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -80,27 +146,30 @@ def get_member(member_user_id: int, db: Session = Depends(get_db)):
 #endregion get member
 
 #region update member
+def _update_member(db: Session, member_user_id: int, house_rules, dependent_description):
+    m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
+
+    if not m:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    if house_rules is not None:
+        m.house_rules = house_rules
+    if dependent_description is not None:
+        m.dependent_description = dependent_description
+
+    db.commit()
+    db.refresh(m)
+    return m
+
 @router.put("/{member_user_id}", response_model=MemberResponse)
-def update_member(
+async def update_member(
     member_user_id: int,
     house_rules: Optional[str] = Query(None),
     dependent_description: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
-        
-        if not m:
-            raise HTTPException(status_code=404, detail="Member not found")
-        
-        if house_rules is not None:
-            m.house_rules = house_rules
-        if dependent_description is not None:
-            m.dependent_description = dependent_description
-        
-        db.commit()
-        db.refresh(m)
-        return m
+        return await run_db(db, _update_member, member_user_id, house_rules, dependent_description)
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /members/{member_user_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -110,15 +179,20 @@ def update_member(
 #endregion update member
 
 #region delete member
+def _delete_member(db: Session, member_user_id: int):
+    m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
+    if not m:
+        raise HTTPException(status_code=404, detail="Member not found")
+
+    db.delete(m)
+    db.commit()
+
 @router.delete("/{member_user_id}", status_code=204)
-def delete_member(member_user_id: int, db: Session = Depends(get_db)):
+async def delete_member(member_user_id: int, db: DbSession = Depends(get_db)):
     try:
-        m = db.query(Member).filter(Member.member_user_id == member_user_id).first()
-        if not m:
-            raise HTTPException(status_code=404, detail="Member not found")
-        
-        db.delete(m)
-        db.commit()
+        await run_db(db, _delete_member, member_user_id)
+        #address, jobs and appointments of the member are removed by ON DELETE CASCADE
+        entity_cache.invalidate_tags([("member", member_user_id)])
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /members/{member_user_id}: {str(e)}", exc_info=True)
@@ -126,4 +200,4 @@ def delete_member(member_user_id: int, db: Session = Depends(get_db)):
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion delete member
\ No newline at end of file
+#endregion delete member
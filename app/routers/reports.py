@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError
+import logging
+
+from typing import List, Optional
+
+from app.reports import job_applicants, caregiver_accepted, accepted_totals, appointment_costs, refresh_report_views
+from app.schemas import JobApplicantsRow, AcceptedTotals, CaregiverRateRow, AppointmentCostRow
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.database import get_db, run_db, DbSession
+
+logger = logging.getLogger(__name__)
+
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+
+#Queries 6.1 - 7 of database_queries.py, read from the materialized views in app/reports.py.
+#results are as of the last refresh (refreshed_at of /reports/accepted-totals)
+
+#region 6.1 applicants per job
+def _get_job_applicants(db: Session, cursor: Optional[str], limit: int):
+    return keyset_page(db.query(job_applicants), [job_applicants.c.job_id], cursor, limit)
+
+@router.get("/job-applicants", response_model=List[JobApplicantsRow])
+async def get_job_applicants(
+    response: Response,
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    try:
+        rows, next_cursor = await run_db(db, _get_job_applicants, cursor, limit)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /reports/job-applicants: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
+#region 6.2 / 6.3 accepted hours and average rate
+def _get_accepted_totals(db: Session):
+    return db.execute(select(accepted_totals)).one()
+
+@router.get("/accepted-totals", response_model=AcceptedTotals)
+async def get_accepted_totals(db: DbSession = Depends(get_db)):
+    try:
+        return await run_db(db, _get_accepted_totals)
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /reports/accepted-totals: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
+#region 6.4 caregivers above the average accepted rate
+def _get_above_average_caregivers(db: Session, cursor: Optional[str], limit: int):
+    average = select(accepted_totals.c.average_hourly_rate).scalar_subquery()
+    query = db.query(caregiver_accepted).filter(caregiver_accepted.c.hourly_rate > average)
+    return keyset_page(query, [caregiver_accepted.c.hourly_rate, caregiver_accepted.c.caregiver_user_id], cursor, limit, descending=True)
+
+@router.get("/above-average-caregivers", response_model=List[CaregiverRateRow])
+async def get_above_average_caregivers(
+    response: Response,
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    try:
+        rows, next_cursor = await run_db(db, _get_above_average_caregivers, cursor, limit)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /reports/above-average-caregivers: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
+#region 7 cost per accepted appointment
+def _get_appointment_costs(db: Session, cursor: Optional[str], limit: int):
+    return keyset_page(db.query(appointment_costs), [appointment_costs.c.appointment_id], cursor, limit)
+
+@router.get("/appointment-costs", response_model=List[AppointmentCostRow])
+async def get_appointment_costs(
+    response: Response,
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: DbSession = Depends(get_db)
+):
+    try:
+        rows, next_cursor = await run_db(db, _get_appointment_costs, cursor, limit)
+        set_next_cursor(response, next_cursor)
+        return rows
+    except OperationalError as e:
+        logger.error(f"Database connection error in GET /reports/appointment-costs: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+#endregion
+
+#region refresh
+@router.post("/refresh")
+async def refresh_reports(db: DbSession = Depends(get_db)):
+    #the background task does this every REPORTS_REFRESH_SECONDS; returns ms per view
+    try:
+        timings = await run_db(db, refresh_report_views)
+    except OperationalError as e:
+        logger.error(f"Database connection error in POST /reports/refresh: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
+        )
+    if timings is None:
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return timings
+#endregion
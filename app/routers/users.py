@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Form, Query
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, IntegrityError
 import logging
 
 from typing import List, Optional
@@ -8,8 +8,14 @@ from pydantic import EmailStr
 import re
 
 from app.models import User
-from app.schemas import UserCreate, UserUpdate, UserResponse
-from app.database import get_db
+from app.schemas import UserCreate, UserUpdate, UserResponse, BulkCreateResponse
+from app.bulk import read_bulk_rows, validate_rows, insert_rows, row_error, bulk_response, BULK_DESCRIPTION
+from app.fields import parse_fields, load_fields, project, sparse_response, fields_description
+from app.pagination import keyset_page, set_next_cursor, CURSOR_DESCRIPTION, MAX_PAGE_SIZE
+from app.cache import entity_cache
+from app.matching import caregiver_matcher
+from app.applicant_counts import release_caregiver_applications
+from app.database import get_db, run_db, DbSession, pg_error_code, UNIQUE_VIOLATION
 
 logger = logging.getLogger(__name__)
 
@@ -46,8 +52,43 @@ def validate_phone(phone: str) -> bool:
 #endregion validation methods
 
 #region create user
+def _create_user(db: Session, email, given_name, surname, city, phone_number, profile_description, password):
+    #region validation 
+    if db.query(User).filter(User.email == email).first():
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    #email not validated, because Pydantic auto validates it
+    
+    if not validate_phone(phone_number):
+        raise HTTPException(status_code=400, detail="Invalid phone number format. Expected format: +77071111111 or 87071111111")
+    #endregion validation 
+
+    #user_id is generated by the database (identity column)
+    u = User(
+        email=email,
+        given_name=given_name,
+        surname=surname,
+        city=city,
+        phone_number=phone_number,
+        profile_description=profile_description,
+        password=password
+    )
+
+    db.add(u)
+    try:
+        db.commit()
+    except IntegrityError as e:
+        #concurrent request registered the same email between the check and the insert
+        db.rollback()
+        if pg_error_code(e) == UNIQUE_VIOLATION:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise
+    db.refresh(u)
+
+    return u
+
 @router.post("/", response_model=UserResponse, status_code=201)
-def create_user(
+async def create_user(
     email: EmailStr = Form(...),
     given_name: str = Form(...),
     surname: str = Form(...),
@@ -55,56 +96,87 @@ def create_user(
     phone_number: str = Form(...),
     profile_description: Optional[str] = Form(None),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        #region validation 
-        if db.query(User).filter(User.email == email).first():
-            raise HTTPException(status_code=400, detail="Email already registered")
-
-        #email not validated, because Pydantic auto validates it
-        
-        if not validate_phone(phone_number):
-            raise HTTPException(status_code=400, detail="Invalid phone number format. Expected format: +77071111111 or 87071111111")
-        #endregion validation 
-
-        #user_id is auto-generated. 
-        max_u = db.query(User).order_by(User.user_id.desc()).first()
-        new_user_id = (max_u.user_id + 1) if max_u else 1
-        
-        u = User(
-            user_id=new_user_id,
-            email=email,
-            given_name=given_name,
-            surname=surname,
-            city=city,
-            phone_number=phone_number,
-            profile_description=profile_description,
-            password=password
+        return await run_db(db, _create_user, email, given_name, surname, city, phone_number, profile_description, password)
+    except OperationalError as e:
+        logger.error(f"Database connection error in POST /users/: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Database connection error. Please try again later."
         )
+#endregion create user
 
-        db.add(u)
-        db.commit()
-        db.refresh(u)
+#region bulk create users
+def _create_users_bulk(db: Session, rows: list):
+    valid, errors = validate_rows(rows, UserCreate)
 
-        return u
+    #region validation
+    checked = []
+    emails = set()
+    for row, user in valid:
+        if not validate_phone(user.phone_number):
+            errors.append(row_error(row, "Invalid phone number format. Expected format: +77071111111 or 87071111111"))
+        elif user.email in emails:
+            errors.append(row_error(row, "Duplicate email in request"))
+        else:
+            emails.add(user.email)
+            checked.append((row, user))
+
+    #one query for the whole batch instead of one per row
+    registered = {email for (email,) in db.query(User.email).filter(User.email.in_(emails))} if emails else set()
+    #endregion validation
+
+    to_insert = []
+    for row, user in checked:
+        if user.email in registered:
+            errors.append(row_error(row, "Email already registered"))
+        else:
+            to_insert.append((row, user.model_dump()))
+
+    created, insert_errors = insert_rows(db, User, to_insert)
+    db.commit()
+    return bulk_response(created, errors + insert_errors)
+
+@router.post("/bulk", response_model=BulkCreateResponse, description=BULK_DESCRIPTION)
+async def create_users_bulk(request: Request, db: DbSession = Depends(get_db)):
+    rows = await read_bulk_rows(request)
+    try:
+        return await run_db(db, _create_users_bulk, rows)
     except OperationalError as e:
-        logger.error(f"Database connection error in POST /users/: {str(e)}", exc_info=True)
+        logger.error(f"Database connection error in POST /users/bulk: {str(e)}", exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Database connection error. Please try again later."
         )
-#endregion create user
+#endregion bulk create users
 
 #region get user
+def _get_user(db: Session, user_id: int):
+    u = db.query(User).filter(User.user_id == user_id).first()
+
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    return u
+
+async def _load_user(db: DbSession, user_id: int):
+    return UserResponse.model_validate(await run_db(db, _get_user, user_id))
+
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(
+    user_id: int,
+    fields: Optional[str] = Query(None, description=fields_description(UserResponse)),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, UserResponse)
     try:
-        u = db.query(User).filter(User.user_id == user_id).first()
-
-        if not u:
-            raise HTTPException(status_code=404, detail="User not found")
-        return u
+        u = await entity_cache.read_through(
+            ("user", user_id),
+            lambda: _load_user(db, user_id),
+            tags=[("user", user_id)]
+        )
+        return u if fields is None else sparse_response(project(u, fields))
     except OperationalError as e:
         logger.error(f"Database connection error in GET /users/{user_id}: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -114,10 +186,25 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 #endregion get user
 
 #region get all users
+def _get_users(db: Session, fields: Optional[list], cursor: Optional[str], limit: int, skip: int):
+    u, next_cursor = keyset_page(load_fields(db.query(User), User, fields), [User.user_id], cursor, limit, skip)
+    return (u if fields is None else [project(row, fields) for row in u]), next_cursor
+
 @router.get("/", response_model=List[UserResponse])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_users(
+    response: Response,
+    fields: Optional[str] = Query(None, description=fields_description(UserResponse)),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use cursor instead"),
+    db: DbSession = Depends(get_db)
+):
+    fields = parse_fields(fields, UserResponse)
     try:
-        u = db.query(User).offset(skip).limit(limit).all()
+        u, next_cursor = await run_db(db, _get_users, fields, cursor, limit, skip)
+        if fields is not None:
+            return sparse_response(u, next_cursor)
+        set_next_cursor(response, next_cursor)
         return u
     except OperationalError as e:
         logger.error(f"Database connection error in GET /users/: {str(e)}", exc_info=True)
@@ -128,8 +215,43 @@ def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
 #endregion get all users
 
 #region update user
+def _update_user(db: Session, user_id: int, email, given_name, surname, city, phone_number, profile_description, password):
+    u = db.query(User).filter(User.user_id == user_id).first()
+
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    #region validation
+    if email is not None and email != u.email:
+        if db.query(User).filter(User.email == email).first():
+            raise HTTPException(status_code=400, detail="Email already registered")
+        u.email = email
+    
+    if phone_number is not None:
+        if not validate_phone(phone_number):
+            raise HTTPException(status_code=400, detail="Invalid phone number format. Expected format: +77071111111 or 87071111111")
+        u.phone_number = phone_number
+    #endregion validation
+
+    if given_name is not None:
+        u.given_name = given_name
+    if surname is not None:
+        u.surname = surname
+    if city is not None:
+        u.city = city
+    if profile_description is not None:
+        u.profile_description = profile_description
+    if password is not None:
+        u.password = password
+    
+    db.commit()
+    if city is not None:
+        caregiver_matcher.mark_dirty(user_id)
+    db.refresh(u)
+    return u
+
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(
+async def update_user(
     user_id: int,
     email: Optional[EmailStr] = Query(None),
     given_name: Optional[str] = Query(None),
@@ -138,39 +260,11 @@ def update_user(
     phone_number: Optional[str] = Query(None),
     profile_description: Optional[str] = Query(None),
     password: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_db)
 ):
     try:
-        u = db.query(User).filter(User.user_id == user_id).first()
-
-        if not u:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        #region validation
-        if email is not None and email != u.email:
-            if db.query(User).filter(User.email == email).first():
-                raise HTTPException(status_code=400, detail="Email already registered")
-            u.email = email
-        
-        if phone_number is not None:
-            if not validate_phone(phone_number):
-                raise HTTPException(status_code=400, detail="Invalid phone number format. Expected format: +77071111111 or 87071111111")
-            u.phone_number = phone_number
-        #endregion validation
-
-        if given_name is not None:
-            u.given_name = given_name
-        if surname is not None:
-            u.surname = surname
-        if city is not None:
-            u.city = city
-        if profile_description is not None:
-            u.profile_description = profile_description
-        if password is not None:
-            u.password = password
-        
-        db.commit()
-        db.refresh(u)
+        u = await run_db(db, _update_user, user_id, email, given_name, surname, city, phone_number, profile_description, password)
+        entity_cache.delete(("user", user_id))
         return u
     except OperationalError as e:
         logger.error(f"Database connection error in PUT /users/{user_id}: {str(e)}", exc_info=True)
@@ -181,17 +275,26 @@ def update_user(
 #endregion update user
 
 #region delete user
-@router.delete("/{user_id}", status_code=204)
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    try:
-        u = db.query(User).filter(User.user_id == user_id).first()
+def _delete_user(db: Session, user_id: int):
+    u = db.query(User).filter(User.user_id == user_id).first()
 
-        if not u:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        db.delete(u)
-        db.commit()
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    job_ids = release_caregiver_applications(db, user_id)
+    db.delete(u)
+    db.commit()
+    caregiver_matcher.mark_dirty(user_id)
+    return job_ids
 
+@router.delete("/{user_id}", status_code=204)
+async def delete_user(user_id: int, db: DbSession = Depends(get_db)):
+    try:
+        job_ids = await run_db(db, _delete_user, user_id)
+        #caregiver/member rows and everything below them are removed by ON DELETE CASCADE
+        entity_cache.invalidate_tags([("user", user_id), ("caregiver", user_id), ("member", user_id)])
+        for job_id in job_ids:
+            entity_cache.delete(("job", job_id))  #applicant_count
         return None
     except OperationalError as e:
         logger.error(f"Database connection error in DELETE /users/{user_id}: {str(e)}", exc_info=True)
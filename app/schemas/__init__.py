@@ -1,20 +1,24 @@
 from app.schemas.user import UserBase, UserCreate, UserUpdate, UserResponse
-from app.schemas.caregiver import CaregiverBase, CaregiverCreate, CaregiverUpdate, CaregiverResponse
-from app.schemas.member import MemberBase, MemberCreate, MemberUpdate, MemberResponse
+from app.schemas.caregiver import CaregiverBase, CaregiverCreate, CaregiverUpdate, CaregiverResponse, CaregiverExpanded, TimeSlot, CaregiverAvailability
+from app.schemas.member import MemberBase, MemberCreate, MemberUpdate, MemberResponse, MemberExpanded
 from app.schemas.address import AddressBase, AddressCreate, AddressUpdate, AddressResponse
-from app.schemas.job import JobBase, JobCreate, JobUpdate, JobResponse
+from app.schemas.job import JobBase, JobCreate, JobUpdate, JobResponse, JobExpanded, JobMatch
 from app.schemas.job_application import JobApplicationBase, JobApplicationCreate, JobApplicationUpdate, JobApplicationResponse
 from app.schemas.appointment import AppointmentBase, AppointmentCreate, AppointmentUpdate, AppointmentResponse
+from app.schemas.bulk import BulkCreatedRow, BulkRowError, BulkCreateResponse
+from app.schemas.report import JobApplicantsRow, AcceptedTotals, CaregiverRateRow, AppointmentCostRow
 
 #package with all SQLAlchemy schemas 
 
 __all__ = [
     "UserBase", "UserCreate", "UserUpdate", "UserResponse",
-    "CaregiverBase", "CaregiverCreate", "CaregiverUpdate", "CaregiverResponse",
-    "MemberBase", "MemberCreate", "MemberUpdate", "MemberResponse",
+    "CaregiverBase", "CaregiverCreate", "CaregiverUpdate", "CaregiverResponse", "CaregiverExpanded", "TimeSlot", "CaregiverAvailability",
+    "MemberBase", "MemberCreate", "MemberUpdate", "MemberResponse", "MemberExpanded",
     "AddressBase", "AddressCreate", "AddressUpdate", "AddressResponse",
-    "JobBase", "JobCreate", "JobUpdate", "JobResponse",
+    "JobBase", "JobCreate", "JobUpdate", "JobResponse", "JobExpanded", "JobMatch",
     "JobApplicationBase", "JobApplicationCreate", "JobApplicationUpdate", "JobApplicationResponse",
     "AppointmentBase", "AppointmentCreate", "AppointmentUpdate", "AppointmentResponse",
+    "BulkCreatedRow", "BulkRowError", "BulkCreateResponse",
+    "JobApplicantsRow", "AcceptedTotals", "CaregiverRateRow", "AppointmentCostRow",
 ]
 
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Any, List
+
+#response of POST /<entity>/bulk. row = 0-based position of the record in the request
+#(array index for JSON, index of the non-empty line for NDJSON)
+
+class BulkCreatedRow(BaseModel):
+    row: int
+    id: int
+
+class BulkRowError(BaseModel):
+    row: int
+    detail: Any
+
+class BulkCreateResponse(BaseModel):
+    created: List[BulkCreatedRow]
+    errors: List[BulkRowError]
@@ -1,7 +1,9 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from datetime import datetime
 
 from app.models.enums import CaregivingType, Gender
+from app.schemas.user import UserResponse
 
 class CaregiverBase(BaseModel):
     photo: Optional[str] = None
@@ -23,3 +25,17 @@ class CaregiverResponse(CaregiverBase):
 
     class Config:
         from_attributes = True
+
+class CaregiverExpanded(CaregiverResponse):
+    user: Optional[UserResponse] = None
+
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class CaregiverAvailability(BaseModel):
+    caregiver_user_id: int
+    start: datetime
+    end: datetime
+    busy: List[TimeSlot]
+    free: List[TimeSlot]
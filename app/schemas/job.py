@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 from app.models.enums import CaregivingType
+from app.schemas.job_application import JobApplicationResponse
 
 class JobBase(BaseModel):
     required_caregiving_type: CaregivingType
@@ -25,6 +26,18 @@ class JobUpdate(BaseModel):
 class JobResponse(JobBase):
     job_id: int
     member_user_id: int
+    applicant_count: int
 
     class Config:
         from_attributes = True
+
+class JobExpanded(JobResponse):
+    applications: Optional[List[JobApplicationResponse]] = None
+
+class JobMatch(BaseModel):
+    caregiver_user_id: int
+    score: float
+    caregiving_type_match: bool
+    same_city: bool
+    hourly_rate: int
+    accepted_hours: int
@@ -1,6 +1,9 @@
 from pydantic import BaseModel
 from typing import Optional
 
+from app.schemas.user import UserResponse
+from app.schemas.address import AddressResponse
+
 class MemberBase(BaseModel):
     house_rules: Optional[str] = None
     dependent_description: Optional[str] = None
@@ -17,3 +20,7 @@ class MemberResponse(MemberBase):
 
     class Config:
         from_attributes = True
+
+class MemberExpanded(MemberResponse):
+    user: Optional[UserResponse] = None
+    address: Optional[AddressResponse] = None
@@ -0,0 +1,46 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from decimal import Decimal
+
+#rows of the materialized reporting views (app/reports.py), served by /reports/*
+
+class JobApplicantsRow(BaseModel):
+    job_id: int
+    given_name: str
+    surname: str
+    number_of_applicants: int
+
+    class Config:
+        from_attributes = True
+
+class AcceptedTotals(BaseModel):
+    accepted_appointments: int
+    total_hours: int
+    average_hourly_rate: Optional[Decimal] = None
+    refreshed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class CaregiverRateRow(BaseModel):
+    caregiver_user_id: int
+    given_name: str
+    surname: str
+    hourly_rate: int
+    accepted_appointments: int
+
+    class Config:
+        from_attributes = True
+
+class AppointmentCostRow(BaseModel):
+    appointment_id: int
+    caregiver_user_id: int
+    given_name: str
+    surname: str
+    hourly_rate: int
+    work_hours: int
+    total_cost: int
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,29 @@
+from sqlalchemy import func, text
+
+#full-text search helpers (built-in tsvector + GIN, no extension needed).
+#config and '' are inline SQL, not bound params: the planner only uses an expression
+#index when the query repeats the indexed expression exactly, and asyncpg would send
+#bound params as $1 placeholders
+ENGLISH = text("'english'::regconfig")
+
+MAX_SEARCH_RESULTS = 100
+
+
+def tsvector(column):
+    return func.to_tsvector(ENGLISH, func.coalesce(column, text("''")))
+
+
+def tsquery(q: str):
+    #websearch syntax: words are ANDed, "quoted phrase", or, -excluded
+    return func.websearch_to_tsquery(ENGLISH, q)
+
+
+def ranked_search(query, document, q: str, tiebreak, limit: int):
+    #best matches first, tiebreak (primary key) keeps the order stable
+    ts_query = tsquery(q)
+    return (
+        query.filter(document.op("@@")(ts_query))
+        .order_by(func.ts_rank_cd(document, ts_query).desc(), tiebreak)
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,200 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import hashlib
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from sqlalchemy import event
+
+from app.metrics import current_route
+
+#slow query log: statements slower than SLOW_QUERY_MS on an instrumented engine are logged
+#with the route that issued them and their parameters reduced to types (no user data in
+#logs or plans), and aggregated in memory by fingerprint (statement with literals and placeholders
+#replaced by ?, IN lists / VALUES rows collapsed) for GET /admin/slow-queries.
+#the first slow run of a fingerprint, and SLOW_QUERY_EXPLAIN_RATE of later ones, get an
+#EXPLAIN (FORMAT JSON) plan - on a separate connection in a background thread, never inside
+#the request's transaction. the log is per process, like the entity cache
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))  #0 disables
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_NORMALIZE = [
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|\$\d+"), "?"),
+    (re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?+)"),
+    (re.compile(r"\(\?\+\)(?:\s*,\s*\(\?\+\))+"), "(?+), ..."),
+]
+
+
+def normalize(statement: str) -> str:
+    for pattern, replacement in _NORMALIZE:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.md5(normalize(statement).encode()).hexdigest()[:16]
+
+
+def _redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return f"<str len={len(value)}>"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<bytes len={len(value)}>"
+    if isinstance(value, (list, tuple)):
+        return f"<{type(value).__name__} len={len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def redact(parameters, executemany=False):
+    #executemany: number of rows and the first row
+    if executemany:
+        return {"rows": len(parameters), "first": redact(parameters[0]) if parameters else None}
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_redact_value(value) for value in parameters]
+    return None
+
+
+def redact_plan(node):
+    #EXPLAIN shows bound values in conditions ("(email = 'a@b.c'::text)"), replace them with ?
+    if isinstance(node, list):
+        return [redact_plan(child) for child in node]
+    if not isinstance(node, dict):
+        return node
+    redacted = {}
+    for key, value in node.items():
+        if isinstance(value, str) and ("Cond" in key or "Filter" in key):
+            value = _NORMALIZE[3][0].sub("?", _NORMALIZE[1][0].sub("?", value))
+        redacted[key] = redact_plan(value)
+    return redacted
+
+
+def _pyformat(statement: str, parameters):
+    #asyncpg statements ($1, $2, positional) -> psycopg2 (%s) for the EXPLAIN connection
+    if not isinstance(parameters, (list, tuple)) or "$" not in statement:
+        return statement, parameters
+    values = []
+
+    def placeholder(match):
+        values.append(parameters[int(match.group(1)) - 1])
+        return "%s"
+
+    statement = re.sub(r"\$(\d+)", placeholder, statement.replace("%", "%%"))
+    return statement, tuple(values)
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float, explain_rate: float, max_fingerprints: int):
+        self.threshold_ms = threshold_ms
+        self.explain_rate = explain_rate
+        self.max_fingerprints = max_fingerprints
+        self.explain_bind = None
+        self._entries = OrderedDict()  #fingerprint -> dict, least recently seen first
+        self._explaining = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    #region engine hooks
+    def instrument(self, engine, explain_bind=None):
+        #engine: sync Engine (async_engine.sync_engine for async). explain_bind: sync engine that runs
+        #the EXPLAINs, default engine itself - async mode passes the psycopg2 engine
+        if explain_bind is not None or self.explain_bind is None:
+            self.explain_bind = explain_bind or engine
+        if not event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        context._slow_query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.threshold_ms <= 0 or context.execution_options.get("slow_query_log") is False:
+            return
+        ms = (time.perf_counter() - context._slow_query_started) * 1000
+        if ms >= self.threshold_ms:
+            self.record(statement, parameters, ms, current_route(), executemany)
+    #endregion
+
+    def record(self, statement: str, parameters, ms: float, route=None, executemany=False):
+        key = fingerprint(statement)
+        redacted = redact(parameters, executemany)
+        logger.warning(f"Slow query {ms:.1f} ms [{key}] {route or '-'}: {normalize(statement)[:1000]} params={redacted}")
+
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = {
+                    "fingerprint": key, "statement": normalize(statement), "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "routes": {}, "slowest": None, "plan": None, "plan_captured_at": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += ms
+            entry["last_seen"] = datetime.now().isoformat(timespec="seconds")
+            entry["routes"][route or "-"] = entry["routes"].get(route or "-", 0) + 1
+            if ms >= entry["max_ms"]:
+                entry["max_ms"] = ms
+                entry["slowest"] = {"ms": round(ms, 2), "route": route, "parameters": redacted}
+            self._entries[key] = entry
+            while len(self._entries) > self.max_fingerprints:
+                self._entries.popitem(last=False)
+
+            explain = (
+                self.explain_bind is not None and key not in self._explaining
+                and statement.lstrip().upper().startswith(EXPLAINABLE)
+                and (entry["plan"] is None or random.random() < self.explain_rate)
+            )
+            if explain:
+                self._explaining.add(key)
+        if explain:
+            self._executor.submit(self._explain, key, statement, parameters[0] if executemany else parameters)
+
+    #region plans
+    def _explain(self, key, statement, parameters):
+        try:
+            statement, parameters = _pyformat(statement, parameters)
+            with self.explain_bind.connect().execution_options(slow_query_log=False) as conn:
+                plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters or ()).scalar()
+                conn.rollback()
+            with self._lock:
+                if key in self._entries:
+                    self._entries[key]["plan"] = redact_plan(plan[0] if isinstance(plan, list) else plan)
+                    self._entries[key]["plan_captured_at"] = datetime.now().isoformat(timespec="seconds")
+        except Exception as e:
+            logger.info(f"Could not explain slow query [{key}]: {str(e).splitlines()[0]}")
+        finally:
+            with self._lock:
+                self._explaining.discard(key)
+    #endregion
+
+    def entries(self, order: str = "total_ms", limit: int = 50) -> list:
+        with self._lock:
+            entries = [dict(e, routes=dict(e["routes"])) for e in self._entries.values()]
+        for e in entries:
+            e["total_ms"] = round(e["total_ms"], 2)
+            e["max_ms"] = round(e["max_ms"], 2)
+            e["mean_ms"] = round(e["total_ms"] / e["count"], 2)
+        return sorted(entries, key=lambda e: e[order], reverse=True)[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN_RATE, SLOW_QUERY_MAX_FINGERPRINTS)
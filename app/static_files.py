@@ -0,0 +1,156 @@
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from email.utils import formatdate, parsedate_to_datetime
+import anyio
+import os
+import re
+
+#file serving with validators: strong ETag + Last-Modified, 304 for If-None-Match / If-Modified-Since
+#(no file is opened), single byte ranges (206 / 416, If-Range) and Cache-Control.
+#starlette 0.27 FileResponse always sends the whole file and only StaticFiles knows about 304.
+#files here are never rewritten in place: uploads and derived photos are written to a temp file and
+#renamed, so inode + mtime + size identify the bytes and are used as a strong ETag
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"  #may be stored, but must be revalidated (cheap 304) on every use
+
+#names that never get new content: stored photos {sha256}.ext, derived {sha256}_{px}.jpg, legacy uploads {user_id}_{uuid4 hex}.ext
+IMMUTABLE_NAME = re.compile(r"^([0-9a-f]{64}(_\d+)?\.\w+|\d+_[0-9a-f]{32}\.\w+)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    return f'"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _parse_http_date(value: str):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        #weak comparison, If-Modified-Since is ignored when If-None-Match is sent
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and int(mtime) <= since
+    return False
+
+
+def _byte_range(request: Request, etag: str, mtime: float, size: int):
+    #(start, end) inclusive, None to send the whole file
+    header = request.headers.get("range")
+    if not header:
+        return None
+
+    if_range = request.headers.get("if-range")
+    if if_range:
+        #strong comparison for etags, exact match for dates
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            if if_range != etag:
+                return None
+        elif _parse_http_date(if_range) != int(mtime):
+            return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  #multiple ranges are not supported, a full response is allowed instead
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if end < start and last:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+class _PartialFileResponse(FileResponse):
+    #206 with only bytes start..end of the file
+    def __init__(self, path, start: int, end: int, **kwargs):
+        super().__init__(path, status_code=206, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{self.stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break  #file shrank, nothing we can do mid-response
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def send_file(request: Request, path, stat_result: os.stat_result, cache_control: str, media_type=None) -> Response:
+    etag = file_etag(stat_result)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = _byte_range(request, etag, stat_result.st_mtime, stat_result.st_size)
+    except RangeNotSatisfiable:
+        headers["content-range"] = f"bytes */{stat_result.st_size}"
+        return Response(status_code=416, headers=headers)
+
+    kwargs = dict(headers=headers, media_type=media_type, stat_result=stat_result, method=request.method)
+    if byte_range is None:
+        return FileResponse(path, **kwargs)
+    return _PartialFileResponse(path, *byte_range, **kwargs)
+
+
+class CachedStaticFiles(StaticFiles):
+    #StaticFiles with send_file semantics; names matching immutable_names are cached for a year
+    def __init__(self, *args, immutable_names=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_names = immutable_names
+
+    def lookup_path(self, path):
+        #hidden files and directories (.incoming of older deployments, editor / vcs leftovers) are never served
+        if any(part.startswith(".") for part in path.replace("\\", "/").split("/")):
+            return "", None
+        return super().lookup_path(path)
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        if status_code != 200:
+            #html 404 page
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        immutable = self.immutable_names is not None and self.immutable_names.match(os.path.basename(full_path))
+        return send_file(Request(scope), full_path, stat_result, IMMUTABLE if immutable else REVALIDATE)
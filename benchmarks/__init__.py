@@ -0,0 +1 @@
+#package with performance scripts (not collected by pytest, run them by hand)
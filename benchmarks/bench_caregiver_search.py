@@ -0,0 +1,87 @@
+"""Latency and query plans of GET /caregivers/search at scale.
+
+    python -m benchmarks.bench_caregiver_search --caregivers 1000000
+
+Seeds N accounts + caregivers into DATABASE_URL inside one transaction, runs the router
+search function (_search_caregivers) for a few typical filter sets, prints p50/p95 and the
+EXPLAIN ANALYZE of the exact SQL it sent, then rolls everything back.
+"""
+import argparse
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models.enums import CaregivingType, Gender
+from app.routers.caregivers import _search_caregivers
+from benchmarks.common import percentile
+
+SEED_SQL = """
+WITH base AS (SELECT COALESCE(MAX(user_id), 0) AS offset_id FROM account)
+INSERT INTO account (user_id, email, given_name, surname, city, phone_number, password)
+SELECT offset_id + g, 'search_bench_' || g || '@example.com', 'Bench', 'Caregiver',
+       (ARRAY['Astana', 'Almaty', 'Shymkent', 'Karaganda', 'Aktobe', 'Taraz', 'Pavlodar', 'Oskemen', 'Semey', 'Atyrau'])[1 + g % 10],
+       '+77070000000', 'password123'
+FROM base, generate_series(1, :n) AS g
+"""
+
+SEED_CAREGIVERS_SQL = """
+INSERT INTO CAREGIVER (caregiver_user_id, photo, gender, caregiving_type, hourly_rate)
+SELECT user_id, 'bench.jpg',
+       (ARRAY['MALE', 'FEMALE', 'OTHER']::gender_enum[])[1 + user_id % 3],
+       (ARRAY['BABYSITTER', 'ELDERLY_CARE', 'PLAYMATE_FOR_CHILDREN']::caregiving_type_enum[])[1 + (user_id / 3) % 3],
+       500 + (user_id::bigint * 7919) % 4500
+FROM account WHERE email LIKE 'search_bench_%'
+"""
+
+SCENARIOS = [
+    ("type + rate range", dict(caregiving_type=CaregivingType.BABYSITTER, gender=None, min_rate=1000, max_rate=2000, city=None, order="asc")),
+    ("type + gender + city, desc", dict(caregiving_type=CaregivingType.ELDERLY_CARE, gender=Gender.FEMALE, min_rate=None, max_rate=None, city="Astana", order="desc")),
+    ("city only", dict(caregiving_type=None, gender=None, min_rate=None, max_rate=None, city="Almaty", order="asc")),
+    ("rate range only", dict(caregiving_type=None, gender=None, min_rate=3000, max_rate=3100, city=None, order="asc")),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caregivers", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            started = time.perf_counter()
+            conn.execute(text(SEED_SQL), {"n": args.caregivers})
+            conn.execute(text(SEED_CAREGIVERS_SQL))
+            conn.execute(text("ANALYZE account"))
+            conn.execute(text("ANALYZE CAREGIVER"))
+            print(f"seeded {args.caregivers} caregivers in {time.perf_counter() - started:.1f}s\n")
+
+            statements = []
+            event.listen(conn, "before_cursor_execute", lambda *a: statements.append((a[2], a[3])))
+            session = Session(bind=conn)
+
+            for label, filters in SCENARIOS:
+                latencies, cursor = [], None
+                for _ in range(args.repeat):
+                    t = time.perf_counter()
+                    _, next_cursor = _search_caregivers(session, cursor=cursor, limit=args.limit, **filters)
+                    latencies.append(time.perf_counter() - t)
+                    cursor = next_cursor  #walk forward, deeper pages must cost the same
+                    session.expunge_all()
+                print(f"{label}: p50={percentile(latencies, 50) * 1000:.2f}ms p95={percentile(latencies, 95) * 1000:.2f}ms")
+
+                sql, params = statements[-1]
+                plan = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + sql, params).fetchall()
+                print("\n".join("    " + row[0] for row in plan) + "\n")
+
+            session.close()
+        finally:
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare requests/sec and latency of DB_MODE=sync and DB_MODE=async.
+
+    python -m benchmarks.bench_db_modes --requests 5000 --concurrency 100
+
+Both servers use the same DATABASE_URL, so run it against a disposable database.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import run_server, summarize
+
+
+async def _load(base_url, paths, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return summarize(latencies, elapsed, errors)
+
+
+def _seed_user(base_url):
+    response = httpx.post(f"{base_url}/users/", data={
+        "email": f"bench_{uuid.uuid4().hex[:12]}@example.com",
+        "given_name": "Bench",
+        "surname": "Mark",
+        "city": "Astana",
+        "phone_number": "+77071234567",
+        "password": "password123",
+    })
+    response.raise_for_status()
+    return response.json()["user_id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    user_id = None
+    for i, mode in enumerate(args.modes):
+        with run_server(args.port + i, env={"DB_MODE": mode}) as base_url:
+            if user_id is None:
+                user_id = _seed_user(base_url)
+            paths = [f"/users/{user_id}", "/users/?limit=20"]
+            asyncio.run(_load(base_url, paths, min(200, args.requests), args.concurrency))  #warm-up
+            results[mode] = asyncio.run(_load(base_url, paths, args.requests, args.concurrency))
+        print(f"{mode:>6}: {results[mode]}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Before/after timings for the FK and status index set (app/indexes.py).
+
+    python -m benchmarks.bench_indexes --appointments 10000000
+
+Inside one transaction on DATABASE_URL: drops the managed indexes of JOB, JOB_APPLICATION
+and APPOINTMENT, seeds members, caregivers, jobs, applications and N appointments, times
+the reporting queries and cascading deletes, builds the indexes, times everything again
+and rolls back. Takes ACCESS EXCLUSIVE locks on those tables - use a dev database.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from app.database import engine
+from app.indexes import managed_indexes
+
+TABLES = {"job", "job_application", "appointment"}
+
+SEED = [
+    #accounts: first half caregivers, second half members
+    """
+    INSERT INTO account (user_id, email, given_name, surname, city, phone_number, password)
+    SELECT :base + g, 'index_bench_' || g || '@example.com', 'Bench', 'User', 'Astana', '+77070000000', 'password123'
+    FROM generate_series(1, 2 * :people) AS g
+    """,
+    """
+    INSERT INTO CAREGIVER (caregiver_user_id, photo, gender, caregiving_type, hourly_rate)
+    SELECT :base + g, 'bench.jpg', 'FEMALE', (ARRAY['BABYSITTER', 'ELDERLY_CARE', 'PLAYMATE_FOR_CHILDREN']::caregiving_type_enum[])[1 + g % 3], 500 + g % 2000
+    FROM generate_series(1, :people) AS g
+    """,
+    """
+    INSERT INTO MEMBER (member_user_id, house_rules)
+    SELECT :base + :people + g, 'No pets'
+    FROM generate_series(1, :people) AS g
+    """,
+    """
+    INSERT INTO JOB (job_id, member_user_id, required_caregiving_type, date_posted)
+    SELECT :job_base + g, :base + :people + 1 + g % :people,
+           (ARRAY['BABYSITTER', 'ELDERLY_CARE', 'PLAYMATE_FOR_CHILDREN']::caregiving_type_enum[])[1 + g % 3],
+           DATE '2020-01-01' + g % 2000
+    FROM generate_series(1, :jobs) AS g
+    """,
+    """
+    INSERT INTO JOB_APPLICATION (caregiver_user_id, job_id, date_applied)
+    SELECT :base + 1 + (g + k * (:people / 2)) % :people, :job_base + g, DATE '2024-01-01'
+    FROM generate_series(1, :jobs) AS g, generate_series(0, 1) AS k
+    """,
+    #10% ACCEPTED, 30% PENDING, 60% DECLINED
+    """
+    INSERT INTO APPOINTMENT (appointment_id, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status)
+    SELECT :appointment_base + g, :base + 1 + g % :people, :base + :people + 1 + (g / 7) % :people,
+           DATE '2024-01-01' + g % 700, TIME '09:00', 1 + g % 8,
+           CASE WHEN g % 10 = 0 THEN 'ACCEPTED' WHEN g % 10 < 4 THEN 'PENDING' ELSE 'DECLINED' END::appointment_status_enum
+    FROM generate_series(1, :appointments) AS g
+    """,
+]
+
+#(label, sql, is_delete) - deletes run in a savepoint that is rolled back, so every run deletes the same rows
+QUERIES = [
+    ("6.2 total accepted hours", "SELECT SUM(work_hours) FROM APPOINTMENT WHERE status = 'ACCEPTED'", False),
+    ("7 accepted cost (aggregated)", """
+        SELECT COUNT(*), SUM(c.hourly_rate * a.work_hours)
+        FROM APPOINTMENT a JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+        WHERE a.status = 'ACCEPTED'
+    """, False),
+    ("appointments of one caregiver", "SELECT COUNT(*) FROM APPOINTMENT WHERE caregiver_user_id = :base + 1", False),
+    ("accepted hours of one caregiver", "SELECT SUM(work_hours) FROM APPOINTMENT WHERE caregiver_user_id = :base + 1 AND status = 'ACCEPTED'", False),
+    ("applicants of one job", "SELECT COUNT(*) FROM JOB_APPLICATION WHERE job_id = :job_base + 1", False),
+    ("latest ELDERLY_CARE jobs", "SELECT job_id FROM JOB WHERE required_caregiving_type = 'ELDERLY_CARE' ORDER BY date_posted DESC LIMIT 20", False),
+    ("delete member (cascade)", "DELETE FROM MEMBER WHERE member_user_id = :base + :people + 1", True),
+    ("delete caregiver (cascade)", "DELETE FROM CAREGIVER WHERE caregiver_user_id = :base + 1", True),
+]
+
+
+def _time_queries(conn, params, repeat):
+    results = {}
+    for label, sql, is_delete in QUERIES:
+        runs = []
+        for _ in range(repeat):
+            savepoint = conn.begin_nested() if is_delete else None
+            started = time.perf_counter()
+            result = conn.execute(text(sql), params)
+            if result.returns_rows:
+                result.fetchall()
+            runs.append(time.perf_counter() - started)
+            if savepoint is not None:
+                savepoint.rollback()
+        results[label] = statistics.median(runs) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=10_000_000)
+    parser.add_argument("--people", type=int, default=10_000, help="caregivers and members each")
+    parser.add_argument("--jobs", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as json to this file")
+    args = parser.parse_args()
+
+    indexes = [index for index in managed_indexes() if index.table.name in TABLES]
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text("SET LOCAL max_parallel_workers_per_gather = 0"))  #comparable numbers on any machine
+            params = {
+                "people": args.people, "jobs": args.jobs, "appointments": args.appointments,
+                "base": conn.execute(text("SELECT COALESCE(MAX(user_id), 0) FROM account")).scalar(),
+                "job_base": conn.execute(text("SELECT COALESCE(MAX(job_id), 0) FROM JOB")).scalar(),
+                "appointment_base": conn.execute(text("SELECT COALESCE(MAX(appointment_id), 0) FROM APPOINTMENT")).scalar(),
+            }
+
+            for index in indexes:
+                conn.execute(text(f'DROP INDEX IF EXISTS "{index.name}"'))
+
+            started = time.perf_counter()
+            for sql in SEED:
+                conn.execute(text(sql), params)
+            conn.execute(text("ANALYZE account, CAREGIVER, MEMBER, JOB, JOB_APPLICATION, APPOINTMENT"))
+            print(f"seeded {args.appointments} appointments, {args.jobs} jobs in {time.perf_counter() - started:.1f}s")
+
+            before = _time_queries(conn, params, args.repeat)
+
+            build = {}
+            for index in indexes:
+                started = time.perf_counter()
+                conn.execute(CreateIndex(index))
+                build[index.name] = (time.perf_counter() - started) * 1000
+            conn.execute(text("ANALYZE JOB, JOB_APPLICATION, APPOINTMENT"))
+
+            after = _time_queries(conn, params, args.repeat)
+        finally:
+            transaction.rollback()
+
+    print(f"\n{'query':<34}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for label in before:
+        print(f"{label:<34}{before[label]:>12.2f}{after[label]:>12.2f}{before[label] / after[label]:>9.0f}x")
+    print("\nindex build:")
+    for name, ms in build.items():
+        print(f"  {name:<32}{ms / 1000:>8.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "before_ms": before, "after_ms": after, "index_build_ms": build}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Snapshot build, incremental patch and ranking time of GET /jobs/{id}/matches.
+
+    python -m benchmarks.datagen --caregivers 1000000 --members 100000 --jobs 10000 --appointments 2000000
+    python -m benchmarks.bench_matching --repeat 50
+
+Builds the caregiver snapshot from DATABASE_URL (full rebuild), patches it for --dirty
+random caregivers (what a burst of writes costs the next request), then ranks every
+caregiver for --repeat random jobs and prints p50/p95 of the numpy scoring alone.
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.matching import CaregiverMatcher
+from app.models.enums import CaregivingType
+from benchmarks.common import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--dirty", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    matcher = CaregiverMatcher()
+    started = time.perf_counter()
+    snapshot = matcher.rebuild(engine)
+    print(f"full rebuild: {len(snapshot)} caregivers in {time.perf_counter() - started:.2f}s")
+
+    rng = random.Random(1)
+    matcher.mark_dirty(*rng.sample([int(i) for i in snapshot.ids], min(args.dirty, len(snapshot))))
+    started = time.perf_counter()
+    snapshot = matcher.refresh(engine)
+    print(f"patch of {args.dirty} caregivers: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    with engine.connect() as conn:
+        cities = [city for (city,) in conn.execute(text("SELECT DISTINCT city FROM account"))]
+
+    latencies = []
+    for _ in range(args.repeat):
+        caregiving_type, city = rng.choice(list(CaregivingType)), rng.choice(cities)
+        t = time.perf_counter()
+        matcher.top(snapshot, caregiving_type, city, args.limit)
+        latencies.append(time.perf_counter() - t)
+    print(f"rank {len(snapshot)} caregivers, top {args.limit}: p50={percentile(latencies, 50) * 1000:.2f}ms p95={percentile(latencies, 95) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
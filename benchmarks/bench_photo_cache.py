@@ -0,0 +1,113 @@
+"""Repeat-view bandwidth and latency of caregiver photos with and without validators.
+
+    python -m benchmarks.bench_photo_cache --views 2000 --concurrency 20 --size-kb 500
+
+Starts uvicorn against DATABASE_URL, creates one caregiver with a --size-kb photo and
+requests it --views times per scenario:
+  full         plain GET, what every view cost before conditional requests
+  conditional  If-None-Match with the ETag of the first response (browser revalidation)
+  range        Range: bytes=0-65535 (first chunk of a resumed / progressive download)
+for both GET /caregivers/{id}/photo and /static/{photo}. Reports bytes on the wire
+(body + headers) per view and latency percentiles. The caregiver is deleted at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import run_server, summarize
+
+SCENARIOS = {
+    "full": lambda etag: {},
+    "conditional": lambda etag: {"If-None-Match": etag},
+    "range": lambda etag: {"Range": "bytes=0-65535"},
+}
+
+
+def _seed_caregiver(base_url, payload):
+    user = httpx.post(f"{base_url}/users/", data={
+        "email": f"photo_cache_bench_{uuid.uuid4().hex[:8]}@example.com",
+        "given_name": "Photo",
+        "surname": "Bench",
+        "city": "Astana",
+        "phone_number": "+77071234567",
+        "password": "password123",
+    }).json()
+    response = httpx.post(f"{base_url}/caregivers/", data={
+        "caregiver_user_id": user["user_id"],
+        "gender": "OTHER",
+        "caregiving_type": "BABYSITTER",
+        "hourly_rate": 1000,
+    }, files={"photo": ("bench.jpg", payload, "image/jpeg")})
+    response.raise_for_status()
+    return user["user_id"], response.json()["photo"]
+
+
+def _wire_bytes(response):
+    return len(response.content) + sum(len(k) + len(v) + 4 for k, v in response.headers.raw)
+
+
+async def _views(base_url, path, headers, total, concurrency):
+    latencies = []
+    transferred = 0
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def one():
+            nonlocal transferred, errors
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code not in (200, 206, 304):
+                    errors += 1
+                transferred += _wire_bytes(response)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors, transferred
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--views", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--size-kb", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8791)
+    parser.add_argument("--output", help="write results as json to this file")
+    args = parser.parse_args()
+
+    results = {}
+    with run_server(args.port) as base_url:
+        caregiver_id, photo = _seed_caregiver(base_url, os.urandom(args.size_kb * 1024))
+        try:
+            for route in (f"/caregivers/{caregiver_id}/photo", f"/static/{photo}"):
+                etag = httpx.get(f"{base_url}{route}").headers["etag"]
+                for scenario, headers in SCENARIOS.items():
+                    latencies, elapsed, errors, transferred = asyncio.run(
+                        _views(base_url, route, headers(etag), args.views, args.concurrency)
+                    )
+                    result = summarize(latencies, elapsed, errors)
+                    result["kb_per_view"] = round(transferred / len(latencies) / 1024, 2)
+                    results[f"{route.split('/')[1]} {scenario}"] = result
+        finally:
+            httpx.delete(f"{base_url}/caregivers/{caregiver_id}")
+            httpx.delete(f"{base_url}/users/{caregiver_id}")
+
+    print(f"{'scenario':<26}{'KB/view':>10}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['kb_per_view']:>10}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Queries 6.1 - 7 on the base tables vs. the materialized reporting views (app/reports.py).
+
+    python -m benchmarks.bench_reports --appointments 10000000
+
+Inside one transaction on DATABASE_URL: seeds members, caregivers, jobs, applications and
+N appointments (same data as bench_indexes), refreshes the report views, times every
+query both ways and rolls back. Report views must exist (`python -m app.reports`).
+"""
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.reports import REPORT_VIEWS
+from benchmarks.bench_indexes import SEED
+
+#(label, query on the base tables as in database_queries.py, same answer from the report views)
+#list queries are compared on their first page, which is what /reports/* returns
+QUERIES = [
+    ("6.1 applicants per job (100)", """
+        SELECT j.job_id, u.given_name, u.surname, COUNT(ja.caregiver_user_id) AS number_of_applicants
+        FROM JOB j
+        JOIN MEMBER m ON j.member_user_id = m.member_user_id
+        JOIN account u ON m.member_user_id = u.user_id
+        LEFT JOIN JOB_APPLICATION ja ON j.job_id = ja.job_id
+        GROUP BY j.job_id, u.given_name, u.surname
+        ORDER BY j.job_id LIMIT 100
+    """, "SELECT * FROM report_job_applicants ORDER BY job_id LIMIT 100"),
+    ("6.2 total accepted hours", """
+        SELECT SUM(a.work_hours) FROM APPOINTMENT a WHERE a.status = 'ACCEPTED'
+    """, "SELECT total_hours FROM report_accepted_totals"),
+    ("6.3 average accepted rate", """
+        SELECT AVG(c.hourly_rate)
+        FROM APPOINTMENT a JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+        WHERE a.status = 'ACCEPTED'
+    """, "SELECT average_hourly_rate FROM report_accepted_totals"),
+    ("6.4 above average rate (100)", """
+        SELECT u.given_name, u.surname, c.hourly_rate
+        FROM CAREGIVER c
+        JOIN account u ON c.caregiver_user_id = u.user_id
+        JOIN APPOINTMENT a ON c.caregiver_user_id = a.caregiver_user_id
+        WHERE a.status = 'ACCEPTED'
+            AND c.hourly_rate > (
+                SELECT AVG(c2.hourly_rate)
+                FROM CAREGIVER c2
+                JOIN APPOINTMENT a2 ON c2.caregiver_user_id = a2.caregiver_user_id
+                WHERE a2.status = 'ACCEPTED'
+            )
+        GROUP BY u.given_name, u.surname, c.hourly_rate
+        LIMIT 100
+    """, """
+        SELECT * FROM report_caregiver_accepted
+        WHERE hourly_rate > (SELECT average_hourly_rate FROM report_accepted_totals)
+        ORDER BY hourly_rate DESC, caregiver_user_id DESC LIMIT 100
+    """),
+    ("7 cost per appointment (100)", """
+        SELECT a.appointment_id, u.given_name, u.surname, c.hourly_rate, a.work_hours, (c.hourly_rate * a.work_hours) AS total_cost
+        FROM APPOINTMENT a
+        JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+        JOIN account u ON c.caregiver_user_id = u.user_id
+        WHERE a.status = 'ACCEPTED'
+        ORDER BY a.appointment_id LIMIT 100
+    """, "SELECT * FROM report_appointment_cost ORDER BY appointment_id LIMIT 100"),
+]
+
+
+def _time(conn, sql, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(text(sql)).fetchall()
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--people", type=int, default=10_000, help="caregivers and members each")
+    parser.add_argument("--jobs", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as json to this file")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            params = {
+                "people": args.people, "jobs": args.jobs, "appointments": args.appointments,
+                "base": conn.execute(text("SELECT COALESCE(MAX(user_id), 0) FROM account")).scalar(),
+                "job_base": conn.execute(text("SELECT COALESCE(MAX(job_id), 0) FROM JOB")).scalar(),
+                "appointment_base": conn.execute(text("SELECT COALESCE(MAX(appointment_id), 0) FROM APPOINTMENT")).scalar(),
+            }
+            started = time.perf_counter()
+            for sql in SEED:
+                conn.execute(text(sql), params)
+            conn.execute(text("ANALYZE account, CAREGIVER, MEMBER, JOB, JOB_APPLICATION, APPOINTMENT"))
+            print(f"seeded {args.appointments} appointments, {args.jobs} jobs in {time.perf_counter() - started:.1f}s")
+
+            refresh = {}
+            for name, _, _ in REPORT_VIEWS:
+                started = time.perf_counter()
+                conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+                refresh[name] = (time.perf_counter() - started) * 1000
+            conn.execute(text("ANALYZE " + ", ".join(name for name, _, _ in REPORT_VIEWS)))
+
+            results = {label: (_time(conn, base, args.repeat), _time(conn, view, args.repeat)) for label, base, view in QUERIES}
+        finally:
+            transaction.rollback()
+
+    print(f"\n{'query':<32}{'tables ms':>12}{'view ms':>12}{'speedup':>10}")
+    for label, (base_ms, view_ms) in results.items():
+        print(f"{label:<32}{base_ms:>12.2f}{view_ms:>12.2f}{base_ms / view_ms:>9.0f}x")
+    print("\nrefresh:")
+    for name, ms in refresh.items():
+        print(f"  {name:<30}{ms / 1000:>8.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "args": vars(args),
+                "tables_ms": {label: r[0] for label, r in results.items()},
+                "views_ms": {label: r[1] for label, r in results.items()},
+                "refresh_ms": refresh,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Concurrent caregiver photo upload throughput and server peak memory.
+
+    python -m benchmarks.bench_uploads --uploads 200 --concurrency 20 --size-mb 5
+
+Starts uvicorn against DATABASE_URL, creates one caregiver and replaces its photo
+--uploads times (PUT /caregivers/{id}/photo), --concurrency at once. Reports
+uploads/s, MB/s, latency percentiles and the server's RSS before and at peak.
+The caregiver and its account are deleted at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+import httpx
+
+from benchmarks.common import run_server_process, summarize, PeakRss
+
+
+def _seed_caregiver(base_url):
+    user = httpx.post(f"{base_url}/users/", data={
+        "email": f"upload_bench_{uuid.uuid4().hex[:8]}@example.com",
+        "given_name": "Upload",
+        "surname": "Bench",
+        "city": "Astana",
+        "phone_number": "+77071234567",
+        "password": "password123",
+    }).json()
+    httpx.post(f"{base_url}/caregivers/", data={
+        "caregiver_user_id": user["user_id"],
+        "gender": "OTHER",
+        "caregiving_type": "BABYSITTER",
+        "hourly_rate": 1000,
+    }, files={"photo": ("seed.jpg", b"seed", "image/jpeg")}).raise_for_status()
+    return user["user_id"]
+
+
+async def _upload(base_url, caregiver_id, payload, total, concurrency):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    #distinct content per upload, identical photos are deduplicated by the store
+                    content = i.to_bytes(8, "big") + payload[8:]
+                    response = await client.put(f"/caregivers/{caregiver_id}/photo", files={"photo": (f"{i}.jpg", content, "image/jpeg")})
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--output", help="write results as json to this file")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    payload = os.urandom(size)
+
+    env = {"MAX_PHOTO_BYTES": str(size + 1024)}
+    with run_server_process(args.port, env=env) as (base_url, proc):
+        caregiver_id = _seed_caregiver(base_url)
+        try:
+            with PeakRss(proc.pid) as rss:
+                latencies, elapsed, errors = asyncio.run(_upload(base_url, caregiver_id, payload, args.uploads, args.concurrency))
+        finally:
+            httpx.delete(f"{base_url}/caregivers/{caregiver_id}")
+            httpx.delete(f"{base_url}/users/{caregiver_id}")
+
+    result = summarize(latencies, elapsed, errors)
+    result.update({
+        "uploads_per_s": result.pop("rps"),
+        "mb_per_s": round(len(latencies) * size / 1024 / 1024 / elapsed, 1),
+        "rss_start_mb": round(rss.start_mb, 1),
+        "rss_peak_mb": round(rss.peak_mb, 1),
+    })
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
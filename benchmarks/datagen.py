@@ -0,0 +1,320 @@
+"""Synthetic data for scale testing: accounts, caregivers, members, addresses, jobs,
+job applications and appointments, all referentially valid.
+
+    python -m benchmarks.datagen --caregivers 100000 --members 100000 --jobs 2000000 --appointments 10000000
+    python -m benchmarks.datagen --truncate --seed 7     empty the tables first (dev databases only)
+
+Rows are generated in chunks of --chunk-size and loaded with COPY by --workers processes,
+each chunk in its own transaction. Every chunk has its own random.Random seeded from
+(--seed, table, chunk), so the same arguments give the same rows whatever the number of
+workers. New ids continue after the current MAX(id) of DATABASE_URL; identity sequences,
+statistics (ANALYZE) are updated at the end. Report views are not refreshed - run
+`python -m app.reports` afterwards.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.database import engine
+from app.identity import bump_identity
+from app.models import User, Job, Appointment
+
+GIVEN_NAMES = [
+    "Anuar", "Aruzhan", "Askar", "Aigerim", "Dana", "Daniyar", "Ainur", "Yerlan", "Madina", "Nurlan",
+    "Saule", "Timur", "Zhanna", "Bolat", "Kamila", "Arman", "Alina", "Pavel", "Anna", "Amina",
+]
+SURNAMES = [
+    "Akimbekov", "Nurlanova", "Sadykov", "Omarova", "Zhakupov", "Kim", "Ivanova", "Tulegenov",
+    "Abenova", "Serikbayev", "Armanov", "Bekova", "Kokoshko", "Mukanov", "Ospanova", "Petrov",
+]
+#rough population weights
+CITIES = [("Almaty", 30), ("Astana", 25), ("Shymkent", 12), ("Karaganda", 8), ("Aktobe", 6), ("Taraz", 5), ("Pavlodar", 5), ("Oskemen", 5), ("Atyrau", 4)]
+STREETS = ["Abay Avenue", "Kabanbay Batyr", "Tole Bi", "Dostyk", "Satpayev", "Turan", "Mangilik El", "Respublika", "Zhibek Zholy", "Seifullin"]
+PROFILES = [
+    "Experienced caregiver with {n} years in elderly care",
+    "Professional babysitter, certified in child care",
+    "Creative playmate, loves arts and crafts",
+    "Nurse assistant, first aid certified",
+    "Looking for a reliable caregiver for my family",
+    None,
+]
+HOUSE_RULES = [
+    "No pets.", "Please maintain cleanliness.", "Quiet environment preferred.", "No smoking.",
+    "Please follow medication schedule strictly.", "Shoes off at the door.", "Be on time.",
+]
+DEPENDENTS = [
+    "I have a {n}-year old son who likes painting and reading.",
+    "Twin daughters, {n} years old, very active.",
+    "Elderly mother, {m} years old, needs assistance with daily activities.",
+    "Grandfather, {m}, uses a wheelchair.",
+    None,
+]
+REQUIREMENTS = [
+    "Must be soft-spoken and patient.", "Certification required.", "Experience with arts and crafts preferred.",
+    "First aid training required.", "Must speak Kazakh and Russian.", "Weekend availability.",
+    "Non-smoker.", "Driving license preferred.",
+]
+TYPES = ["BABYSITTER", "ELDERLY_CARE", "PLAYMATE_FOR_CHILDREN"]
+#typical hourly rate per caregiving type
+RATES = {"BABYSITTER": 1500, "ELDERLY_CARE": 2200, "PLAYMATE_FOR_CHILDREN": 1100}
+GENDERS = [("FEMALE", 70), ("MALE", 28), ("OTHER", 2)]
+#(status, weight) of appointments
+STATUSES = [("ACCEPTED", 35), ("PENDING", 25), ("DECLINED", 40)]
+FIRST_DAY = date(2023, 1, 1)
+DAYS = 3 * 365
+#precomputed, generation is the hot loop next to COPY
+DATES = [(FIRST_DAY + timedelta(days=d)).isoformat() for d in range(DAYS + 15)]
+WORK_HOURS = [1, 2, 2, 3, 3, 4, 4, 5, 6, 8]
+#appointments fall into one of two 8 hour shifts a day (07:00 - 15:00, 15:00 - 23:00), so
+#appointments of one caregiver can only overlap within the same (day, shift).
+#start times per (shift, work hours) that end within the shift
+SHIFTS = [7, 15]
+SHIFT_TIMES = {
+    (shift, hours): [f"{start + m // 60:02d}:{m % 60:02d}" for m in range(0, (8 - hours) * 60 + 1, 30)]
+    for shift, start in enumerate(SHIFTS) for hours in set(WORK_HOURS)
+}
+
+COLUMNS = {
+    "account": "user_id, email, given_name, surname, city, phone_number, profile_description, password",
+    "caregiver": "caregiver_user_id, photo, gender, caregiving_type, hourly_rate",
+    "member": "member_user_id, house_rules, dependent_description",
+    "address": "member_user_id, house_number, street, town",
+    "job": "job_id, member_user_id, required_caregiving_type, other_requirements, date_posted, applicant_count",
+    "job_application": "caregiver_user_id, job_id, date_applied",
+    "appointment": "appointment_id, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status",
+}
+
+
+def _cumulative(choices):
+    values, total, weights = [], 0, []
+    for value, weight in choices:
+        total += weight
+        values.append(value)
+        weights.append(total)
+    return values, weights
+
+
+CITY_WEIGHTS, GENDER_WEIGHTS, STATUS_WEIGHTS = _cumulative(CITIES), _cumulative(GENDERS), _cumulative(STATUSES)
+
+
+def _weighted(rng, cumulative):
+    values, weights = cumulative
+    return rng.choices(values, cum_weights=weights)[0]
+
+
+def _skewed(rng, n):
+    #index in [0, n), low indexes more likely: a few busy caregivers / members, a long tail
+    return int(n * rng.random() ** 1.5)
+
+
+def _caregiver_of_type(rng, plan, type_index):
+    #caregiver i has type TYPES[i % 3], so a matching caregiver is picked without a lookup
+    count = (plan["caregivers"] - type_index + 2) // 3
+    if count == 0:
+        return plan["user_base"] + 1 + _skewed(rng, plan["caregivers"])
+    return plan["user_base"] + 1 + 3 * _skewed(rng, count) + type_index
+
+
+def _sentence(rng, phrases, k):
+    return " ".join(rng.sample(phrases, k))
+
+
+def _value(v):
+    return "\\N" if v is None else str(v)
+
+
+class _Rows:
+    #one COPY buffer per table in text format. generated strings contain no tabs / backslashes / newlines
+    def __init__(self):
+        self.buffers = {}
+
+    def add(self, table, *values):
+        self.buffers.setdefault(table, io.StringIO()).write("\t".join(map(_value, values)) + "\n")
+
+
+#region chunks - each returns {table: rows}
+def _people(rng, plan, start, stop, rows):
+    #users start..stop-1 (0-based): the first plan["caregivers"] are caregivers, the rest members
+    counts = {}
+    for i in range(start, stop):
+        user_id = plan["user_base"] + 1 + i
+        given, surname = rng.choice(GIVEN_NAMES), rng.choice(SURNAMES)
+        city = _weighted(rng, CITY_WEIGHTS)
+        profile = rng.choice(PROFILES)
+        rows.add(
+            "account", user_id, f"{given.lower()}.{surname.lower()}.{user_id}@example.com", given, surname, city,
+            f"+7707{rng.randrange(10_000_000):07d}", profile and profile.format(n=rng.randint(1, 20)), "password123",
+        )
+        if i < plan["caregivers"]:
+            caregiving_type = TYPES[i % 3]
+            rate = max(300, int(rng.gauss(RATES[caregiving_type], RATES[caregiving_type] / 4)) // 50 * 50)
+            rows.add("caregiver", user_id, f"photo{1 + i % 10}.jpg", _weighted(rng, GENDER_WEIGHTS), caregiving_type, rate)
+            counts["caregiver"] = counts.get("caregiver", 0) + 1
+        else:
+            dependent = rng.choice(DEPENDENTS)
+            rows.add(
+                "member", user_id, _sentence(rng, HOUSE_RULES, rng.randint(1, 3)),
+                dependent and dependent.format(n=rng.randint(1, 12), m=rng.randint(65, 95)),
+            )
+            counts["member"] = counts.get("member", 0) + 1
+            #most members have an address
+            if rng.random() < 0.9:
+                rows.add("address", user_id, str(rng.randint(1, 300)), rng.choice(STREETS), city)
+                counts["address"] = counts.get("address", 0) + 1
+        counts["account"] = counts.get("account", 0) + 1
+    return counts
+
+
+def _jobs(rng, plan, start, stop, rows):
+    counts = {"job": 0, "job_application": 0}
+    for i in range(start, stop):
+        job_id = plan["job_base"] + 1 + i
+        type_index = rng.randrange(3)
+        posted_day = rng.randrange(DAYS)
+        member_user_id = plan["user_base"] + plan["caregivers"] + 1 + _skewed(rng, plan["members"])
+        other_requirements = _sentence(rng, REQUIREMENTS, rng.randint(1, 3)) if rng.random() < 0.8 else None
+        applicants = set()
+        if plan["applications"] and plan["caregivers"]:
+            applicants = {_caregiver_of_type(rng, plan, type_index) for _ in range(int(rng.expovariate(1 / plan["applications"])))}
+        rows.add("job", job_id, member_user_id, TYPES[type_index], other_requirements, DATES[posted_day], len(applicants))
+        counts["job"] += 1
+        for caregiver_user_id in sorted(applicants):
+            rows.add("job_application", caregiver_user_id, job_id, DATES[posted_day + rng.randrange(15)])
+        counts["job_application"] += len(applicants)
+    return counts
+
+
+def _appointments(rng, plan, start, stop, rows):
+    #PENDING / ACCEPTED appointments of a caregiver must not overlap (ex_appointment_caregiver_slot).
+    #chunk k only uses shifts k, k + K, k + 2K, ... (K = number of chunks), so chunks never collide,
+    #and a second active appointment of a caregiver in the same shift of a chunk becomes DECLINED
+    shifts = range(start // plan["chunk_size"], DAYS * len(SHIFTS), plan["appointment_chunks"])
+    busy = set()
+    for i in range(start, stop):
+        caregiver_user_id = plan["user_base"] + 1 + _skewed(rng, plan["caregivers"])
+        shift, hours, status = rng.choice(shifts), rng.choice(WORK_HOURS), _weighted(rng, STATUS_WEIGHTS)
+        if status != "DECLINED":
+            if (caregiver_user_id, shift) in busy:
+                status = "DECLINED"
+            busy.add((caregiver_user_id, shift))
+        rows.add(
+            "appointment", plan["appointment_base"] + 1 + i, caregiver_user_id,
+            plan["user_base"] + plan["caregivers"] + 1 + _skewed(rng, plan["members"]),
+            DATES[shift // len(SHIFTS)], rng.choice(SHIFT_TIMES[shift % len(SHIFTS), hours]), hours, status,
+        )
+    return {"appointment": stop - start}
+#endregion
+
+CHUNKS = {"people": _people, "jobs": _jobs, "appointments": _appointments}
+
+_engines = {}
+
+
+def load_chunk(plan, kind, start, stop):
+    #runs in a worker process: generate rows start..stop-1 of one kind, COPY them in one transaction
+    rng = random.Random(f"{plan['seed']}:{kind}:{start}")
+    rows = _Rows()
+    counts = CHUNKS[kind](rng, plan, start, stop, rows)
+    if plan["url"] not in _engines:
+        _engines[plan["url"]] = create_engine(plan["url"], poolclass=NullPool)
+    conn = _engines[plan["url"]].raw_connection()
+    try:
+        cursor = conn.cursor()
+        #dict order = FK order (account before caregiver, job before job_application)
+        for table, buffer in rows.buffers.items():
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({COLUMNS[table]}) FROM STDIN", buffer)
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
+def _chunks(kind, total, size):
+    return [(kind, start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def _run(plan, chunks, workers, totals):
+    if workers <= 1:
+        for chunk in chunks:
+            for table, n in load_chunk(plan, *chunk).items():
+                totals[table] = totals.get(table, 0) + n
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for future in as_completed([pool.submit(load_chunk, plan, *chunk) for chunk in chunks]):
+            for table, n in future.result().items():
+                totals[table] = totals.get(table, 0) + n
+
+
+def generate(caregivers, members, jobs, appointments, applications=3.0, seed=42, workers=1, chunk_size=50_000, truncate=False, bind=engine):
+    #returns {table: rows inserted}
+    appointment_chunks = len(_chunks("appointments", appointments, chunk_size))
+    if appointment_chunks > DAYS * len(SHIFTS):
+        raise ValueError(f"{appointment_chunks} appointment chunks, at most {DAYS * len(SHIFTS)} - use a larger chunk size")
+    with bind.begin() as conn:
+        if truncate:
+            conn.execute(text("TRUNCATE account, caregiver, member, address, job, job_application, appointment RESTART IDENTITY CASCADE"))
+        plan = {
+            "url": bind.url.render_as_string(hide_password=False),
+            "seed": seed, "caregivers": caregivers, "members": members, "applications": applications,
+            "chunk_size": chunk_size, "appointment_chunks": appointment_chunks,
+            "user_base": conn.execute(text("SELECT COALESCE(MAX(user_id), 0) FROM account")).scalar(),
+            "job_base": conn.execute(text("SELECT COALESCE(MAX(job_id), 0) FROM job")).scalar(),
+            "appointment_base": conn.execute(text("SELECT COALESCE(MAX(appointment_id), 0) FROM appointment")).scalar(),
+        }
+
+    totals = {}
+    #jobs and appointments only reference people, so they load side by side
+    _run(plan, _chunks("people", caregivers + members, chunk_size), workers, totals)
+    if members and caregivers:
+        _run(plan, _chunks("jobs", jobs, chunk_size) + _chunks("appointments", appointments, chunk_size), workers, totals)
+    elif members:
+        _run(plan, _chunks("jobs", jobs, chunk_size), workers, totals)
+
+    with bind.begin() as conn:
+        for column, last in [
+            (User.__table__.c.user_id, plan["user_base"] + caregivers + members),
+            (Job.__table__.c.job_id, plan["job_base"] + totals.get("job", 0)),
+            (Appointment.__table__.c.appointment_id, plan["appointment_base"] + totals.get("appointment", 0)),
+        ]:
+            if last:
+                bump_identity(conn, column, last)
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE account, caregiver, member, address, job, job_application, appointment"))
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--caregivers", type=int, default=1_000)
+    parser.add_argument("--members", type=int, default=1_000)
+    parser.add_argument("--jobs", type=int, default=5_000)
+    parser.add_argument("--applications", type=float, default=3.0, help="average applications per job")
+    parser.add_argument("--appointments", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--truncate", action="store_true", help="delete all rows of the seven tables first")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    totals = generate(
+        args.caregivers, args.members, args.jobs, args.appointments, args.applications,
+        args.seed, args.workers, args.chunk_size, args.truncate,
+    )
+    elapsed = time.perf_counter() - started
+    for table in COLUMNS:
+        print(f"{table:<16}{totals.get(table, 0):>12}")
+    print(f"{sum(totals.values())} rows in {elapsed:.1f}s ({sum(totals.values()) / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,595 @@
+"""HTTP load test over every endpoint of app/routers, with a latency regression check.
+
+    python -m benchmarks.loadtest --requests 20000 --concurrency 64 --read-ratio 0.8 --output baseline.json
+    python -m benchmarks.loadtest --requests 20000 --concurrency 64 --baseline baseline.json --threshold 0.2
+
+Starts uvicorn on DATABASE_URL (or uses --url), samples existing ids from the database
+and sends --requests requests: --read-ratio of them GETs, the rest POST / PUT / DELETE,
+each picked by the weights in OPERATIONS. Writes create their own rows and only delete
+those, but updates change sampled rows and every run leaves rows behind - compare runs on
+the same freshly generated database (`python -m benchmarks.datagen --truncate`).
+Reports requests/s and p50 / p95 / p99 per endpoint. With --baseline, exits with code 1
+when total requests/s dropped, or p50 / p95 of an endpoint (total: also p99) grew, by more
+than --threshold (and more than --min-ms), or the error rate went up by over 1 point.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from io import BytesIO
+
+import httpx
+from PIL import Image
+from sqlalchemy import text
+
+from app.database import engine
+from benchmarks.common import run_server, summarize
+
+Operation = namedtuple("Operation", "name kind weight ok build")
+
+OPERATIONS = []
+
+#sampled ids per table, see load_ids
+SAMPLES = {
+    "users": "SELECT user_id FROM account ORDER BY random() LIMIT :n",
+    "caregivers": "SELECT caregiver_user_id FROM caregiver ORDER BY random() LIMIT :n",
+    "members": "SELECT member_user_id FROM member ORDER BY random() LIMIT :n",
+    "addresses": "SELECT member_user_id FROM address ORDER BY random() LIMIT :n",
+    "jobs": "SELECT job_id FROM job ORDER BY random() LIMIT :n",
+    "applications": "SELECT caregiver_user_id, job_id FROM job_application ORDER BY random() LIMIT :n",
+    "appointments": "SELECT appointment_id FROM appointment ORDER BY random() LIMIT :n",
+}
+
+TYPES = ["BABYSITTER", "ELDERLY_CARE", "PLAYMATE_FOR_CHILDREN"]
+WORDS = ["pets", "patient", "certification", "smoking", "arts", "quiet", "medication", "weekend"]
+
+
+class Skip(Exception):
+    #the operation has nothing to work on (e.g. no sampled rows of its table)
+    pass
+
+
+class Context:
+    def __init__(self, client, rng, ids):
+        self.client = client
+        self.rng = rng
+        self.ids = ids
+        #rows created by this run, the only ones DELETE operations touch
+        self.own = {name: [] for name in ["users", "caregivers", "members", "addresses", "jobs", "applications", "appointments"]}
+        self.counter = 0
+        self.photo = _jpeg()
+
+    def pick(self, table):
+        if not self.ids.get(table):
+            raise Skip(table)
+        return self.rng.choice(self.ids[table])
+
+    def take(self, table):
+        #removes and returns one own row, None if there is none
+        own = self.own[table]
+        return own.pop(self.rng.randrange(len(own))) if own else None
+
+    def unique(self):
+        self.counter += 1
+        return f"{self.counter}_{self.rng.getrandbits(32):08x}"
+
+
+def _jpeg():
+    buffer = BytesIO()
+    Image.new("RGB", (640, 480), (200, 120, 80)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def operation(name, kind, weight, ok=(200, 201, 204)):
+    def register(build):
+        OPERATIONS.append(Operation(name, kind, weight, set(ok), build))
+        return build
+    return register
+
+
+def load_ids(bind=engine, n=2000):
+    with bind.connect() as conn:
+        return {
+            table: [tuple(r) if len(r) > 1 else r[0] for r in conn.execute(text(sql), {"n": n})]
+            for table, sql in SAMPLES.items()
+        }
+
+
+def _user_form(ctx):
+    return {
+        "email": f"load_{ctx.unique()}@example.com",
+        "given_name": "Load",
+        "surname": "Test",
+        "city": ctx.rng.choice(["Astana", "Almaty", "Shymkent"]),
+        "phone_number": "+77070000000",
+        "password": "password123",
+    }
+
+
+#region untimed setup for operations that need a row of their own
+async def _setup(ctx, method, url, **kwargs):
+    response = await ctx.client.request(method, url, **kwargs)
+    if response.status_code >= 400:
+        raise Skip(f"setup {method} {url}: {response.status_code}")
+    return response.json()
+
+
+async def _free_user(ctx):
+    #account without caregiver / member row
+    user_id = ctx.take("users")
+    if user_id is None:
+        user_id = (await _setup(ctx, "POST", "/users/", data=_user_form(ctx)))["user_id"]
+    return user_id
+
+
+async def _own(ctx, table, create):
+    row = ctx.take(table)
+    if row is None:
+        row = await create(ctx)
+    return row
+
+
+async def _new_caregiver(ctx):
+    user_id = await _free_user(ctx)
+    await _setup(ctx, "POST", "/caregivers/", data=_caregiver_form(ctx, user_id), files=_photo(ctx))
+    return user_id
+
+
+async def _new_member(ctx):
+    user_id = await _free_user(ctx)
+    await _setup(ctx, "POST", "/members/", data={"member_user_id": user_id, "house_rules": "No pets."})
+    return user_id
+
+
+async def _new_job(ctx):
+    return (await _setup(ctx, "POST", "/jobs/", data=_job_form(ctx)))["job_id"]
+
+
+async def _new_application(ctx):
+    #applications get jobs of their own, so DELETE /jobs never cascades into them
+    job_id = await _new_job(ctx)
+    caregiver_user_id = ctx.pick("caregivers")
+    await _setup(ctx, "POST", "/job-applications/", data={"caregiver_user_id": caregiver_user_id, "job_id": job_id})
+    return (caregiver_user_id, job_id)
+
+
+async def _new_appointment(ctx):
+    #DECLINED never conflicts with the caregiver's other appointments
+    return (await _setup(ctx, "POST", "/appointments/", data=dict(_appointment_form(ctx), status="DECLINED")))["appointment_id"]
+#endregion
+
+
+def _caregiver_form(ctx, user_id):
+    return {"caregiver_user_id": user_id, "gender": "FEMALE", "caregiving_type": ctx.rng.choice(TYPES), "hourly_rate": ctx.rng.randrange(500, 3000, 50)}
+
+
+def _photo(ctx):
+    return {"photo": ("photo.jpg", ctx.photo, "image/jpeg")}
+
+
+def _job_form(ctx):
+    return {"member_user_id": ctx.pick("members"), "required_caregiving_type": ctx.rng.choice(TYPES), "other_requirements": "Load test, patient and on time."}
+
+
+def _appointment_form(ctx):
+    return {
+        "caregiver_user_id": ctx.pick("caregivers"), "member_user_id": ctx.pick("members"),
+        "appointment_date": str(date.today() + timedelta(days=ctx.rng.randrange(60))), "appointment_time": f"{ctx.rng.randrange(7, 20):02d}:00",
+        "work_hours": ctx.rng.randint(1, 8), "status": "PENDING",
+    }
+
+
+def _keep(ctx, table, key):
+    #after-hook: remember a created row for later PUT / DELETE operations
+    def after(response):
+        if response.status_code in (200, 201):
+            ctx.own[table].append(key(response.json()))
+    return after
+
+
+#region reads
+#build(ctx) -> (method, url, request kwargs, after-hook or None); runs untimed, only the request is timed
+@operation("GET /users/{id}", "read", 10)
+async def _get_users_one(ctx):
+    return "GET", f"/users/{ctx.pick('users')}", {}, None
+
+@operation("GET /users/", "read", 3)
+async def _get_users(ctx):
+    return "GET", "/users/", {"params": {"limit": 20}}, None
+
+@operation("GET /caregivers/{id}", "read", 10)
+async def _get_caregivers_one(ctx):
+    return "GET", f"/caregivers/{ctx.pick('caregivers')}", {}, None
+
+@operation("GET /caregivers/", "read", 3)
+async def _get_caregivers(ctx):
+    return "GET", "/caregivers/", {"params": {"limit": 20}}, None
+
+@operation("GET /caregivers/search", "read", 5)
+async def _get_caregivers_search(ctx):
+    params = {"caregiving_type": ctx.rng.choice(TYPES), "min_rate": ctx.rng.randrange(500, 2500, 100), "order": ctx.rng.choice(["asc", "desc"]), "limit": 20}
+    return "GET", "/caregivers/search", {"params": params}, None
+
+@operation("GET /caregivers/{id}/availability", "read", 3)
+async def _get_caregivers_one_availability(ctx):
+    first = date.today() + timedelta(days=ctx.rng.randrange(30))
+    return "GET", f"/caregivers/{ctx.pick('caregivers')}/availability", {"params": {"from": str(first), "to": str(first + timedelta(days=30))}}, None
+
+#seed and generated caregivers may point at photo files that do not exist
+@operation("GET /caregivers/{id}/photo", "read", 2, ok=(200, 404))
+async def _get_caregivers_one_photo(ctx):
+    return "GET", f"/caregivers/{ctx.pick('caregivers')}/photo", {"params": {"size": ctx.rng.choice(["original", "thumb"])}}, None
+
+@operation("GET /members/{id}", "read", 5)
+async def _get_members_one(ctx):
+    return "GET", f"/members/{ctx.pick('members')}", {}, None
+
+@operation("GET /members/", "read", 2)
+async def _get_members(ctx):
+    return "GET", "/members/", {"params": {"limit": 20}}, None
+
+@operation("GET /members/search", "read", 3)
+async def _get_members_search(ctx):
+    return "GET", "/members/search", {"params": {"q": ctx.rng.choice(WORDS)}}, None
+
+@operation("GET /addresses/{id}", "read", 3)
+async def _get_addresses_one(ctx):
+    return "GET", f"/addresses/{ctx.pick('addresses')}", {}, None
+
+@operation("GET /addresses/", "read", 2)
+async def _get_addresses(ctx):
+    return "GET", "/addresses/", {"params": {"limit": 20}}, None
+
+@operation("GET /jobs/{id}", "read", 8)
+async def _get_jobs_one(ctx):
+    return "GET", f"/jobs/{ctx.pick('jobs')}", {}, None
+
+@operation("GET /jobs/", "read", 3)
+async def _get_jobs(ctx):
+    return "GET", "/jobs/", {"params": {"limit": 20}}, None
+
+@operation("GET /jobs/{id}/matches", "read", 2)
+async def _get_jobs_matches(ctx):
+    return "GET", f"/jobs/{ctx.pick('jobs')}/matches", {"params": {"limit": 10}}, None
+
+@operation("GET /jobs/search", "read", 3)
+async def _get_jobs_search(ctx):
+    return "GET", "/jobs/search", {"params": {"q": ctx.rng.choice(WORDS)}}, None
+
+@operation("GET /job-applications/caregiver/{c}/job/{j}", "read", 3)
+async def _get_job_applications_caregiver_one(ctx):
+    caregiver_user_id, job_id = ctx.pick("applications")
+    return "GET", f"/job-applications/caregiver/{caregiver_user_id}/job/{job_id}", {}, None
+
+@operation("GET /job-applications/", "read", 2)
+async def _get_job_applications(ctx):
+    return "GET", "/job-applications/", {"params": {"limit": 20}}, None
+
+@operation("GET /appointments/{id}", "read", 8)
+async def _get_appointments_one(ctx):
+    return "GET", f"/appointments/{ctx.pick('appointments')}", {}, None
+
+@operation("GET /appointments/", "read", 3)
+async def _get_appointments(ctx):
+    return "GET", "/appointments/", {"params": {"limit": 20}}, None
+
+@operation("GET /export/{table}", "read", 0.2)
+async def _get_export_table(ctx):
+    return "GET", "/export/jobs", {"params": {"format": "ndjson", "since": str(date.today() - timedelta(days=7))}}, None
+
+@operation("GET /reports/job-applicants", "read", 2)
+async def _get_reports_job_applicants(ctx):
+    return "GET", "/reports/job-applicants", {"params": {"limit": 20}}, None
+
+@operation("GET /reports/accepted-totals", "read", 2)
+async def _get_reports_accepted_totals(ctx):
+    return "GET", "/reports/accepted-totals", {}, None
+
+@operation("GET /reports/above-average-caregivers", "read", 2)
+async def _get_reports_above_average_caregivers(ctx):
+    return "GET", "/reports/above-average-caregivers", {"params": {"limit": 20}}, None
+
+@operation("GET /reports/appointment-costs", "read", 2)
+async def _get_reports_appointment_costs(ctx):
+    return "GET", "/reports/appointment-costs", {"params": {"limit": 20}}, None
+
+@operation("GET /admin/cache", "read", 0.5)
+async def _get_admin_cache(ctx):
+    return "GET", "/admin/cache", {}, None
+
+@operation("GET /admin/slow-queries", "read", 0.5)
+async def _get_admin_slow_queries(ctx):
+    return "GET", "/admin/slow-queries", {"params": {"limit": 10}}, None
+#endregion
+
+#region writes
+@operation("POST /users/", "write", 4)
+async def _post_users(ctx):
+    return "POST", "/users/", {"data": _user_form(ctx)}, _keep(ctx, "users", lambda r: r["user_id"])
+
+@operation("POST /users/bulk", "write", 0.5)
+async def _post_users_bulk(ctx):
+    def after(response):
+        if response.status_code == 200:
+            ctx.own["users"].extend(r["id"] for r in response.json()["created"])
+    return "POST", "/users/bulk", {"json": [_user_form(ctx) for _ in range(10)]}, after
+
+@operation("PUT /users/{id}", "write", 3)
+async def _put_users_one(ctx):
+    return "PUT", f"/users/{ctx.pick('users')}", {"params": {"phone_number": f"+7707{ctx.rng.randrange(10_000_000):07d}"}}, None
+
+@operation("DELETE /users/{id}", "write", 2)
+async def _delete_users_one(ctx):
+    return "DELETE", f"/users/{await _free_user(ctx)}", {}, None
+
+@operation("POST /caregivers/", "write", 1)
+async def _post_caregivers(ctx):
+    user_id = await _free_user(ctx)
+    return "POST", "/caregivers/", {"data": _caregiver_form(ctx, user_id), "files": _photo(ctx)}, _keep(ctx, "caregivers", lambda r: r["caregiver_user_id"])
+
+@operation("PUT /caregivers/{id}", "write", 2)
+async def _put_caregivers_one(ctx):
+    return "PUT", f"/caregivers/{ctx.pick('caregivers')}", {"params": {"hourly_rate": ctx.rng.randrange(500, 3000, 50)}}, None
+
+@operation("PUT /caregivers/{id}/photo", "write", 0.5)
+async def _put_caregivers_one_photo(ctx):
+    user_id = await _own(ctx, "caregivers", _new_caregiver)
+    ctx.own["caregivers"].append(user_id)
+    return "PUT", f"/caregivers/{user_id}/photo", {"files": _photo(ctx)}, None
+
+@operation("DELETE /caregivers/{id}", "write", 0.5)
+async def _delete_caregivers_one(ctx):
+    user_id = await _own(ctx, "caregivers", _new_caregiver)
+    return "DELETE", f"/caregivers/{user_id}", {}, None
+
+@operation("POST /members/", "write", 1)
+async def _post_members(ctx):
+    user_id = await _free_user(ctx)
+    return "POST", "/members/", {"data": {"member_user_id": user_id, "house_rules": "No pets. Quiet environment preferred."}}, _keep(ctx, "members", lambda r: r["member_user_id"])
+
+@operation("PUT /members/{id}", "write", 2)
+async def _put_members_one(ctx):
+    return "PUT", f"/members/{ctx.pick('members')}", {"params": {"house_rules": ctx.rng.choice(["No pets.", "No smoking.", "Be on time."])}}, None
+
+@operation("DELETE /members/{id}", "write", 0.5)
+async def _delete_members_one(ctx):
+    user_id = await _own(ctx, "members", _new_member)
+    if user_id in ctx.own["addresses"]:
+        ctx.own["addresses"].remove(user_id)
+    return "DELETE", f"/members/{user_id}", {}, None
+
+@operation("POST /addresses/", "write", 1)
+async def _post_addresses(ctx):
+    user_id = await _own(ctx, "members", _new_member)
+    return "POST", "/addresses/", {"data": {"member_user_id": user_id, "house_number": "1", "street": "Abay Avenue", "town": "Astana"}}, _keep(ctx, "addresses", lambda r: r["member_user_id"])
+
+@operation("PUT /addresses/{id}", "write", 1)
+async def _put_addresses_one(ctx):
+    return "PUT", f"/addresses/{ctx.pick('addresses')}", {"params": {"house_number": str(ctx.rng.randint(1, 300))}}, None
+
+@operation("DELETE /addresses/{id}", "write", 0.5)
+async def _delete_addresses_one(ctx):
+    user_id = ctx.take("addresses")
+    if user_id is None:
+        user_id = await _own(ctx, "members", _new_member)
+        await _setup(ctx, "POST", "/addresses/", data={"member_user_id": user_id, "house_number": "1", "street": "Abay Avenue", "town": "Astana"})
+    return "DELETE", f"/addresses/{user_id}", {}, None
+
+@operation("POST /jobs/", "write", 2)
+async def _post_jobs(ctx):
+    return "POST", "/jobs/", {"data": _job_form(ctx)}, _keep(ctx, "jobs", lambda r: r["job_id"])
+
+@operation("POST /jobs/bulk", "write", 0.3)
+async def _post_jobs_bulk(ctx):
+    def after(response):
+        if response.status_code == 200:
+            ctx.own["jobs"].extend(r["id"] for r in response.json()["created"])
+    return "POST", "/jobs/bulk", {"json": [_job_form(ctx) for _ in range(10)]}, after
+
+@operation("PUT /jobs/{id}", "write", 1)
+async def _put_jobs_one(ctx):
+    return "PUT", f"/jobs/{ctx.pick('jobs')}", {"params": {"other_requirements": ctx.rng.choice(["Certification required.", "Weekend availability."])}}, None
+
+@operation("DELETE /jobs/{id}", "write", 0.5)
+async def _delete_jobs_one(ctx):
+    job_id = await _own(ctx, "jobs", _new_job)
+    return "DELETE", f"/jobs/{job_id}", {}, None
+
+@operation("POST /job-applications/", "write", 2)
+async def _post_job_applications(ctx):
+    #a fresh job, so the (caregiver, job) pair cannot exist yet
+    job_id = await _new_job(ctx)
+    data = {"caregiver_user_id": ctx.pick("caregivers"), "job_id": job_id}
+    return "POST", "/job-applications/", {"data": data}, _keep(ctx, "applications", lambda r: (r["caregiver_user_id"], r["job_id"]))
+
+@operation("PUT /job-applications/caregiver/{c}/job/{j}", "write", 1)
+async def _put_job_applications_caregiver_one(ctx):
+    caregiver_user_id, job_id = await _own(ctx, "applications", _new_application)
+    ctx.own["applications"].append((caregiver_user_id, job_id))
+    return "PUT", f"/job-applications/caregiver/{caregiver_user_id}/job/{job_id}", {"params": {"date_applied": str(date.today())}}, None
+
+@operation("DELETE /job-applications/caregiver/{c}/job/{j}", "write", 0.5)
+async def _delete_job_applications_caregiver_one(ctx):
+    caregiver_user_id, job_id = await _own(ctx, "applications", _new_application)
+    return "DELETE", f"/job-applications/caregiver/{caregiver_user_id}/job/{job_id}", {}, None
+
+#409: the caregiver is already booked at that time
+@operation("POST /appointments/", "write", 3, ok=(201, 409))
+async def _post_appointments(ctx):
+    return "POST", "/appointments/", {"data": _appointment_form(ctx)}, _keep(ctx, "appointments", lambda r: r["appointment_id"])
+
+@operation("POST /appointments/bulk", "write", 0.3)
+async def _post_appointments_bulk(ctx):
+    def after(response):
+        if response.status_code == 200:
+            ctx.own["appointments"].extend(r["id"] for r in response.json()["created"])
+    return "POST", "/appointments/bulk", {"json": [_appointment_form(ctx) for _ in range(10)]}, after
+
+@operation("PUT /appointments/{id}", "write", 2, ok=(200, 409))
+async def _put_appointments_one(ctx):
+    return "PUT", f"/appointments/{ctx.pick('appointments')}", {"params": {"status": ctx.rng.choice(["PENDING", "ACCEPTED", "DECLINED"])}}, None
+
+@operation("DELETE /appointments/{id}", "write", 0.5)
+async def _delete_appointments_one(ctx):
+    return "DELETE", f"/appointments/{await _own(ctx, 'appointments', _new_appointment)}", {}, None
+
+#409 while the background refresh runs
+@operation("POST /reports/refresh", "write", 0.05, ok=(200, 409))
+async def _post_reports_refresh(ctx):
+    return "POST", "/reports/refresh", {}, None
+
+@operation("DELETE /admin/cache", "write", 0.05)
+async def _delete_admin_cache(ctx):
+    return "DELETE", "/admin/cache", {}, None
+
+@operation("DELETE /admin/slow-queries", "write", 0.05)
+async def _delete_admin_slow_queries(ctx):
+    return "DELETE", "/admin/slow-queries", {}, None
+#endregion
+
+
+def _choose(rng, operations, read_ratio):
+    kind = "read" if rng.random() < read_ratio else "write"
+    candidates = [op for op in operations if op.kind == kind] or operations
+    return rng.choices(candidates, [op.weight for op in candidates])[0]
+
+
+async def run_load(client, operations, total, concurrency, read_ratio, ids, seed=42):
+    #returns {"total": summary, "operations": {name: summary}}, see benchmarks.common.summarize
+    ctx = Context(client, random.Random(seed), ids)
+    latencies = {op.name: [] for op in operations}
+    errors = {op.name: 0 for op in operations}
+    failures = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            for _ in range(10):
+                op = _choose(ctx.rng, operations, read_ratio)
+                try:
+                    method, url, kwargs, after = await op.build(ctx)
+                    break
+                except Skip:
+                    continue
+            else:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                response, status = None, type(e).__name__
+            latencies[op.name].append(time.perf_counter() - started)
+            if status not in op.ok:
+                errors[op.name] += 1
+                failures.setdefault(op.name, status)
+            elif after is not None:
+                after(response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    everything = [latency for values in latencies.values() for latency in values]
+    return {
+        "total": summarize(everything, elapsed, sum(errors.values())),
+        "operations": {name: summarize(values, elapsed, errors[name]) for name, values in latencies.items() if values},
+        "first_failure": failures,
+    }
+
+
+def compare(current, baseline, threshold=0.2, min_ms=2.0, min_requests=100):
+    #returns one line per regression, empty list if none. endpoints with fewer than min_requests
+    #requests in either run are too noisy for percentiles and only count in the total
+    regressions = []
+    rows = [("total", current["total"], baseline["total"])]
+    rows += [
+        (name, current["operations"][name], before) for name, before in baseline["operations"].items()
+        if name in current["operations"] and min(before["requests"], current["operations"][name]["requests"]) >= min_requests
+    ]
+    for name, now, before in rows:
+        for metric in ("p50_ms", "p95_ms") + (("p99_ms",) if name == "total" else ()):
+            if now[metric] > before[metric] * (1 + threshold) and now[metric] - before[metric] > min_ms:
+                regressions.append(f"{name}: {metric} {before[metric]} -> {now[metric]}")
+        now_rate = now["errors"] / now["requests"] if now["requests"] else 0
+        before_rate = before["errors"] / before["requests"] if before["requests"] else 0
+        if now_rate > before_rate + 0.01:
+            regressions.append(f"{name}: error rate {before_rate:.1%} -> {now_rate:.1%}")
+    if current["total"]["rps"] < baseline["total"]["rps"] * (1 - threshold):
+        regressions.append(f"total: rps {baseline['total']['rps']} -> {current['total']['rps']}")
+    return regressions
+
+
+def _print(results, baseline=None):
+    print(f"\n{'endpoint':<48}{'n':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}" + (f"{'base p95':>10}" if baseline else ""))
+    for name, r in list(results["operations"].items()) + [("total", results["total"])]:
+        before = (baseline["total"] if name == "total" else baseline["operations"].get(name)) if baseline else None
+        line = f"{name:<48}{r['requests']:>7}{r['errors']:>6}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        if baseline:
+            line += f"{before['p95_ms']:>10.2f}" if before else f"{'-':>10}"
+        print(line)
+    print(f"\n{results['total']['rps']} requests/s")
+    for name, status in results["first_failure"].items():
+        print(f"  {name}: unexpected {status}")
+
+
+async def _run(base_url, args, operations, ids):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        if args.warmup:
+            await run_load(client, operations, args.warmup, args.concurrency, args.read_ratio, ids, args.seed + 1)
+        return await run_load(client, operations, args.requests, args.concurrency, args.read_ratio, ids, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--warmup", type=int, default=500, help="requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--read-ratio", type=float, default=0.8, help="share of GET requests")
+    parser.add_argument("--only", nargs="+", default=[], help="only endpoints whose name contains one of these, e.g. /jobs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers of the started server")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--output", help="write results as json to this file (a later --baseline)")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore latency changes smaller than this")
+    parser.add_argument("--min-requests", type=int, default=100, help="compare only endpoints with at least this many requests")
+    args = parser.parse_args()
+
+    operations = [op for op in OPERATIONS if not args.only or any(part in op.name for part in args.only)]
+    ids = load_ids()
+    if args.url:
+        results = asyncio.run(_run(args.url, args, operations, ids))
+    else:
+        with run_server(args.port, workers=args.workers) as base_url:
+            results = asyncio.run(_run(base_url, args, operations, ids))
+    results["args"] = vars(args)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold, args.min_ms, args.min_requests)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regression over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Concurrent-insert stress test for identity-generated ids.
+
+    python -m benchmarks.stress_ids --threads 16 --inserts 500
+
+Runs the router insert functions (_create_user, _create_appointment) from many threads,
+each with its own session, then checks that no insert failed and no id was handed out twice.
+Rows are written to DATABASE_URL and deleted at the end.
+"""
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as dtime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import User, Caregiver, Member, Appointment
+from app.models.enums import AppointmentStatus, CaregivingType, Gender
+from app.routers.users import _create_user
+from app.routers.appointments import _create_appointment
+
+
+def _run(label, total, threads, fn):
+    ids, failures = [], 0
+
+    def worker(i):
+        session = SessionLocal()
+        try:
+            return fn(session, i)
+        except (IntegrityError, HTTPException):
+            return None
+        finally:
+            session.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for result in pool.map(worker, range(total)):
+            if result is None:
+                failures += 1
+            else:
+                ids.append(result)
+    elapsed = time.perf_counter() - started
+
+    duplicates = len(ids) - len(set(ids))
+    print(f"{label:>12}: {len(ids)} inserts in {elapsed:.2f}s ({len(ids) / elapsed:.0f}/s), failures={failures}, duplicate ids={duplicates}")
+    return ids, failures + duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--inserts", type=int, default=500)
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    user_ids, user_errors = _run("users", args.inserts, args.threads, lambda db, i: _create_user(
+        db, f"stress_{run_id}_{i}@example.com", "Stress", "Test", "Astana", "+77071234567", None, "password123"
+    ).user_id)
+
+    session = SessionLocal()
+    caregiver_id, member_id = user_ids[0], user_ids[1]
+    session.add_all([
+        Caregiver(caregiver_user_id=caregiver_id, photo="stress.jpg", gender=Gender.OTHER, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000),
+        Member(member_user_id=member_id),
+    ])
+    session.commit()
+
+    start_day = date.today() + timedelta(days=1)
+    appointment_ids, appointment_errors = _run("appointments", args.inserts, args.threads, lambda db, i: _create_appointment(
+        db, caregiver_id, member_id, start_day + timedelta(days=i), dtime(9, 0), 1, AppointmentStatus.DECLINED, None
+    ).appointment_id)
+
+    #cleanup: appointments, caregiver and member go with the accounts (ON DELETE CASCADE)
+    session.query(User).filter(User.user_id.in_(user_ids)).delete(synchronize_session=False)
+    session.commit()
+    session.close()
+
+    if user_errors or appointment_errors:
+        raise SystemExit("collisions detected")
+
+
+if __name__ == "__main__":
+    main()
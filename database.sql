@@ -51,7 +51,8 @@ CREATE TABLE JOB (
     member_user_id INTEGER NOT NULL REFERENCES MEMBER(member_user_id) ON DELETE CASCADE,
     required_caregiving_type caregiving_type_enum NOT NULL,
     other_requirements TEXT,
-    date_posted DATE NOT NULL
+    date_posted DATE NOT NULL,
+    applicant_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE JOB_APPLICATION (
@@ -68,9 +69,25 @@ CREATE TABLE APPOINTMENT (
     appointment_date DATE NOT NULL,
     appointment_time TIME NOT NULL,
     work_hours INTEGER NOT NULL CHECK (work_hours > 0),
-    status appointment_status_enum NOT NULL
+    status appointment_status_enum NOT NULL,
+    slot tsrange GENERATED ALWAYS AS (tsrange(appointment_date + appointment_time, appointment_date + appointment_time + make_interval(hours => work_hours))) STORED,
+    caregiver_slot int8range GENERATED ALWAYS AS (int8range(
+        caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint,
+        caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint + work_hours * 3600
+    )) STORED,
+    CONSTRAINT ex_appointment_caregiver_slot EXCLUDE USING gist (caregiver_slot WITH &&) WHERE (status IN ('PENDING', 'ACCEPTED')),
+    CONSTRAINT ck_appointment_slot_range CHECK (appointment_date >= DATE '1970-01-01' AND appointment_date + appointment_time + make_interval(hours => work_hours) < TIMESTAMP '2286-11-20')
 );
 
+CREATE INDEX ix_job_member ON JOB (member_user_id);
+CREATE INDEX ix_job_type_date ON JOB (required_caregiving_type, date_posted);
+CREATE INDEX ix_job_applicant_count ON JOB (applicant_count, job_id);
+CREATE INDEX ix_job_application_job ON JOB_APPLICATION (job_id);
+CREATE INDEX ix_appointment_caregiver ON APPOINTMENT (caregiver_user_id);
+CREATE INDEX ix_appointment_member ON APPOINTMENT (member_user_id);
+CREATE INDEX ix_appointment_accepted ON APPOINTMENT (caregiver_user_id) INCLUDE (work_hours) WHERE status = 'ACCEPTED';
+CREATE INDEX ix_job_requirements_fts ON JOB USING gin (to_tsvector('english'::regconfig, coalesce(other_requirements, '')));
+CREATE INDEX ix_member_house_rules_fts ON MEMBER USING gin (to_tsvector('english'::regconfig, coalesce(house_rules, '')));
 
 INSERT INTO "USER" (user_id, email, given_name, surname, city, phone_number, profile_description, password) VALUES
 (1, 'anuar.akimbekov@gmail.com', 'Anuar', 'Akimbekov', 'Astana', '+77071111111', 'Experienced caregiver with 5 years in elderly care', 'password123'),
@@ -179,6 +196,8 @@ INSERT INTO JOB_APPLICATION (caregiver_user_id, job_id, date_applied) VALUES
 (11, 2, '2025-01-23'),
 (11, 3, '2025-02-04');
 
+UPDATE JOB j SET applicant_count = (SELECT COUNT(*) FROM JOB_APPLICATION ja WHERE ja.job_id = j.job_id);
+
 INSERT INTO APPOINTMENT (appointment_id, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status) VALUES
 (1, 1, 13, '2025-05-01', '09:00:00', 3, 'ACCEPTED'),
 (2, 1, 16, '2025-05-02', '10:00:00', 4, 'ACCEPTED'),
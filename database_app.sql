@@ -15,7 +15,7 @@ CREATE TYPE caregiving_type_enum AS ENUM ('BABYSITTER', 'ELDERLY_CARE', 'PLAYMAT
 CREATE TYPE appointment_status_enum AS ENUM ('PENDING', 'ACCEPTED', 'DECLINED');
 
 CREATE TABLE account (
-    user_id INTEGER PRIMARY KEY,
+    user_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     email TEXT UNIQUE NOT NULL,
     given_name TEXT NOT NULL,
     surname TEXT NOT NULL,
@@ -47,11 +47,12 @@ CREATE TABLE ADDRESS (
 );
 
 CREATE TABLE JOB (
-    job_id INTEGER PRIMARY KEY,
+    job_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     member_user_id INTEGER NOT NULL REFERENCES MEMBER(member_user_id) ON DELETE CASCADE,
     required_caregiving_type caregiving_type_enum NOT NULL,
     other_requirements TEXT,
-    date_posted DATE NOT NULL
+    date_posted DATE NOT NULL,
+    applicant_count INTEGER NOT NULL DEFAULT 0
 );
 
 CREATE TABLE JOB_APPLICATION (
@@ -62,15 +63,35 @@ CREATE TABLE JOB_APPLICATION (
 );
 
 CREATE TABLE APPOINTMENT (
-    appointment_id INTEGER PRIMARY KEY,
+    appointment_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     caregiver_user_id INTEGER NOT NULL REFERENCES CAREGIVER(caregiver_user_id) ON DELETE CASCADE,
     member_user_id INTEGER NOT NULL REFERENCES MEMBER(member_user_id) ON DELETE CASCADE,
     appointment_date DATE NOT NULL,
     appointment_time TIME NOT NULL,
     work_hours INTEGER NOT NULL CHECK (work_hours > 0),
-    status appointment_status_enum NOT NULL
+    status appointment_status_enum NOT NULL,
+    slot tsrange GENERATED ALWAYS AS (tsrange(appointment_date + appointment_time, appointment_date + appointment_time + make_interval(hours => work_hours))) STORED,
+    caregiver_slot int8range GENERATED ALWAYS AS (int8range(
+        caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint,
+        caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint + work_hours * 3600
+    )) STORED,
+    CONSTRAINT ex_appointment_caregiver_slot EXCLUDE USING gist (caregiver_slot WITH &&) WHERE (status IN ('PENDING', 'ACCEPTED')),
+    CONSTRAINT ck_appointment_slot_range CHECK (appointment_date >= DATE '1970-01-01' AND appointment_date + appointment_time + make_interval(hours => work_hours) < TIMESTAMP '2286-11-20')
 );
 
+CREATE INDEX ix_caregiver_type_rate ON CAREGIVER (caregiving_type, hourly_rate, caregiver_user_id);
+CREATE INDEX ix_caregiver_rate ON CAREGIVER (hourly_rate, caregiver_user_id);
+CREATE INDEX ix_account_city ON account (city, user_id);
+CREATE INDEX ix_job_member ON JOB (member_user_id);
+CREATE INDEX ix_job_type_date ON JOB (required_caregiving_type, date_posted);
+CREATE INDEX ix_job_applicant_count ON JOB (applicant_count, job_id);
+CREATE INDEX ix_job_application_job ON JOB_APPLICATION (job_id);
+CREATE INDEX ix_appointment_caregiver ON APPOINTMENT (caregiver_user_id);
+CREATE INDEX ix_appointment_member ON APPOINTMENT (member_user_id);
+CREATE INDEX ix_appointment_accepted ON APPOINTMENT (caregiver_user_id) INCLUDE (work_hours) WHERE status = 'ACCEPTED';
+CREATE INDEX ix_job_requirements_fts ON JOB USING gin (to_tsvector('english'::regconfig, coalesce(other_requirements, '')));
+CREATE INDEX ix_member_house_rules_fts ON MEMBER USING gin (to_tsvector('english'::regconfig, coalesce(house_rules, '')));
+
 
 INSERT INTO account (user_id, email, given_name, surname, city, phone_number, profile_description, password) VALUES
 (1, 'anuar.akimbekov@gmail.com', 'Anuar', 'Akimbekov', 'Astana', '+77071111111', 'Experienced caregiver with 5 years in elderly care', 'password123'),
@@ -179,6 +200,8 @@ INSERT INTO JOB_APPLICATION (caregiver_user_id, job_id, date_applied) VALUES
 (11, 2, '2025-01-23'),
 (11, 3, '2025-02-04');
 
+UPDATE JOB j SET applicant_count = (SELECT COUNT(*) FROM JOB_APPLICATION ja WHERE ja.job_id = j.job_id);
+
 INSERT INTO APPOINTMENT (appointment_id, caregiver_user_id, member_user_id, appointment_date, appointment_time, work_hours, status) VALUES
 (1, 1, 13, '2025-05-01', '09:00:00', 3, 'ACCEPTED'),
 (2, 1, 16, '2025-05-02', '10:00:00', 4, 'ACCEPTED'),
@@ -199,4 +222,47 @@ INSERT INTO APPOINTMENT (appointment_id, caregiver_user_id, member_user_id, appo
 (17, 5, 14, '2025-05-17', '09:00:00', 5, 'ACCEPTED'),
 (18, 6, 21, '2025-05-18', '10:00:00', 3, 'PENDING'),
 (19, 7, 18, '2025-05-19', '12:00:00', 5, 'ACCEPTED'),
-(20, 9, 20, '2025-05-20', '14:00:00', 4, 'ACCEPTED');
\ No newline at end of file
+(20, 9, 20, '2025-05-20', '14:00:00', 4, 'ACCEPTED');
+
+SELECT setval(pg_get_serial_sequence('account', 'user_id'), COALESCE((SELECT MAX(user_id) FROM account), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('job', 'job_id'), COALESCE((SELECT MAX(job_id) FROM JOB), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('appointment', 'appointment_id'), COALESCE((SELECT MAX(appointment_id) FROM APPOINTMENT), 0) + 1, false);
+
+CREATE MATERIALIZED VIEW report_job_applicants AS
+SELECT j.job_id, u.given_name, u.surname, COUNT(ja.caregiver_user_id)::integer AS number_of_applicants
+FROM JOB j
+JOIN account u ON j.member_user_id = u.user_id
+LEFT JOIN JOB_APPLICATION ja ON j.job_id = ja.job_id
+GROUP BY j.job_id, u.given_name, u.surname;
+CREATE UNIQUE INDEX ux_report_job_applicants ON report_job_applicants (job_id);
+
+CREATE MATERIALIZED VIEW report_caregiver_accepted AS
+SELECT c.caregiver_user_id, u.given_name, u.surname, c.hourly_rate,
+    COUNT(*)::integer AS accepted_appointments,
+    SUM(a.work_hours)::bigint AS accepted_hours,
+    SUM(c.hourly_rate::bigint * a.work_hours)::bigint AS accepted_cost
+FROM APPOINTMENT a
+JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+JOIN account u ON c.caregiver_user_id = u.user_id
+WHERE a.status = 'ACCEPTED'
+GROUP BY c.caregiver_user_id, u.given_name, u.surname, c.hourly_rate;
+CREATE UNIQUE INDEX ux_report_caregiver_accepted ON report_caregiver_accepted (caregiver_user_id);
+CREATE INDEX ix_report_caregiver_accepted_rate ON report_caregiver_accepted (hourly_rate, caregiver_user_id);
+
+CREATE MATERIALIZED VIEW report_accepted_totals AS
+SELECT 1 AS id,
+    COALESCE(SUM(accepted_appointments), 0)::bigint AS accepted_appointments,
+    COALESCE(SUM(accepted_hours), 0)::bigint AS total_hours,
+    SUM(hourly_rate::numeric * accepted_appointments) / NULLIF(SUM(accepted_appointments), 0) AS average_hourly_rate,
+    now() AS refreshed_at
+FROM report_caregiver_accepted;
+CREATE UNIQUE INDEX ux_report_accepted_totals ON report_accepted_totals (id);
+
+CREATE MATERIALIZED VIEW report_appointment_cost AS
+SELECT a.appointment_id, a.caregiver_user_id, u.given_name, u.surname, c.hourly_rate, a.work_hours,
+    c.hourly_rate::bigint * a.work_hours AS total_cost
+FROM APPOINTMENT a
+JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+JOIN account u ON c.caregiver_user_id = u.user_id
+WHERE a.status = 'ACCEPTED';
+CREATE UNIQUE INDEX ux_report_appointment_cost ON report_appointment_cost (appointment_id);
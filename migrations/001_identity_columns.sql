@@ -0,0 +1,10 @@
+-- run once on databases created before user_id / job_id / appointment_id became identity columns
+-- (fresh databases get them from database_app.sql or Base.metadata.create_all)
+
+ALTER TABLE account ALTER COLUMN user_id ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE JOB ALTER COLUMN job_id ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE APPOINTMENT ALTER COLUMN appointment_id ADD GENERATED BY DEFAULT AS IDENTITY;
+
+SELECT setval(pg_get_serial_sequence('account', 'user_id'), COALESCE((SELECT MAX(user_id) FROM account), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('job', 'job_id'), COALESCE((SELECT MAX(job_id) FROM JOB), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('appointment', 'appointment_id'), COALESCE((SELECT MAX(appointment_id) FROM APPOINTMENT), 0) + 1, false);
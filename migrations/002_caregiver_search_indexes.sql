@@ -0,0 +1,6 @@
+-- indexes for GET /caregivers/search on databases created before they were added to database_app.sql
+-- CONCURRENTLY does not lock the tables for writes, run it outside a transaction (plain psql -f)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_caregiver_type_rate ON CAREGIVER (caregiving_type, hourly_rate, caregiver_user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_caregiver_rate ON CAREGIVER (hourly_rate, caregiver_user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_account_city ON account (city, user_id);
@@ -0,0 +1,9 @@
+-- FK / status indexes on databases created before they were added to database_app.sql
+-- (same as `python -m app.indexes`), run outside a transaction (plain psql -f)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_job_member ON JOB (member_user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_job_type_date ON JOB (required_caregiving_type, date_posted);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_job_application_job ON JOB_APPLICATION (job_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_appointment_caregiver ON APPOINTMENT (caregiver_user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_appointment_member ON APPOINTMENT (member_user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_appointment_accepted ON APPOINTMENT (caregiver_user_id) INCLUDE (work_hours) WHERE status = 'ACCEPTED';
@@ -0,0 +1,5 @@
+-- full-text indexes for GET /jobs/search, GET /members/search and Queries 5.2 / 5.4
+-- (same as `python -m app.indexes`), run outside a transaction (plain psql -f)
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_job_requirements_fts ON JOB USING gin (to_tsvector('english'::regconfig, coalesce(other_requirements, '')));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_member_house_rules_fts ON MEMBER USING gin (to_tsvector('english'::regconfig, coalesce(house_rules, '')));
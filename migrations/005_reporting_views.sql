@@ -0,0 +1,41 @@
+-- reporting views (Queries 6.1 - 7) on databases created before they were added to database_app.sql
+-- (same as `python -m app.reports`). Building them scans APPOINTMENT / JOB / JOB_APPLICATION once
+
+CREATE MATERIALIZED VIEW report_job_applicants AS
+SELECT j.job_id, u.given_name, u.surname, COUNT(ja.caregiver_user_id)::integer AS number_of_applicants
+FROM JOB j
+JOIN account u ON j.member_user_id = u.user_id
+LEFT JOIN JOB_APPLICATION ja ON j.job_id = ja.job_id
+GROUP BY j.job_id, u.given_name, u.surname;
+CREATE UNIQUE INDEX ux_report_job_applicants ON report_job_applicants (job_id);
+
+CREATE MATERIALIZED VIEW report_caregiver_accepted AS
+SELECT c.caregiver_user_id, u.given_name, u.surname, c.hourly_rate,
+    COUNT(*)::integer AS accepted_appointments,
+    SUM(a.work_hours)::bigint AS accepted_hours,
+    SUM(c.hourly_rate::bigint * a.work_hours)::bigint AS accepted_cost
+FROM APPOINTMENT a
+JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+JOIN account u ON c.caregiver_user_id = u.user_id
+WHERE a.status = 'ACCEPTED'
+GROUP BY c.caregiver_user_id, u.given_name, u.surname, c.hourly_rate;
+CREATE UNIQUE INDEX ux_report_caregiver_accepted ON report_caregiver_accepted (caregiver_user_id);
+CREATE INDEX ix_report_caregiver_accepted_rate ON report_caregiver_accepted (hourly_rate, caregiver_user_id);
+
+CREATE MATERIALIZED VIEW report_accepted_totals AS
+SELECT 1 AS id,
+    COALESCE(SUM(accepted_appointments), 0)::bigint AS accepted_appointments,
+    COALESCE(SUM(accepted_hours), 0)::bigint AS total_hours,
+    SUM(hourly_rate::numeric * accepted_appointments) / NULLIF(SUM(accepted_appointments), 0) AS average_hourly_rate,
+    now() AS refreshed_at
+FROM report_caregiver_accepted;
+CREATE UNIQUE INDEX ux_report_accepted_totals ON report_accepted_totals (id);
+
+CREATE MATERIALIZED VIEW report_appointment_cost AS
+SELECT a.appointment_id, a.caregiver_user_id, u.given_name, u.surname, c.hourly_rate, a.work_hours,
+    c.hourly_rate::bigint * a.work_hours AS total_cost
+FROM APPOINTMENT a
+JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+JOIN account u ON c.caregiver_user_id = u.user_id
+WHERE a.status = 'ACCEPTED';
+CREATE UNIQUE INDEX ux_report_appointment_cost ON report_appointment_cost (appointment_id);
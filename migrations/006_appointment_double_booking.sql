@@ -0,0 +1,25 @@
+-- double-booking protection on databases created before it was added to database_app.sql:
+-- generated slot columns, the exclusion constraint over PENDING / ACCEPTED appointments and the check that keeps
+-- every appointment inside the 1970 .. 2286-11-20 window caregiver_slot can represent.
+-- fails if a caregiver already has overlapping PENDING / ACCEPTED appointments, list them with
+--   SELECT a.appointment_id, b.appointment_id FROM APPOINTMENT a JOIN APPOINTMENT b
+--     ON a.caregiver_user_id = b.caregiver_user_id AND a.appointment_id < b.appointment_id
+--    AND a.appointment_date + a.appointment_time < b.appointment_date + b.appointment_time + make_interval(hours => b.work_hours)
+--    AND b.appointment_date + b.appointment_time < a.appointment_date + a.appointment_time + make_interval(hours => a.work_hours)
+--   WHERE a.status IN ('PENDING', 'ACCEPTED') AND b.status IN ('PENDING', 'ACCEPTED')
+-- and decline or move one of each pair first. Rewrites the table, run it in a quiet period
+
+BEGIN;
+
+ALTER TABLE APPOINTMENT
+    ADD COLUMN slot tsrange GENERATED ALWAYS AS (tsrange(appointment_date + appointment_time, appointment_date + appointment_time + make_interval(hours => work_hours))) STORED,
+    ADD COLUMN caregiver_slot int8range GENERATED ALWAYS AS (int8range(
+        caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint,
+        caregiver_user_id * 10000000000::bigint + extract(epoch FROM appointment_date + appointment_time)::bigint + work_hours * 3600
+    )) STORED;
+
+ALTER TABLE APPOINTMENT
+    ADD CONSTRAINT ex_appointment_caregiver_slot EXCLUDE USING gist (caregiver_slot WITH &&) WHERE (status IN ('PENDING', 'ACCEPTED')),
+    ADD CONSTRAINT ck_appointment_slot_range CHECK (appointment_date >= DATE '1970-01-01' AND appointment_date + appointment_time + make_interval(hours => work_hours) < TIMESTAMP '2286-11-20');
+
+COMMIT;
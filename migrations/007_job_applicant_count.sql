@@ -0,0 +1,7 @@
+-- JOB.applicant_count on databases created before it was added to database_app.sql.
+-- the constant default does not rewrite the table, the index is built without blocking writes
+-- (run outside a transaction, plain psql -f). Then fill in the counts in batches:
+--   python -m app.applicant_counts
+
+ALTER TABLE JOB ADD COLUMN IF NOT EXISTS applicant_count INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_job_applicant_count ON JOB (applicant_count, job_id);
@@ -5,6 +5,7 @@ from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 from app.database import Base, get_db
 from app.main import app
+from app.cache import entity_cache
 
 from app.models.user import User
 from app.models.caregiver import Caregiver
@@ -80,6 +81,8 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    #ids restart in every test database, cached entries from a previous test would leak in
+    entity_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -0,0 +1,80 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from app.applicant_counts import repair_applicant_counts
+from app.models import User, Caregiver, Member, Job, JobApplication
+from app.models.enums import CaregivingType, Gender
+from tests.conftest import engine
+
+
+def _seed(db):
+    for user_id in [1, 2, 3, 10]:
+        db.add(User(user_id=user_id, email=f"count{user_id}@example.com", given_name="Count", surname="Test", city="Astana", phone_number="+77070000000", password="password123"))
+    db.flush()
+    for user_id in [1, 2, 3]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000))
+    db.add(Member(member_user_id=10))
+    db.flush()
+    for job_id in [1, 2, 3]:
+        db.add(Job(job_id=job_id, member_user_id=10, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date(2025, 1, job_id)))
+    db.commit()
+
+
+def _counts(client, **params):
+    response = client.get("/jobs/", params=params)
+    assert response.status_code == 200
+    return [(j["job_id"], j["applicant_count"]) for j in response.json()]
+
+
+def _apply(client, caregiver_user_id, job_id):
+    response = client.post("/job-applications/", data={"caregiver_user_id": caregiver_user_id, "job_id": job_id})
+    assert response.status_code == 201
+
+
+def test_applicant_count_follows_applications(client, db):
+    _seed(db)
+    assert client.get("/jobs/2").json()["applicant_count"] == 0  #cached now
+
+    for caregiver_user_id, job_id in [(1, 2), (2, 2), (3, 2), (1, 3), (2, 3)]:
+        _apply(client, caregiver_user_id, job_id)
+    assert client.post("/job-applications/", data={"caregiver_user_id": 1, "job_id": 2}).status_code == 400
+    assert client.get("/jobs/2").json()["applicant_count"] == 3
+    assert _counts(client) == [(1, 0), (2, 3), (3, 2)]
+
+    assert client.delete("/job-applications/caregiver/3/job/2").status_code == 204
+    assert client.get("/jobs/2").json()["applicant_count"] == 2
+
+    #ON DELETE CASCADE removes applications of deleted caregivers and accounts
+    assert client.delete("/caregivers/1").status_code == 204
+    assert client.get("/jobs/3").json()["applicant_count"] == 1
+    assert client.delete("/users/2").status_code == 204
+    assert _counts(client) == [(1, 0), (2, 0), (3, 0)]
+
+
+def test_jobs_sorted_by_applicant_count(client, db):
+    _seed(db)
+    for caregiver_user_id, job_id in [(1, 1), (1, 3), (2, 3)]:
+        _apply(client, caregiver_user_id, job_id)
+
+    assert _counts(client, sort="applicant_count", order="desc") == [(3, 2), (1, 1), (2, 0)]
+    #cursor paging with the (applicant_count, job_id) key
+    response = client.get("/jobs/", params={"sort": "applicant_count", "limit": 2})
+    assert [j["job_id"] for j in response.json()] == [2, 1]
+    cursor = response.headers["X-Next-Cursor"]
+    assert _counts(client, sort="applicant_count", limit=2, cursor=cursor) == [(3, 2)]
+    assert client.get("/jobs/", params={"sort": "date_posted"}).status_code == 422
+
+
+def test_repair_applicant_counts(db):
+    _seed(db)
+    #written around the API: counts stay 0
+    db.add_all([JobApplication(caregiver_user_id=c, job_id=j, date_applied=date(2025, 2, 1)) for c, j in [(1, 1), (2, 1), (3, 1), (1, 3)]])
+    db.commit()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE job SET applicant_count = 7 WHERE job_id = 2"))
+
+    assert repair_applicant_counts(engine, batch_size=2) == {"jobs": 3, "fixed": 3}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT job_id, applicant_count FROM job ORDER BY job_id")).all() == [(1, 3), (2, 0), (3, 1)]
+    assert repair_applicant_counts(engine) == {"jobs": 3, "fixed": 0}
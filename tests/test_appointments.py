@@ -1,5 +1,6 @@
 import pytest
-from datetime import date, time
+from datetime import date, time, timedelta
+from app.models import User, Caregiver, Member
 from app.models.enums import AppointmentStatus, Gender, CaregivingType
 from io import BytesIO
 
@@ -340,3 +341,76 @@ def test_delete_appointment(client):
     get_response = client.get(f"/appointments/{appointment_id}")
     assert get_response.status_code == 404
 
+
+def test_double_booking(client, db):
+    for user_id in [1, 2, 3]:
+        db.add(User(user_id=user_id, email=f"booking{user_id}@example.com", given_name="Booking", surname="Test", city="Astana", phone_number="+77070000000", password="password123"))
+    db.flush()
+    for user_id in [1, 2]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000))
+    db.add(Member(member_user_id=3))
+    db.commit()
+    day = (date.today() + timedelta(days=10)).isoformat()
+
+    def book(caregiver_user_id, appointment_time, work_hours, status):
+        return client.post(
+            "/appointments/",
+            data={
+                "caregiver_user_id": caregiver_user_id,
+                "member_user_id": 3,
+                "appointment_date": day,
+                "appointment_time": appointment_time,
+                "work_hours": work_hours,
+                "status": status.value
+            }
+        )
+
+    assert book(1, "10:00:00", 4, AppointmentStatus.ACCEPTED).status_code == 201
+    conflict = book(1, "13:00:00", 2, AppointmentStatus.PENDING)
+    assert conflict.status_code == 409
+    assert "already has" in conflict.json()["detail"]
+
+    #ends are exclusive, declined appointments and other caregivers do not count
+    adjacent = book(1, "14:00:00", 2, AppointmentStatus.PENDING)
+    assert adjacent.status_code == 201
+    declined = book(1, "11:00:00", 1, AppointmentStatus.DECLINED)
+    assert declined.status_code == 201
+    assert book(2, "10:00:00", 4, AppointmentStatus.ACCEPTED).status_code == 201
+
+    assert client.put(f"/appointments/{declined.json()['appointment_id']}?status={AppointmentStatus.ACCEPTED.value}").status_code == 409
+    assert client.put(f"/appointments/{adjacent.json()['appointment_id']}?appointment_time=12:00:00").status_code == 409
+    moved = client.put(f"/appointments/{adjacent.json()['appointment_id']}?appointment_time=15:00:00")
+    assert moved.status_code == 200
+    assert moved.json()["appointment_time"] == "15:00:00"
+
+
+def test_appointment_outside_slot_range_is_rejected(client, db):
+    db.add(User(user_id=1, email="range1@example.com", given_name="Range", surname="Test", city="Astana", phone_number="+77070000000", password="password123"))
+    db.add(User(user_id=2, email="range2@example.com", given_name="Range", surname="Test", city="Astana", phone_number="+77070000000", password="password123"))
+    db.flush()
+    db.add(Caregiver(caregiver_user_id=1, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000))
+    db.add(Member(member_user_id=2))
+    db.commit()
+
+    def book(appointment_date, appointment_time="10:00:00", work_hours=2):
+        return client.post(
+            "/appointments/",
+            data={
+                "caregiver_user_id": 1,
+                "member_user_id": 2,
+                "appointment_date": appointment_date,
+                "appointment_time": appointment_time,
+                "work_hours": work_hours,
+                "status": AppointmentStatus.PENDING.value
+            }
+        )
+
+    #caregiver_slot = caregiver_user_id * 10^10 + epoch seconds: outside 1970 .. 2286-11-20 it would overlap other caregivers
+    for response in [book("1969-12-31"), book("2286-11-20"), book("2286-11-19", "23:00:00", 24)]:
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Appointment must start on or after 1970-01-01 and end before 2286-11-20"
+
+    booked = book((date.today() + timedelta(days=1)).isoformat())
+    assert booked.status_code == 201
+    moved = client.put(f"/appointments/{booked.json()['appointment_id']}?appointment_date=2300-01-01")
+    assert moved.status_code == 400
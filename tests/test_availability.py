@@ -0,0 +1,73 @@
+from datetime import date, datetime, time, timedelta
+
+from app.availability import free_slots
+from app.models import User, Caregiver, Member, Appointment
+from app.models.enums import CaregivingType, Gender, AppointmentStatus
+
+
+def _seed(db, day):
+    for user_id in [1, 2, 3]:
+        db.add(User(user_id=user_id, email=f"free{user_id}@example.com", given_name="Free", surname="Test", city="Astana", phone_number="+77070000000", password="password123"))
+    db.flush()
+    for user_id in [1, 2]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000))
+    db.add(Member(member_user_id=3))
+    db.flush()
+    for appointment_id, caregiver, offset, start, hours, status in [
+        (1, 1, 0, time(9), 3, AppointmentStatus.ACCEPTED),
+        (2, 1, 0, time(13), 1, AppointmentStatus.PENDING),
+        (3, 1, 0, time(15), 2, AppointmentStatus.DECLINED),
+        (4, 1, 1, time(22), 4, AppointmentStatus.ACCEPTED),  #into the next day
+        (5, 2, 0, time(10), 8, AppointmentStatus.ACCEPTED),
+    ]:
+        db.add(Appointment(appointment_id=appointment_id, caregiver_user_id=caregiver, member_user_id=3, appointment_date=day + timedelta(days=offset), appointment_time=start, work_hours=hours, status=status))
+    db.commit()
+
+
+def test_free_slots_split_by_day():
+    start, end = datetime(2030, 1, 1), datetime(2030, 1, 3)
+    busy = [(datetime(2030, 1, 1, 9), datetime(2030, 1, 1, 12)), (datetime(2030, 1, 1, 12, 30), datetime(2030, 1, 1, 13))]
+    assert free_slots(busy, start, end, timedelta(hours=1)) == [
+        (datetime(2030, 1, 1), datetime(2030, 1, 1, 9)),
+        (datetime(2030, 1, 1, 13), datetime(2030, 1, 2)),
+        (datetime(2030, 1, 2), datetime(2030, 1, 3)),
+    ]
+    assert free_slots([], start, start + timedelta(minutes=30), timedelta(hours=1)) == []
+
+
+def test_availability(client, db):
+    day = date.today() + timedelta(days=5)
+    _seed(db, day)
+
+    response = client.get("/caregivers/1/availability", params={"from": day.isoformat(), "to": (day + timedelta(days=2)).isoformat()})
+    assert response.status_code == 200
+    data = response.json()
+    at = lambda d, h: datetime.combine(day + timedelta(days=d), time(h)).isoformat()
+    assert data["start"] == at(0, 0) and data["end"] == at(3, 0)
+    #declined appointments do not block the caregiver
+    assert data["busy"] == [
+        {"start": at(0, 9), "end": at(0, 12)},
+        {"start": at(0, 13), "end": at(0, 14)},
+        {"start": at(1, 22), "end": at(2, 2)},
+    ]
+    assert data["free"] == [
+        {"start": at(0, 0), "end": at(0, 9)},
+        {"start": at(0, 12), "end": at(0, 13)},
+        {"start": at(0, 14), "end": at(1, 0)},
+        {"start": at(1, 0), "end": at(1, 22)},
+        {"start": at(2, 2), "end": at(3, 0)},
+    ]
+
+    #only the caregiver's own appointments, clipped to the window, short gaps left out
+    data = client.get("/caregivers/1/availability", params={"from": (day + timedelta(days=2)).isoformat(), "to": (day + timedelta(days=2)).isoformat(), "min_hours": 23}).json()
+    assert data["busy"] == [{"start": at(2, 0), "end": at(2, 2)}]
+    assert data["free"] == []
+
+    #the calendar follows writes
+    client.put("/appointments/1?status=DECLINED")
+    data = client.get("/caregivers/1/availability", params={"from": day.isoformat(), "to": day.isoformat()}).json()
+    assert data["busy"] == [{"start": at(0, 13), "end": at(0, 14)}]
+
+    assert client.get("/caregivers/999/availability").status_code == 404
+    assert client.get("/caregivers/1/availability", params={"from": "2030-01-02", "to": "2030-01-01"}).status_code == 400
+    assert client.get("/caregivers/1/availability", params={"from": "2030-01-01", "to": "2031-06-01"}).status_code == 400
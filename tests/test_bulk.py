@@ -0,0 +1,125 @@
+import pytest
+import json
+from datetime import date, timedelta
+from io import BytesIO
+
+from app.models.enums import AppointmentStatus, CaregivingType, Gender
+
+
+def user_row(i, **overrides):
+    row = {
+        "email": f"bulk{i}@example.com",
+        "given_name": f"Bulk{i}",
+        "surname": "User",
+        "city": "Astana",
+        "phone_number": "+77071234567",
+        "password": "password123"
+    }
+    row.update(overrides)
+    return row
+
+
+def test_bulk_create_users_reports_row_errors(client):
+    client.post("/users/", data=user_row(0))
+
+    response = client.post("/users/bulk", json=[
+        user_row(1),
+        user_row(2, phone_number="123"),
+        user_row(0),
+        user_row(3),
+        user_row(3),
+        {"email": "not-an-email"},
+    ])
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [r["row"] for r in data["created"]] == [0, 3]
+    assert [e["row"] for e in data["errors"]] == [1, 2, 4, 5]
+    assert data["errors"][1]["detail"] == "Email already registered"
+
+    created_id = data["created"][1]["id"]
+    assert client.get(f"/users/{created_id}").json()["email"] == "bulk3@example.com"
+
+
+def test_bulk_create_jobs_ndjson(client):
+    member_user_id = client.post("/users/", data=user_row(10)).json()["user_id"]
+    client.post("/members/", data={"member_user_id": member_user_id})
+
+    lines = [
+        {"member_user_id": member_user_id, "required_caregiving_type": CaregivingType.BABYSITTER.value},
+        {"member_user_id": 999999, "required_caregiving_type": CaregivingType.BABYSITTER.value},
+        {"member_user_id": member_user_id, "required_caregiving_type": CaregivingType.ELDERLY_CARE.value, "job_id": 100},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{broken\n"
+    response = client.post("/jobs/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [r["row"] for r in data["created"]] == [0, 2]
+    assert data["created"][1]["id"] == 100
+    assert [e["row"] for e in data["errors"]] == [1, 3]
+    assert data["errors"][0]["detail"] == "Member not found"
+
+    #sequence was moved past the explicit id
+    response = client.post("/jobs/", data={"member_user_id": member_user_id, "required_caregiving_type": CaregivingType.BABYSITTER.value})
+    assert response.json()["job_id"] > 100
+
+
+def test_bulk_explicit_id_does_not_collide_with_generated(client):
+    member_user_id = client.post("/users/", data=user_row(20)).json()["user_id"]
+    client.post("/members/", data={"member_user_id": member_user_id})
+    job = {"member_user_id": member_user_id, "required_caregiving_type": CaregivingType.BABYSITTER.value}
+    next_id = client.post("/jobs/", data=job).json()["job_id"] + 1
+
+    #the generated row comes first but the explicit one takes the id the sequence would hand out next
+    response = client.post("/jobs/bulk", json=[job, {**job, "job_id": next_id}])
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["errors"] == []
+    assert data["created"][1]["id"] == next_id
+    assert data["created"][0]["id"] > next_id
+
+
+def test_bulk_create_appointments(client):
+    caregiver_user_id = client.post("/users/", data=user_row(20)).json()["user_id"]
+    client.post(
+        "/caregivers/",
+        data={
+            "caregiver_user_id": caregiver_user_id,
+            "gender": Gender.MALE.value,
+            "caregiving_type": CaregivingType.ELDERLY_CARE.value,
+            "hourly_rate": 1500
+        },
+        files={"photo": ("photo.jpg", BytesIO(b"fake photo content"), "image/jpeg")}
+    )
+    member_user_id = client.post("/users/", data=user_row(21)).json()["user_id"]
+    client.post("/members/", data={"member_user_id": member_user_id})
+
+    tomorrow = date.today() + timedelta(days=1)
+    rows = [
+        {
+            "caregiver_user_id": caregiver_user_id,
+            "member_user_id": member_user_id,
+            "appointment_date": (tomorrow + timedelta(days=i)).isoformat(),
+            "appointment_time": "10:00:00",
+            "work_hours": 2,
+            "status": AppointmentStatus.PENDING.value
+        }
+        for i in range(4)
+    ]
+    rows[1]["caregiver_user_id"] = member_user_id
+    rows[2]["work_hours"] = 0
+
+    response = client.post("/appointments/bulk", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    #several valid rows go through one multi-row INSERT (enum parameters cast to the database types)
+    assert [r["row"] for r in data["created"]] == [0, 3]
+    assert data["errors"][0] == {"row": 1, "detail": "Caregiver not found"}
+    assert data["errors"][1]["row"] == 2
+
+
+def test_bulk_rejects_non_array(client):
+    response = client.post("/users/bulk", json={"email": "x@example.com"})
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import pytest
+import time
+from io import BytesIO
+
+from app.cache import CacheBackend, NullCache, LRUCache, entity_cache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set(("user", 1), "a")
+    cache.set(("user", 2), "b")
+    cache.get(("user", 1))
+    cache.set(("user", 3), "c")
+
+    assert cache.get(("user", 2)) is None
+    assert cache.get(("user", 1)) == "a"
+    assert cache.get(("user", 3)) == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_backend_must_implement_every_method():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+    assert NullCache().get(("user", 1)) is None
+
+def test_ttl_expiry_and_tag_invalidation():
+    cache = LRUCache(max_entries=10, ttl=0.01)
+    cache.set(("user", 1), "a")
+    time.sleep(0.02)
+    assert cache.get(("user", 1)) is None
+
+    cache = LRUCache(max_entries=10, ttl=60)
+    cache.set(("appointment", 1), "a", tags=[("caregiver", 3), ("member", 7)])
+    cache.set(("job", 1), "j", tags=[("member", 8)])
+    cache.invalidate_tags([("caregiver", 3)])
+
+    assert cache.get(("appointment", 1)) is None
+    assert cache.get(("job", 1)) == "j"
+
+
+def test_value_loaded_before_invalidation_is_not_cached():
+    cache = LRUCache(max_entries=10, ttl=60)
+    generation = cache.generation
+    cache.delete(("user", 1))  #write committed while the read was in flight
+    cache.set(("user", 1), "stale", generation=generation)
+
+    assert cache.get(("user", 1)) is None
+
+
+def test_get_user_is_cached_and_invalidated_on_write(client):
+    user_id = client.post(
+        "/users/",
+        data={
+            "email": "cached@example.com",
+            "given_name": "Cached",
+            "surname": "User",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    ).json()["user_id"]
+    client.post(
+        "/caregivers/",
+        data={"caregiver_user_id": user_id, "gender": "FEMALE", "caregiving_type": "BABYSITTER", "hourly_rate": 1200},
+        files={"photo": ("photo.jpg", BytesIO(b"fake image"), "image/jpeg")}
+    )
+
+    assert client.get(f"/users/{user_id}").status_code == 200
+    assert client.get(f"/caregivers/{user_id}").status_code == 200
+    hits = entity_cache.stats()["hits"]
+    assert client.get(f"/users/{user_id}").json()["city"] == "Astana"
+    assert entity_cache.stats()["hits"] == hits + 1
+
+    client.put(f"/users/{user_id}", params={"city": "Almaty"})
+    assert client.get(f"/users/{user_id}").json()["city"] == "Almaty"
+
+    #cascade: deleting the user removes the cached caregiver too
+    client.delete(f"/users/{user_id}")
+    assert client.get(f"/users/{user_id}").status_code == 404
+    assert client.get(f"/caregivers/{user_id}").status_code == 404
+
+    assert client.get("/admin/cache").json()["backend"] == "memory"
@@ -1,4 +1,5 @@
 import pytest
+import hashlib
 
 from app.models.enums import CaregivingType, Gender
 from io import BytesIO
@@ -142,3 +143,212 @@ def test_delete_caregiver(client):
     
     assert get_response.status_code == 404
 
+
+def test_search_caregivers(client):
+    caregivers = [
+        ("Astana", Gender.FEMALE, CaregivingType.BABYSITTER, 1000),
+        ("Astana", Gender.MALE, CaregivingType.BABYSITTER, 1500),
+        ("Almaty", Gender.FEMALE, CaregivingType.BABYSITTER, 1200),
+        ("Astana", Gender.FEMALE, CaregivingType.ELDERLY_CARE, 1100),
+        ("Astana", Gender.FEMALE, CaregivingType.BABYSITTER, 2500),
+    ]
+    for i, (city, gender, caregiving_type, hourly_rate) in enumerate(caregivers):
+        user_id = client.post(
+            "/users/",
+            data={
+                "email": f"search{i}@example.com",
+                "given_name": "Search",
+                "surname": "Test",
+                "city": city,
+                "phone_number": "+77075555555",
+                "password": "password123"
+            }
+        ).json()["user_id"]
+        client.post(
+            "/caregivers/",
+            data={
+                "caregiver_user_id": user_id,
+                "gender": gender.value,
+                "caregiving_type": caregiving_type.value,
+                "hourly_rate": hourly_rate
+            },
+            files={"photo": ("photo.jpg", BytesIO(b"fake photo content"), "image/jpeg")}
+        )
+
+    params = {"caregiving_type": "BABYSITTER", "city": "Astana", "max_rate": 2000, "order": "desc", "limit": 1}
+    response = client.get("/caregivers/search", params=params)
+    assert response.status_code == 200
+    assert [c["hourly_rate"] for c in response.json()] == [1500]
+
+    response = client.get("/caregivers/search", params={**params, "cursor": response.headers["X-Next-Cursor"]})
+    assert [c["hourly_rate"] for c in response.json()] == [1000]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/caregivers/search", params={"gender": "FEMALE", "min_rate": 1100})
+    assert [c["hourly_rate"] for c in response.json()] == [1100, 1200, 2500]
+
+    assert client.get("/caregivers/search", params={"min_rate": 10, "max_rate": 5}).status_code == 400
+
+def test_update_caregiver_photo_streamed_and_capped(client, monkeypatch):
+    import app.photos
+
+    user_id = client.post(
+        "/users/",
+        data={
+            "email": "photo_upload@example.com",
+            "given_name": "Photo",
+            "surname": "Upload",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    ).json()["user_id"]
+    client.post(
+        "/caregivers/",
+        data={"caregiver_user_id": user_id, "gender": Gender.MALE.value, "caregiving_type": CaregivingType.BABYSITTER.value, "hourly_rate": 1000},
+        files={"photo": ("photo.jpg", BytesIO(b"first"), "image/jpeg")}
+    )
+
+    #several chunks, written to disk unchanged
+    content = bytes(range(256)) * (3 * app.photos.PHOTO_CHUNK_BYTES // 256 + 7)
+    response = client.put(f"/caregivers/{user_id}/photo", files={"photo": ("big.jpg", BytesIO(content), "image/jpeg")})
+    assert response.status_code == 200
+    photo = response.json()["photo"]
+    assert (app.photos.static_path / photo).read_bytes() == content
+
+    monkeypatch.setattr(app.photos, "MAX_PHOTO_BYTES", 1024)
+    response = client.put(f"/caregivers/{user_id}/photo", files={"photo": ("huge.jpg", BytesIO(b"x" * 2048), "image/jpeg")})
+    assert response.status_code == 413
+    #old photo kept, no temp file left behind
+    assert client.get(f"/caregivers/{user_id}").json()["photo"] == photo
+    assert list(app.photos.incoming_path.iterdir()) == []
+
+
+def test_unfinished_uploads_are_not_served(client):
+    import app.photos
+
+    #an upload still being written, or a part file left behind by a killed worker
+    part = app.photos.incoming_path / "upload.part"
+    part.write_bytes(b"half")
+    try:
+        assert client.get("/static/.incoming/upload.part").status_code == 404
+        assert client.get("/static/.incoming/").status_code == 404
+        assert client.get("/static/derived/../.incoming/upload.part").status_code == 404
+    finally:
+        part.unlink()
+
+def test_get_caregiver_photo_resized(client):
+    import app.photos
+    from PIL import Image
+
+    image = BytesIO()
+    Image.new("RGB", (1200, 800), (200, 40, 40)).save(image, "JPEG")
+
+    user_ids = []
+    photos = set()
+    for i in range(2):
+        user_id = client.post(
+            "/users/",
+            data={
+                "email": f"photo_size_{i}@example.com",
+                "given_name": "Photo",
+                "surname": "Size",
+                "city": "Astana",
+                "phone_number": "+77071234567",
+                "password": "password123"
+            }
+        ).json()["user_id"]
+        response = client.post(
+            "/caregivers/",
+            data={"caregiver_user_id": user_id, "gender": Gender.FEMALE.value, "caregiving_type": CaregivingType.BABYSITTER.value, "hourly_rate": 1000},
+            files={"photo": ("photo.jpg", BytesIO(image.getvalue()), "image/jpeg")}
+        )
+        assert response.status_code == 201
+        user_ids.append(user_id)
+        photos.add(response.json()["photo"])
+
+    #same content uploaded twice -> one stored file, one file per size
+    digest = hashlib.sha256(image.getvalue()).hexdigest()
+    assert photos == {f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"}
+    assert sorted(p.name for p in app.photos.derived_path.rglob(f"{digest}_*")) == [f"{digest}_128.jpg", f"{digest}_512.jpg"]
+
+    for user_id in user_ids:
+        response = client.get(f"/caregivers/{user_id}/photo", params={"size": "thumb"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert Image.open(BytesIO(response.content)).size == (128, 85)
+
+    assert Image.open(BytesIO(client.get(f"/caregivers/{user_ids[0]}/photo", params={"size": "medium"}).content)).size == (512, 341)
+    assert client.get(f"/caregivers/{user_ids[0]}/photo").content == image.getvalue()
+    assert client.get(f"/caregivers/{user_ids[0]}/photo", params={"size": "huge"}).status_code == 422
+
+    #rendered on first request when missing
+    for path in app.photos.derived_path.rglob(f"{digest}_*"):
+        path.unlink()
+    assert client.get(f"/caregivers/{user_ids[1]}/photo", params={"size": "medium"}).status_code == 200
+    assert [p.name for p in app.photos.derived_path.rglob(f"{digest}_*")] == [f"{digest}_512.jpg"]
+
+    client.put(f"/caregivers/{user_ids[1]}/photo", files={"photo": ("photo.jpg", BytesIO(b"not an image"), "image/jpeg")})
+    assert client.get(f"/caregivers/{user_ids[1]}/photo", params={"size": "thumb"}).status_code == 415
+
+def test_caregiver_photo_conditional_and_range(client):
+    user_id = client.post(
+        "/users/",
+        data={
+            "email": "photo_cache@example.com",
+            "given_name": "Photo",
+            "surname": "Cache",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    ).json()["user_id"]
+    content = bytes(range(256)) * 40
+    photo = client.post(
+        "/caregivers/",
+        data={"caregiver_user_id": user_id, "gender": Gender.MALE.value, "caregiving_type": CaregivingType.BABYSITTER.value, "hourly_rate": 1000},
+        files={"photo": ("photo.jpg", BytesIO(content), "image/jpeg")}
+    ).json()["photo"]
+
+    response = client.get(f"/caregivers/{user_id}/photo")
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = client.get(f"/caregivers/{user_id}/photo", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(f"/caregivers/{user_id}/photo", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(f"/caregivers/{user_id}/photo", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified}).status_code == 200
+
+    response = client.get(f"/caregivers/{user_id}/photo", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == content[100:200]
+    assert response.headers["content-range"] == f"bytes 100-199/{len(content)}"
+    assert client.get(f"/caregivers/{user_id}/photo", headers={"Range": "bytes=-10"}).content == content[-10:]
+    assert client.get(f"/caregivers/{user_id}/photo", headers={"Range": "bytes=10000-"}).content == content[10000:]
+
+    response = client.get(f"/caregivers/{user_id}/photo", headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(content)}"
+
+    #If-Range with an old validator -> whole file
+    assert client.get(f"/caregivers/{user_id}/photo", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    assert client.get(f"/caregivers/{user_id}/photo", headers={"Range": "bytes=0-9", "If-Range": '"old"'}).content == content
+
+    #uuid-named file under /static never changes
+    response = client.get(f"/static/{photo}")
+    assert response.content == content
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert client.get(f"/static/{photo}", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    assert client.get(f"/static/{photo}", headers={"Range": "bytes=0-3"}).content == content[:4]
+
+    #new photo -> new etag for the same url
+    client.put(f"/caregivers/{user_id}/photo", files={"photo": ("photo.jpg", BytesIO(b"new photo"), "image/jpeg")})
+    response = client.get(f"/caregivers/{user_id}/photo", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.content == b"new photo"
@@ -0,0 +1,57 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.database import get_db
+from app.main import app
+from tests.conftest import SQLALCHEMY_DATABASE_URL
+
+
+@pytest.fixture(scope="function")
+def async_client(db):
+    #same test database, but every request gets an AsyncSession (DB_MODE=async path)
+    #NullPool: asyncpg connections must not outlive the TestClient event loop
+    async_url = make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg")
+    async_engine = create_async_engine(async_url, poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as test_client:
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def test_async_session_crud(async_client):
+    response = async_client.post(
+        "/users/",
+        data={
+            "email": "async@example.com",
+            "given_name": "Async",
+            "surname": "User",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    )
+    assert response.status_code == 201
+    user_id = response.json()["user_id"]
+
+    response = async_client.put(f"/users/{user_id}?city=Almaty")
+    assert response.status_code == 200
+    assert response.json()["city"] == "Almaty"
+
+    response = async_client.get("/users/")
+    assert response.status_code == 200
+    assert [u["user_id"] for u in response.json()] == [user_id]
+
+    response = async_client.delete(f"/users/{user_id}")
+    assert response.status_code == 204
+
+    response = async_client.get(f"/users/{user_id}")
+    assert response.status_code == 404
@@ -0,0 +1,47 @@
+from sqlalchemy import text
+
+from benchmarks.datagen import generate
+from tests.conftest import engine
+
+#md5 over all rows of the seven tables
+FINGERPRINT = """
+    SELECT md5(string_agg(r::text, '|' ORDER BY r::text)) FROM (
+        SELECT a::text AS r FROM account a UNION ALL
+        SELECT c::text FROM caregiver c UNION ALL
+        SELECT m::text FROM member m UNION ALL
+        SELECT ad::text FROM address ad UNION ALL
+        SELECT j::text FROM job j UNION ALL
+        SELECT ja::text FROM job_application ja UNION ALL
+        SELECT ap::text FROM appointment ap
+    ) t
+"""
+
+
+def test_generate_is_deterministic_and_valid(db):
+    args = dict(caregivers=30, members=20, jobs=40, appointments=200, seed=7, chunk_size=16, bind=engine)
+    totals = generate(workers=1, **args)
+    assert totals["account"] == 50 and totals["caregiver"] == 30 and totals["member"] == 20
+    assert totals["job"] == 40 and totals["appointment"] == 200
+
+    with engine.connect() as conn:
+        first = conn.execute(text(FINGERPRINT)).scalar()
+        #applications only to caregivers of the job's type
+        assert conn.execute(text("""
+            SELECT COUNT(*) FROM job_application ja
+            JOIN job j ON ja.job_id = j.job_id
+            JOIN caregiver c ON ja.caregiver_user_id = c.caregiver_user_id
+            WHERE c.caregiving_type <> j.required_caregiving_type
+        """)).scalar() == 0
+        assert conn.execute(text("SELECT COUNT(*) FROM job_application")).scalar() == totals["job_application"]
+        #applicant_count is written with the job
+        assert conn.execute(text("""
+            SELECT COUNT(*) FROM job j
+            WHERE j.applicant_count <> (SELECT COUNT(*) FROM job_application ja WHERE ja.job_id = j.job_id)
+        """)).scalar() == 0
+
+    #same rows with several workers; sequences continue after the generated ids
+    generate(workers=2, truncate=True, **args)
+    with engine.connect() as conn:
+        assert conn.execute(text(FINGERPRINT)).scalar() == first
+        assert conn.execute(text("SELECT nextval(pg_get_serial_sequence('account', 'user_id'))")).scalar() == 51
+        assert conn.execute(text("SELECT nextval(pg_get_serial_sequence('appointment', 'appointment_id'))")).scalar() == 201
@@ -0,0 +1,70 @@
+from datetime import date
+
+from app.metrics import instrument
+from app.models import User, Caregiver, Member, Address, Job, JobApplication
+from app.models.enums import CaregivingType, Gender
+from tests.conftest import engine
+from tests.test_metrics import _samples
+
+
+def _seed(db):
+    for user_id in [1, 2, 3, 10, 11]:
+        db.add(User(user_id=user_id, email=f"expand{user_id}@example.com", given_name="Expand", surname=f"Test{user_id}", city="Astana", phone_number="+77070000000", password="password123"))
+    db.flush()
+    for user_id in [1, 2, 3]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000))
+    db.add_all([Member(member_user_id=10), Member(member_user_id=11)])
+    db.flush()
+    db.add(Address(member_user_id=10, house_number="1", street="Kabanbay Batyr", town="Astana"))
+    for job_id in [1, 2, 3]:
+        db.add(Job(job_id=job_id, member_user_id=10, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date(2025, 1, 1), applicant_count=job_id - 1))
+    db.flush()
+    db.add_all([JobApplication(caregiver_user_id=c, job_id=j, date_applied=date(2025, 1, 2)) for c, j in [(1, 2), (1, 3), (2, 3)]])
+    db.commit()
+
+
+def test_expand_nested_objects(client, db):
+    _seed(db)
+
+    caregivers = client.get("/caregivers/", params={"expand": "user"}).json()
+    assert [(c["caregiver_user_id"], c["user"]["surname"]) for c in caregivers] == [(1, "Test1"), (2, "Test2"), (3, "Test3")]
+    assert client.get("/caregivers/2", params={"expand": "user"}).json()["user"]["user_id"] == 2
+
+    members = client.get("/members/", params={"expand": "user, address"}).json()
+    assert members[0]["address"]["street"] == "Kabanbay Batyr" and members[0]["user"]["user_id"] == 10
+    assert members[1]["address"] is None
+    assert set(client.get("/members/11", params={"expand": "address"}).json()) == {"member_user_id", "house_rules", "dependent_description", "address"}
+
+    jobs = client.get("/jobs/", params={"expand": "applications"}).json()
+    assert [[a["caregiver_user_id"] for a in j["applications"]] for j in jobs] == [[], [1], [1, 2]]
+    assert len(client.get("/jobs/3", params={"expand": "applications"}).json()["applications"]) == 2
+
+
+def test_expand_is_optional(client, db):
+    _seed(db)
+    #without expand the responses keep their old shape
+    assert "user" not in client.get("/caregivers/1").json()
+    assert all("user" not in c for c in client.get("/caregivers/").json())
+    assert set(client.get("/members/10").json()) == {"member_user_id", "house_rules", "dependent_description"}
+    assert "applications" not in client.get("/jobs/1").json()
+
+    response = client.get("/caregivers/", params={"expand": "user,photos"})
+    assert response.status_code == 400
+    assert "photos" in response.json()["detail"]
+    assert client.get("/jobs/1", params={"expand": "user"}).status_code == 400
+
+
+def test_expand_statement_count(client, db):
+    _seed(db)
+    instrument(engine)
+    key = ("http_request_db_statements_sum", "GET", "/jobs/")
+    before = _samples(client).get(key, 0)
+    client.get("/jobs/", params={"expand": "applications"})
+    after = _samples(client)[key]
+    #page + one IN query for all applications of the page
+    assert after - before == 2
+
+    key = ("http_request_db_statements_sum", "GET", "/members/")
+    before = _samples(client).get(key, 0)
+    client.get("/members/", params={"expand": "user,address"})
+    assert _samples(client)[key] - before == 1  #to-one expansions are joined
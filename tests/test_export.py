@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+
+
+def _seed(client):
+    user_id = client.post(
+        "/users/",
+        data={
+            "email": "export@example.com",
+            "given_name": "Export",
+            "surname": "Test",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    ).json()["user_id"]
+    client.post("/members/", data={"member_user_id": user_id})
+    for posted in ("2024-01-10", "2024-06-01", "2025-02-03"):
+        client.post("/jobs/", data={
+            "member_user_id": user_id,
+            "required_caregiving_type": "BABYSITTER",
+            "other_requirements": 'Quotes "and", commas\nnew lines',
+            "date_posted": posted
+        })
+    return user_id
+
+
+def test_export_csv(client):
+    _seed(client)
+    response = client.get("/export/jobs")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [r["date_posted"] for r in rows] == ["2024-01-10", "2024-06-01", "2025-02-03"]
+    assert rows[0]["other_requirements"] == 'Quotes "and", commas\nnew lines'
+
+    users = list(csv.DictReader(io.StringIO(client.get("/export/users").text)))
+    assert len(users) == 1 and "password" not in users[0]
+
+
+def test_export_ndjson_since(client):
+    _seed(client)
+    response = client.get("/export/jobs", params={"format": "ndjson", "since": "2024-06-01"})
+    assert response.status_code == 200
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["date_posted"] for r in rows] == ["2024-06-01", "2025-02-03"]
+    assert rows[0]["required_caregiving_type"] == "BABYSITTER"
+
+
+def test_export_errors(client):
+    assert client.get("/export/passwords").status_code == 404
+    assert client.get("/export/users", params={"since": "2024-01-01"}).status_code == 400
+    assert client.get("/export/jobs", params={"format": "xml"}).status_code == 422
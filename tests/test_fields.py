@@ -0,0 +1,76 @@
+from datetime import date
+
+from sqlalchemy import event
+
+from app.models import User, Caregiver, Member, Job, JobApplication
+from app.models.enums import CaregivingType, Gender
+from tests.conftest import engine
+
+
+def _seed(db):
+    for user_id in [1, 2, 10]:
+        db.add(User(user_id=user_id, email=f"fields{user_id}@example.com", given_name=f"Name{user_id}", surname="Test", city="Astana", phone_number="+77070000000", profile_description="long text " * 100, password="password123"))
+    db.flush()
+    for user_id in [1, 2]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=1000 * user_id))
+    db.add(Member(member_user_id=10))
+    db.flush()
+    for job_id, applicants in [(1, 2), (2, 0), (3, 1)]:
+        db.add(Job(job_id=job_id, member_user_id=10, required_caregiving_type=CaregivingType.BABYSITTER, other_requirements="long text " * 100, date_posted=date(2025, 1, job_id), applicant_count=applicants))
+    db.flush()
+    db.add_all([JobApplication(caregiver_user_id=c, job_id=j, date_applied=date(2025, 2, 1)) for c, j in [(1, 1), (2, 1), (1, 3)]])
+    db.commit()
+
+
+class _Statements(list):
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.append(statement)
+
+
+def test_sparse_list(client, db):
+    _seed(db)
+    with _Statements() as statements:
+        response = client.get("/users/", params={"fields": "user_id,given_name"})
+    assert response.status_code == 200
+    assert response.json() == [{"user_id": 1, "given_name": "Name1"}, {"user_id": 2, "given_name": "Name2"}, {"user_id": 10, "given_name": "Name10"}]
+    #only the requested columns are read
+    assert len(statements) == 1 and "profile_description" not in statements[0] and "given_name" in statements[0]
+
+    assert client.get("/caregivers/search", params={"fields": "caregiving_type", "order": "desc"}).json() == [{"caregiving_type": "BABYSITTER"}] * 2
+    assert client.get("/job-applications/", params={"fields": "date_applied", "limit": 1}).json() == [{"date_applied": "2025-02-01"}]
+
+
+def test_sparse_list_paging(client, db):
+    _seed(db)
+    #the sort key is loaded for the cursor even when it is not returned
+    response = client.get("/jobs/", params={"fields": "job_id", "sort": "applicant_count", "order": "desc", "limit": 2})
+    assert response.json() == [{"job_id": 1}, {"job_id": 3}]
+    response = client.get("/jobs/", params={"fields": "job_id", "sort": "applicant_count", "order": "desc", "limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+    assert response.json() == [{"job_id": 2}]
+    assert "X-Next-Cursor" not in response.headers
+
+    jobs = client.get("/jobs/", params={"fields": "job_id,applicant_count", "expand": "applications"}).json()
+    assert [(j["job_id"], j["applicant_count"], len(j["applications"])) for j in jobs] == [(1, 2, 2), (2, 0, 0), (3, 1, 1)]
+    assert set(jobs[0]) == {"job_id", "applicant_count", "applications"}
+
+
+def test_sparse_detail(client, db):
+    _seed(db)
+    assert client.get("/users/1", params={"fields": "email"}).json() == {"email": "fields1@example.com"}
+    assert client.get("/users/1").json()["profile_description"].startswith("long text")  #same cache entry, all fields
+    assert client.get("/jobs/3", params={"fields": "date_posted,required_caregiving_type"}).json() == {"date_posted": "2025-01-03", "required_caregiving_type": "BABYSITTER"}
+    assert client.get("/members/10", params={"fields": "member_user_id", "expand": "user"}).json()["user"]["user_id"] == 10
+    assert client.get("/job-applications/caregiver/2/job/1", params={"fields": "job_id"}).json() == {"job_id": 1}
+    assert client.get("/users/999", params={"fields": "email"}).status_code == 404
+
+    response = client.get("/users/1", params={"fields": "email,salary"})
+    assert response.status_code == 400
+    assert "salary" in response.json()["detail"]
+    assert client.get("/jobs/", params={"fields": " , "}).status_code == 400
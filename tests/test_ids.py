@@ -0,0 +1,80 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from datetime import date
+
+from sqlalchemy import text
+
+from app.models import User, Member, Job
+from app.models.enums import CaregivingType
+from app.identity import bump_identity
+from app.routers.users import _create_user
+from tests.conftest import TestingSessionLocal
+
+
+def test_concurrent_user_inserts_get_unique_ids(db):
+    #every insert in its own session, like concurrent requests - ids come from the identity sequence
+    def insert(i):
+        session = TestingSessionLocal()
+        try:
+            u = _create_user(session, f"concurrent{i}@example.com", "Con", "Current", "Astana", "+77071234567", None, "password123")
+            return u.user_id
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(insert, range(40)))
+
+    assert len(set(ids)) == 40
+    assert db.query(User).count() == 40
+
+
+def test_generated_job_id_skips_client_supplied_id(client):
+    user_response = client.post(
+        "/users/",
+        data={
+            "email": "job_ids@example.com",
+            "given_name": "Job",
+            "surname": "Ids",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    )
+    member_user_id = user_response.json()["user_id"]
+    client.post("/members/", data={"member_user_id": member_user_id})
+
+    response = client.post("/jobs/", data={"member_user_id": member_user_id, "required_caregiving_type": "BABYSITTER", "job_id": 50})
+    assert response.status_code == 201
+    assert response.json()["job_id"] == 50
+
+    response = client.post("/jobs/", data={"member_user_id": member_user_id, "required_caregiving_type": "BABYSITTER"})
+    assert response.status_code == 201
+    assert response.json()["job_id"] > 50
+
+    response = client.post("/jobs/", data={"member_user_id": member_user_id, "required_caregiving_type": "BABYSITTER", "job_id": 50})
+    assert response.status_code == 400
+
+
+def test_explicit_id_in_gap_does_not_rewind_sequence(client, db):
+    #rows loaded like database_app.sql: explicit ids, then setval(MAX + 1, false)
+    db.add(User(user_id=1, email="gap@example.com", given_name="Gap", surname="Test", city="Astana", phone_number="+77071234567", password="password123"))
+    db.flush()
+    db.add(Member(member_user_id=1))
+    db.flush()
+    db.add_all([Job(job_id=job_id, member_user_id=1, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date(2025, 1, 1)) for job_id in (1, 2, 3)])
+    db.execute(text("SELECT setval(pg_get_serial_sequence('job', 'job_id'), 4, false)"))
+    db.commit()
+
+    assert client.delete("/jobs/2").status_code == 204
+    response = client.post("/jobs/", data={"member_user_id": 1, "required_caregiving_type": "BABYSITTER", "job_id": 2})
+    assert response.status_code == 201
+
+    response = client.post("/jobs/", data={"member_user_id": 1, "required_caregiving_type": "BABYSITTER"})
+    assert response.status_code == 201
+    assert response.json()["job_id"] == 4
+
+
+def test_bump_identity_rejects_column_without_sequence(db):
+    with pytest.raises(ValueError, match="job.member_user_id is not an identity column"):
+        bump_identity(db, Job.__table__.c.member_user_id, 10)
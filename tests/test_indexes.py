@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from app.indexes import managed_indexes, missing_indexes, ensure_indexes
+from tests.conftest import engine
+
+
+def test_schema_sql_has_all_managed_indexes(db):
+    #test database is built from database_app.sql, models and the sql file must declare the same set
+    with engine.connect() as conn:
+        assert missing_indexes(conn) == []
+    assert "ix_appointment_accepted" in {index.name for index in managed_indexes()}
+
+
+def test_ensure_indexes_recreates_dropped_index(db):
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_appointment_member"))
+
+    assert ensure_indexes(engine) == ["ix_appointment_member"]
+    assert ensure_indexes(engine) == []
@@ -0,0 +1,56 @@
+import asyncio
+import random
+
+import httpx
+
+from app.main import app
+from benchmarks.datagen import generate
+from benchmarks.loadtest import OPERATIONS, Context, Skip, compare, load_ids
+from tests.conftest import engine
+
+
+def test_every_operation_gets_an_expected_status(client):
+    generate(caregivers=20, members=20, jobs=20, appointments=50, seed=3, bind=engine)
+    ids = load_ids(engine)
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            ctx = Context(http, random.Random(1), ids)
+            statuses = {}
+            for op in OPERATIONS:
+                try:
+                    method, url, kwargs, after = await op.build(ctx)
+                except Skip as e:
+                    statuses[op.name] = f"skipped: {e}"
+                    continue
+                response = await http.request(method, url, **kwargs)
+                statuses[op.name] = response.status_code
+                if after is not None and response.status_code in op.ok:
+                    after(response)
+            return statuses
+
+    statuses = asyncio.run(run())
+    #every endpoint of app/routers is covered (not the /admin page of main.py)
+    prefixes = {"users", "caregivers", "members", "addresses", "jobs", "job-applications", "appointments", "export", "reports", "admin"}
+    routes = {
+        f"{method} {route.path}" for route in app.routes
+        if route.path.count("/") > 1 and route.path.split("/")[1] in prefixes for method in route.methods
+    }
+    assert len(routes) == len(OPERATIONS)
+    unexpected = {op.name: statuses[op.name] for op in OPERATIONS if statuses[op.name] not in op.ok}
+    assert unexpected == {}
+
+
+def test_compare_flags_regressions():
+    def summary(p50, p95, errors=0, rps=100.0):
+        return {"requests": 100, "errors": errors, "rps": rps, "p50_ms": p50, "p95_ms": p95, "p99_ms": p95}
+
+    baseline = {"total": summary(10, 20), "operations": {"GET /jobs/{id}": summary(10, 20), "GET /users/{id}": summary(1, 2)}}
+    current = {"total": summary(11, 22, rps=90), "operations": {"GET /jobs/{id}": summary(10, 40, errors=5), "GET /users/{id}": summary(1.5, 3)}}
+    #sub-millisecond noise on /users is below min_ms
+    assert compare(current, baseline, threshold=0.2, min_ms=2) == [
+        "GET /jobs/{id}: p95_ms 20 -> 40",
+        "GET /jobs/{id}: error rate 0.0% -> 5.0%",
+    ]
+    current["total"]["rps"] = 70
+    assert compare(current, baseline)[-1] == "total: rps 100.0 -> 70"
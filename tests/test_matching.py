@@ -0,0 +1,63 @@
+from datetime import date, time
+from io import BytesIO
+
+from app.matching import caregiver_matcher
+from app.models import User, Caregiver, Member, Job, Appointment
+from app.models.enums import CaregivingType, Gender, AppointmentStatus
+
+
+def _seed(db):
+    for user_id, city in [(1, "Astana"), (2, "Almaty"), (3, "Astana"), (4, "Astana"), (5, "Astana"), (10, "Astana")]:
+        db.add(User(user_id=user_id, email=f"match{user_id}@example.com", given_name="Match", surname="Test", city=city, phone_number="+77070000000", password="password123"))
+    db.flush()
+    for user_id, caregiving_type, rate in [
+        (1, CaregivingType.BABYSITTER, 1000),
+        (2, CaregivingType.BABYSITTER, 1000),
+        (3, CaregivingType.ELDERLY_CARE, 500),
+        (4, CaregivingType.BABYSITTER, 2000),
+    ]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=caregiving_type, hourly_rate=rate))
+    db.add(Member(member_user_id=10))
+    db.flush()
+    db.add(Job(job_id=1, member_user_id=10, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date(2025, 1, 1)))
+    db.add(Appointment(appointment_id=1, caregiver_user_id=4, member_user_id=10, appointment_date=date(2025, 5, 1), appointment_time=time(9), work_hours=10, status=AppointmentStatus.ACCEPTED))
+    db.add(Appointment(appointment_id=2, caregiver_user_id=1, member_user_id=10, appointment_date=date(2025, 5, 2), appointment_time=time(9), work_hours=8, status=AppointmentStatus.DECLINED))
+    db.commit()
+
+
+def _ranking(client):
+    response = client.get("/jobs/1/matches")
+    assert response.status_code == 200
+    return [m["caregiver_user_id"] for m in response.json()]
+
+
+def test_job_matches(client, db):
+    _seed(db)
+    caregiver_matcher.clear()
+
+    matches = client.get("/jobs/1/matches", params={"limit": 10}).json()
+    #type + city + cheapness (500 .. 2000) + experience (accepted hours only)
+    assert [(m["caregiver_user_id"], m["score"]) for m in matches] == [(4, 7.0), (1, 6.6667), (2, 4.6667), (3, 3.0)]
+    assert matches[0] == {
+        "caregiver_user_id": 4, "score": 7.0, "caregiving_type_match": True, "same_city": True,
+        "hourly_rate": 2000, "accepted_hours": 10,
+    }
+    assert matches[3]["caregiving_type_match"] is False
+    assert client.get("/jobs/1/matches", params={"limit": 2}).json() == matches[:2]
+    rebuilds, patches = caregiver_matcher.rebuilds, caregiver_matcher.patches
+
+    #writes reload only the caregivers they touched
+    client.put("/users/2", params={"city": "Astana"})
+    assert _ranking(client) == [4, 1, 2, 3]  #same score as 1, lower id first
+    client.delete("/caregivers/1")
+    assert _ranking(client) == [4, 2, 3]
+
+    client.post(
+        "/caregivers/",
+        data={"caregiver_user_id": 5, "gender": Gender.MALE.value, "caregiving_type": CaregivingType.BABYSITTER.value, "hourly_rate": 600},
+        files={"photo": ("photo.jpg", BytesIO(b"fake photo content"), "image/jpeg")}
+    )
+    assert _ranking(client) == [4, 5, 2, 3]
+    assert caregiver_matcher.rebuilds == rebuilds and caregiver_matcher.patches == patches + 3
+
+    assert client.get("/jobs/999/matches").status_code == 404
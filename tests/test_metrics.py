@@ -0,0 +1,56 @@
+import logging
+
+from prometheus_client.parser import text_string_to_metric_families
+
+import app.metrics
+from app.metrics import instrument
+from tests.conftest import engine
+
+
+def _samples(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    #summed over status codes
+    samples = {}
+    for family in text_string_to_metric_families(response.text):
+        for sample in family.samples:
+            if "le" not in sample.labels:
+                key = (sample.name, sample.labels.get("method"), sample.labels.get("route"))
+                samples[key] = samples.get(key, 0) + sample.value
+    return samples
+
+
+def test_metrics_per_route(client):
+    #the app engine is instrumented in app/database.py, tests run on their own engine
+    instrument(engine)
+    before = _samples(client)
+
+    user_id = client.post(
+        "/users/",
+        data={"email": "metrics@example.com", "given_name": "Metrics", "surname": "Test", "city": "Astana", "phone_number": "+77071234567", "password": "password123"}
+    ).json()["user_id"]
+    for _ in range(3):
+        assert client.get(f"/users/{user_id}").status_code == 200
+    client.get("/users/999999")
+
+    after = _samples(client)
+    key = ("http_request_duration_seconds_count", "GET", "/users/{user_id}")
+    assert after[key] - before.get(key, 0) == 4
+    #cached after the first read: one SELECT for 3 reads, plus one for the 404
+    statements = ("http_request_db_statements_sum", "GET", "/users/{user_id}")
+    assert after[statements] - before.get(statements, 0) == 2
+    assert after[("http_request_db_seconds_sum", "POST", "/users/")] > 0
+    assert ("http_request_db_pool_wait_seconds_count", "POST", "/users/") in after
+
+
+def test_n_plus_one_warning(client, monkeypatch, caplog):
+    instrument(engine)
+    monkeypatch.setattr(app.metrics, "N_PLUS_ONE_THRESHOLD", 1)
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.post(
+            "/users/",
+            data={"email": "n1@example.com", "given_name": "N", "surname": "One", "city": "Astana", "phone_number": "+77071234567", "password": "password123"}
+        )
+    assert "POST /users/ executed" in caplog.text
+    assert _samples(client)[("http_request_db_statements_over_threshold_total", "POST", "/users/")] >= 1
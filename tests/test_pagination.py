@@ -0,0 +1,87 @@
+import pytest
+from datetime import date
+
+from app.models import User, Caregiver, JobApplication, Job, Member
+from app.models.enums import CaregivingType, Gender
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+def create_users(client, count):
+    ids = []
+    for i in range(count):
+        response = client.post(
+            "/users/",
+            data={
+                "email": f"page{i}@example.com",
+                "given_name": f"Page{i}",
+                "surname": "User",
+                "city": "Astana",
+                "phone_number": "+77071234567",
+                "password": "password123"
+            }
+        )
+        ids.append(response.json()["user_id"])
+    return ids
+
+
+def test_users_cursor_pages(client):
+    ids = create_users(client, 5)
+
+    seen = []
+    response = client.get("/users/?limit=2")
+    while True:
+        assert response.status_code == 200
+        seen.extend(u["user_id"] for u in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+        response = client.get(f"/users/?limit=2&cursor={cursor}")
+
+    assert seen == sorted(ids)
+
+
+def test_last_page_has_no_cursor(client):
+    create_users(client, 2)
+
+    response = client.get("/users/?limit=2")
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_invalid_cursor(client):
+    response = client.get("/users/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+    response = client.get("/job-applications/?cursor=WzFd")  #[1], but the key has two columns
+    assert response.status_code == 400
+
+
+def test_job_applications_composite_cursor(client, db):
+    #rows are inserted directly, this test is only about paging order
+    for user_id in (1, 2, 3):
+        db.add(User(user_id=user_id, email=f"ja{user_id}@example.com", given_name="A", surname="B",
+                    city="Astana", phone_number="+77071234567", password="password123"))
+    db.flush()
+    db.add_all([
+        Caregiver(caregiver_user_id=1, photo="p.jpg", gender=Gender.MALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=100),
+        Caregiver(caregiver_user_id=2, photo="p.jpg", gender=Gender.MALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=100),
+        Member(member_user_id=3),
+    ])
+    db.flush()
+    db.add_all([Job(job_id=job_id, member_user_id=3, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date.today()) for job_id in (1, 2)])
+    db.flush()
+    db.add_all([JobApplication(caregiver_user_id=c, job_id=j, date_applied=date.today()) for c in (2, 1) for j in (2, 1)])
+    db.commit()
+
+    keys = []
+    cursor = None
+    while True:
+        url = "/job-applications/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        keys.extend((ja["caregiver_user_id"], ja["job_id"]) for ja in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert keys == [(1, 1), (1, 2), (2, 1), (2, 2)]
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import time
+from io import BytesIO
+
+from sqlalchemy import text
+
+import app.photos
+from app.photo_gc import collect_garbage, PHOTO_GC_LOCK, PHOTO_GC_GRACE_SECONDS
+from app.models.enums import CaregivingType, Gender
+from tests.conftest import engine
+
+
+def _caregiver(client, i, content):
+    user_id = client.post(
+        "/users/",
+        data={
+            "email": f"photo_gc_{i}@example.com",
+            "given_name": "Photo",
+            "surname": "Gc",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    ).json()["user_id"]
+    photo = client.post(
+        "/caregivers/",
+        data={"caregiver_user_id": user_id, "gender": Gender.FEMALE.value, "caregiving_type": CaregivingType.BABYSITTER.value, "hourly_rate": 1000},
+        files={"photo": ("photo.JPG", BytesIO(content), "image/jpeg")}
+    ).json()["photo"]
+    return user_id, photo
+
+
+def _stored_name(content):
+    digest = hashlib.sha256(content).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+
+
+def test_shared_photo_is_collected_after_last_reference(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(app.photos, "static_path", tmp_path)
+    monkeypatch.setattr(app.photos, "incoming_path", tmp_path / ".incoming")
+    monkeypatch.setattr(app.photos, "derived_path", tmp_path / "derived")
+    (tmp_path / ".incoming").mkdir()
+
+    first, shared = _caregiver(client, 1, b"shared")
+    second, same = _caregiver(client, 2, b"shared")
+    assert shared == same == _stored_name(b"shared")
+
+    #replacing / deleting never unlinks inline
+    client.put(f"/caregivers/{first}/photo", files={"photo": ("photo.jpg", BytesIO(b"other"), "image/jpeg")})
+    assert collect_garbage(engine, tmp_path, grace_seconds=0) == []
+    client.delete(f"/caregivers/{second}")
+    assert (tmp_path / shared).exists()
+
+    #unreferenced: the shared photo, an old-style upload and a variant of the shared photo
+    legacy = tmp_path / f"9_{'0' * 32}.jpg"
+    legacy.write_bytes(b"legacy")
+    seed = tmp_path / "photo1.jpg"
+    seed.write_bytes(b"seed")
+    digest = hashlib.sha256(b"shared").hexdigest()
+    variant = tmp_path / "derived" / digest[:2] / digest[2:4] / f"{digest}_128.jpg"
+    variant.parent.mkdir(parents=True, exist_ok=True)
+    variant.write_bytes(b"thumb")
+
+    assert collect_garbage(engine, tmp_path) == []  #younger than the grace period
+    garbage = sorted([shared, legacy.name, f"derived/{digest[:2]}/{digest[2:4]}/{digest}_128.jpg"])
+    assert sorted(collect_garbage(engine, tmp_path, grace_seconds=0, dry_run=True)) == garbage
+    assert (tmp_path / shared).exists()
+
+    #a pass running in another worker holds the lock
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": PHOTO_GC_LOCK})
+        assert collect_garbage(engine, tmp_path, grace_seconds=0) is None
+        conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": PHOTO_GC_LOCK})
+
+    assert sorted(collect_garbage(engine, tmp_path, grace_seconds=0)) == garbage
+    assert not (tmp_path / shared).exists() and not legacy.exists() and not variant.exists()
+    assert (tmp_path / _stored_name(b"other")).read_bytes() == b"other"
+    assert seed.exists()
+
+
+def test_leftover_upload_parts_are_collected(client, tmp_path):
+    #part files of a worker killed mid-upload; a running upload keeps its mtime fresh
+    incoming = tmp_path / ".incoming"
+    incoming.mkdir()
+    stale = incoming / "tmpstale.part"
+    stale.write_bytes(b"half")
+    old = time.time() - 2 * PHOTO_GC_GRACE_SECONDS
+    os.utime(stale, (old, old))
+    writing = incoming / "tmpwriting.part"
+    writing.write_bytes(b"half")
+
+    assert collect_garbage(engine, tmp_path, dry_run=True) == [".incoming/tmpstale.part"]
+    assert stale.exists()
+    assert collect_garbage(engine, tmp_path) == [".incoming/tmpstale.part"]
+    assert not stale.exists() and writing.exists()
@@ -0,0 +1,82 @@
+from datetime import date, time
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.models import User, Caregiver, Member, Job, JobApplication, Appointment
+from app.models.enums import CaregivingType, Gender, AppointmentStatus
+from app.reports import missing_report_views, REPORTS_LOCK
+from tests.conftest import engine
+
+
+def _seed(db):
+    for user_id, name in [(1, "Aru"), (2, "Bota"), (3, "Dana"), (4, "Member")]:
+        db.add(User(user_id=user_id, email=f"{name.lower()}@example.com", given_name=name, surname="Test", city="Astana", phone_number="+77070000000", password="password123"))
+    db.flush()
+    for user_id, rate in [(1, 1000), (2, 2000), (3, 3000)]:
+        db.add(Caregiver(caregiver_user_id=user_id, photo="photo.jpg", gender=Gender.FEMALE, caregiving_type=CaregivingType.BABYSITTER, hourly_rate=rate))
+    db.add(Member(member_user_id=4, house_rules="No pets"))
+    db.flush()
+    db.add_all([
+        Job(job_id=1, member_user_id=4, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date(2025, 1, 1)),
+        Job(job_id=2, member_user_id=4, required_caregiving_type=CaregivingType.BABYSITTER, date_posted=date(2025, 1, 2)),
+    ])
+    db.flush()
+    db.add_all([
+        JobApplication(caregiver_user_id=1, job_id=1, date_applied=date(2025, 1, 3)),
+        JobApplication(caregiver_user_id=2, job_id=1, date_applied=date(2025, 1, 3)),
+    ])
+    for appointment_id, caregiver, hours, status in [
+        (1, 1, 2, AppointmentStatus.ACCEPTED),
+        (2, 1, 3, AppointmentStatus.ACCEPTED),
+        (3, 3, 4, AppointmentStatus.ACCEPTED),
+        (4, 2, 8, AppointmentStatus.PENDING),
+    ]:
+        db.add(Appointment(appointment_id=appointment_id, caregiver_user_id=caregiver, member_user_id=4, appointment_date=date(2025, 5, appointment_id), appointment_time=time(9), work_hours=hours, status=status))
+    db.commit()
+
+
+def test_schema_sql_has_all_report_views(db):
+    with engine.connect() as conn:
+        assert missing_report_views(conn) == []
+
+
+def test_reports_after_refresh(client, db):
+    _seed(db)
+    #views still hold the state of their last refresh
+    assert client.get("/reports/accepted-totals").json()["accepted_appointments"] == 0
+
+    response = client.post("/reports/refresh")
+    assert response.status_code == 200
+    assert list(response.json()) == ["report_job_applicants", "report_caregiver_accepted", "report_accepted_totals", "report_appointment_cost"]
+
+    #6.1
+    assert [(r["job_id"], r["number_of_applicants"]) for r in client.get("/reports/job-applicants").json()] == [(1, 2), (2, 0)]
+
+    #6.2 / 6.3 - same numbers as the queries on the base tables
+    totals = client.get("/reports/accepted-totals").json()
+    total_hours, average_rate = db.execute(text("""
+        SELECT SUM(a.work_hours), AVG(c.hourly_rate)
+        FROM APPOINTMENT a JOIN CAREGIVER c ON a.caregiver_user_id = c.caregiver_user_id
+        WHERE a.status = 'ACCEPTED'
+    """)).one()
+    assert totals["accepted_appointments"] == 3
+    assert totals["total_hours"] == total_hours == 9
+    assert Decimal(totals["average_hourly_rate"]) == average_rate
+
+    #6.4: average accepted rate is 5000 / 3
+    assert [r["caregiver_user_id"] for r in client.get("/reports/above-average-caregivers").json()] == [3]
+
+    #7, cursor paging
+    response = client.get("/reports/appointment-costs", params={"limit": 2})
+    assert [(r["appointment_id"], r["total_cost"]) for r in response.json()] == [(1, 2000), (2, 3000)]
+    response = client.get("/reports/appointment-costs", params={"cursor": response.headers["X-Next-Cursor"]})
+    assert [(r["appointment_id"], r["total_cost"]) for r in response.json()] == [(3, 12000)]
+
+
+def test_refresh_conflict(client):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": REPORTS_LOCK})
+        assert client.post("/reports/refresh").status_code == 409
+        conn.rollback()
+    assert client.post("/reports/refresh").status_code == 200
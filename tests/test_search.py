@@ -0,0 +1,67 @@
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.models import Job
+from app.models.job import requirements_tsvector
+from app.search import tsquery
+from tests.conftest import engine
+
+
+def _create_member(client, email, house_rules=None):
+    user_id = client.post(
+        "/users/",
+        data={
+            "email": email,
+            "given_name": "Search",
+            "surname": "Member",
+            "city": "Astana",
+            "phone_number": "+77071234567",
+            "password": "password123"
+        }
+    ).json()["user_id"]
+    client.post("/members/", data={"member_user_id": user_id, "house_rules": house_rules or ""})
+    return user_id
+
+
+def test_search_jobs_ranked(client):
+    member_user_id = _create_member(client, "jobs_search@example.com")
+    requirements = [
+        "Must be soft-spoken",
+        "Soft-spoken, patient and soft-spoken again with kids",
+        "Loud and energetic",
+        None,
+    ]
+    job_ids = []
+    for r in requirements:
+        data = {"member_user_id": member_user_id, "required_caregiving_type": "BABYSITTER"}
+        if r is not None:
+            data["other_requirements"] = r
+        job_ids.append(client.post("/jobs/", data=data).json()["job_id"])
+
+    response = client.get("/jobs/search", params={"q": "soft-spoken"})
+    assert response.status_code == 200
+    assert [j["job_id"] for j in response.json()] == [job_ids[1], job_ids[0]]
+
+    assert [j["job_id"] for j in client.get("/jobs/search", params={"q": "energetic -soft"}).json()] == [job_ids[2]]
+    assert client.get("/jobs/search", params={"q": ""}).status_code == 422
+
+
+def test_search_members(client):
+    pets = _create_member(client, "pets@example.com", "No pets. Quiet environment preferred.")
+    _create_member(client, "smoking@example.com", "No smoking inside")
+
+    response = client.get("/members/search", params={"q": "pet"})
+    assert response.status_code == 200
+    assert [m["member_user_id"] for m in response.json()] == [pets]
+
+
+def test_search_query_uses_fulltext_index(db):
+    #the filter must repeat the indexed expression exactly, otherwise the planner falls back to a seq scan
+    sql = str(
+        db.query(Job.job_id).filter(requirements_tsvector.op("@@")(tsquery("soft-spoken")))
+        .statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    )
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = "\n".join(row[0] for row in conn.execute(text("EXPLAIN " + sql)))
+    assert "ix_job_requirements_fts" in plan
@@ -0,0 +1,53 @@
+import time
+
+from app.slow_queries import slow_query_log, fingerprint, normalize, redact, redact_plan
+from tests.conftest import engine
+
+
+def test_fingerprint_ignores_values():
+    a = "SELECT * FROM job WHERE job_id IN (%(id_1)s, %(id_2)s) AND other_requirements = 'pets' LIMIT 20"
+    b = "SELECT *  FROM job\n WHERE job_id IN (%(id_1)s, %(id_2)s, %(id_3)s) AND other_requirements = 'no ''smoking''' LIMIT 5"
+    assert normalize(a) == "SELECT * FROM job WHERE job_id IN (?+) AND other_requirements = ? LIMIT ?"
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint(a.replace("job_id", "member_user_id"))
+    assert normalize("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)") == "INSERT INTO t (a, b) VALUES (?+), ..."
+    assert redact({"email": "secret@example.com", "n": 3, "x": None}) == {"email": "<str len=18>", "n": "<int>", "x": None}
+    plan = {"Plan": {"Filter": "((email)::text = 'a@b.kz'::text)", "Plans": [{"Index Cond": "(user_id = 42)", "Relation Name": "account"}]}}
+    assert redact_plan(plan) == {"Plan": {"Filter": "((email)::text = ?::text)", "Plans": [{"Index Cond": "(user_id = ?)", "Relation Name": "account"}]}}
+    assert redact([{"n": 1}, {"n": 2}], executemany=True) == {"rows": 2, "first": {"n": "<int>"}}
+
+
+def test_slow_queries_by_route_with_plan(client, monkeypatch):
+    #the app engine is instrumented in app/database.py, tests run on their own engine
+    slow_query_log.instrument(engine)
+    monkeypatch.setattr(slow_query_log, "explain_bind", engine)
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 0.000001)  #everything is slow
+    slow_query_log.clear()
+
+    user_id = client.post(
+        "/users/",
+        data={"email": "slow@example.com", "given_name": "Slow", "surname": "Query", "city": "Astana", "phone_number": "+77071234567", "password": "password123"}
+    ).json()["user_id"]
+    client.get(f"/users/{user_id}")
+    client.get("/users/999999")
+
+    deadline = time.time() + 5
+    while True:
+        entries = client.get("/admin/slow-queries", params={"order": "count"}).json()
+        select = next(e for e in entries if "GET /users/{user_id}" in e["routes"])
+        if select["plan"] is not None or time.time() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert select["count"] == 2 and select["routes"] == {"GET /users/{user_id}": 2}
+    assert select["plan"]["Plan"]["Node Type"] == "Limit"
+    scan = select["plan"]["Plan"]["Plans"][0]
+    assert scan["Relation Name"] == "account" and scan["Index Cond"] == "(user_id = ?)"
+    insert = next(e for e in entries if e["statement"].startswith("INSERT INTO account"))
+    assert insert["routes"] == {"POST /users/": 1}
+    assert not any(e["statement"].startswith("EXPLAIN") for e in entries)
+    assert "slow@example.com" not in str(entries)
+    assert insert["slowest"]["parameters"]["email"] == "<str len=16>"
+
+    assert client.delete("/admin/slow-queries").status_code == 204
+    assert client.get("/admin/slow-queries").json() == []